@@ -17,6 +17,10 @@ import os
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+# Profil nasazení: 'development' (výchozí) nebo 'production'
+DEPLOYMENT_PROFILE = os.environ.get('ONLINESHOP_PROFILE', 'development')
+
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
 
@@ -43,11 +47,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'viewer.middleware.RequestMetricsMiddleware',
+    'viewer.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'viewer.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'viewer.middleware.ProfilingMiddleware',
+    'viewer.middleware.MemoryDiagnosticsMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +65,7 @@ ROOT_URLCONF = 'OnlineShop.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'viewer.metrics.TimedDjangoTemplates',  # DjangoTemplates s měřením času vykreslení
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,6 +82,150 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'OnlineShop.wsgi.application'
 
+# Měření požadavků (viewer.middleware.RequestMetricsMiddleware) - Server-Timing hlavička a log 'viewer.metrics'
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_SERVER_TIMING = DEBUG  # časy a počty dotazů nevidí v produkci každý klient
+REQUEST_METRICS_SLOW_MS = 500  # pomalejší požadavky se logují jako varování
+REQUEST_METRICS_DUPLICATE_THRESHOLD = 3  # od kolika opakování stejného dotazu se loguje varování (N+1)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'viewer.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('ONLINESHOP_METRICS_LOG_LEVEL', 'WARNING'),  # INFO = řádek za každý požadavek
+            'propagate': False,
+        },
+    },
+}
+
+# Cache a session - write-through cache nad databází (viewer.sessions), nezměněné session se neukládají.
+# Bez ONLINESHOP_SESSION_CACHE drží session cache každý proces zvlášť (LRU LocMemCache) - jen pro jeden proces;
+# při více procesech je třeba sdílená cache, např. `manage.py run_cache_server` a ONLINESHOP_SESSION_CACHE=127.0.0.1:11311
+SESSION_CACHE_SERVER = os.environ.get('ONLINESHOP_SESSION_CACHE')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'sessions': {
+        'BACKEND': 'viewer.cache.SocketCache',
+        'LOCATION': SESSION_CACHE_SERVER,
+    } if SESSION_CACHE_SERVER else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sessions',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Zkomprimovaná těla veřejných stránek (viewer.compression) - vlastní cache, nevytlačují 'default'
+    'compression': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'compression',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+SESSION_ENGINE = 'viewer.sessions'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Profilování požadavků na vyžádání (viewer.middleware.ProfilingMiddleware) - hlavička X-Profile: 1 nebo ?profile=1
+PROFILING_ENABLED = True
+PROFILING_QUERY_PARAM = 'profile'
+PROFILING_SAMPLE_RATE = float(os.environ.get('ONLINESHOP_PROFILE_SAMPLE_RATE', 0))  # podíl náhodně profilovaných
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_KEEP = 200  # kolik posledních profilů ponechat
+
+# Diagnostika paměti (viewer.memory) - tracemalloc snímky a špičky pohledů, hlídání RSS procesu
+MEMORY_TRACING_ENABLED = os.environ.get('ONLINESHOP_TRACEMALLOC') == '1'  # zapnout tracemalloc při startu
+MEMORY_TRACING_FRAMES = 10  # hloubka zásobníku ukládaná k alokacím
+MEMORY_SNAPSHOTS_KEEP = 10
+MEMORY_TOP_STATS = 25  # kolik míst alokací zobrazit
+MEMORY_SNAPSHOT_QUERY_PARAM = 'memory_snapshot'
+MEMORY_RSS_LIMIT_MB = int(os.environ.get('ONLINESHOP_RSS_LIMIT_MB', 0))  # 0 = nehlídat
+MEMORY_RSS_CHECK_INTERVAL = 100  # po kolika požadavcích kontrolovat RSS
+MEMORY_RECYCLE_SIGNAL = os.environ.get('ONLINESHOP_RECYCLE_SIGNAL')  # např. 'SIGTERM' pro restart workeru
+
+# Komprese odpovědí gzip/Brotli (viewer.middleware.CompressionMiddleware), viz `manage.py bench_compression`
+COMPRESSION_ENABLED = True
+COMPRESSION_MIN_SIZE = 512  # bajty, menší těla se nekomprimují
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5  # vyšší kvalita je pro dynamické stránky příliš drahá na CPU
+COMPRESSION_CACHE_ALIAS = 'compression'
+COMPRESSION_CACHE_TIMEOUT = 600  # s
+COMPRESSION_CACHE_MAX_SIZE = 1024 * 1024  # bajty, větší těla se do cache neukládají
+
+# Podobné televize na detailu (viewer.recommendations), přepočet všech: `manage.py rebuild_recommendations`
+RECOMMENDATIONS_NEIGHBOURS = 6
+RECOMMENDATIONS_BATCH_SIZE = 500  # televizí na jednu maticovou dávku (paměť ~ dávka x katalog x 4 B)
+# Po uložení/smazání televize přepočítat dotčené sousedy. Přepočet načte celý katalog a spočítá vzdálenosti
+# změněných televizí ke všem ostatním (čas a paměť rostou s velikostí katalogu); změny jedné transakce
+# se slučují do jednoho přepočtu. Pro hromadné importy vypněte a pak spusťte `manage.py rebuild_recommendations`.
+RECOMMENDATIONS_REFRESH_ON_SAVE = True
+
+# Stránky kategorií - předpočítané seznamy televizí v cache (viewer.categories), mažou se při změně.
+# Signály mažou cache jen tam, kde se zapisovalo: 'default' (LocMem) je správná jen s jedním procesem,
+# při více procesech musí jít přes sdílený cache server `manage.py run_cache_server` (viewer.cache.SocketCache)
+CATEGORY_CACHE_SERVER = os.environ.get('ONLINESHOP_CATEGORY_CACHE', SESSION_CACHE_SERVER)
+CATEGORY_CACHE_ALIAS = 'default'
+if CATEGORY_CACHE_SERVER:
+    CACHES['categories'] = {'BACKEND': 'viewer.cache.SocketCache', 'LOCATION': CATEGORY_CACHE_SERVER}
+    CATEGORY_CACHE_ALIAS = 'categories'
+CATEGORY_CACHE_TIMEOUT = 3600  # s, pojistka pro změny bez signálů (bulk_create, přejmenování značky)
+
+# Stavy objednávek, které přehled prodejů (viewer.rollups.sales_summary) počítá do tržby
+SALES_REVENUE_STATUSES = ['submitted', 'pending_payment', 'processing', 'on_hold', 'dispatched', 'delivered',
+                          'completed']
+
+ORDER_QUEUE_PAGE_SIZE = 50  # objednávek na stránku fronty pro personál (viewer.views.OrderQueueView)
+
+# Archivace uzavřených objednávek (viewer.archive), spouští se příkazem `manage.py archive_orders`
+ORDER_ARCHIVE_AFTER_DAYS = 365
+ORDER_ARCHIVE_STATUSES = ['completed', 'cancelled', 'refunded']
+ORDER_ARCHIVE_BATCH_SIZE = 1000  # objednávek na jednu transakci
+
+# Kniha skladových pohybů (viewer.stock): `manage.py compact_stock_ledger` a `manage.py reconcile_stock`
+STOCK_COMPACTION_LAG = 60  # s, novější pohyby se do snímků zatím nezapočítají
+
+# Oznámení zákazníkům (viewer.notifications) - fronta v databázi, odesílá `manage.py run_notification_worker`
+NOTIFICATIONS_ENABLED = True
+NOTIFICATION_CHANNELS = {  # Profile.communication_channel -> třída kanálu
+    'Email': 'viewer.notifications.EmailChannel',
+    'Telefon': 'viewer.notifications.FileChannel',  # bez SMS brány jen zápis do souboru
+    'Pošta': 'viewer.notifications.FileChannel',  # podklad pro tisk dopisů
+}
+NOTIFICATION_FILE_DIR = BASE_DIR / 'notifications'
+NOTIFICATION_BATCH_SIZE = 50  # úloh na jednu dávku workera
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_DELAY = 60  # s před druhým pokusem, dále dvojnásobek
+NOTIFICATION_LOCK_TIMEOUT = 300  # s, po kolika se úloha spadlého workera vrátí do fronty
+NOTIFICATION_POLL_INTERVAL = 2  # s, jak často se prázdná fronta kontroluje
+EMAIL_BACKEND = os.environ.get('ONLINESHOP_EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('ONLINESHOP_FROM_EMAIL', 'obchod@onlineshop.cz')
+
+# Omezení počtu požadavků (viewer.ratelimit) - token bucket na skupinu pohledů a klíč (ip, user, username).
+# rate = doplňování tokenů ('počet/s|m|h|d'), burst = velikost bucketu; methods = které metody se počítají.
+RATELIMIT_ENABLED = os.environ.get('ONLINESHOP_RATELIMIT', '1') == '1'  # 0 = vypnout (zátěžové testy)
+RATELIMITS = {
+    'cart': {'rate': '60/m', 'burst': 20, 'keys': ['user']},
+    'search': {'rate': '30/m', 'burst': 10, 'keys': ['user']},
+    'login': {'rate': '10/m', 'burst': 5, 'keys': ['ip', 'username'], 'methods': ['POST']},
+}
+RATELIMIT_IP_META = 'REMOTE_ADDR'  # za reverzní proxy např. 'HTTP_X_REAL_IP'
+RATELIMIT_MAX_KEYS = 100000  # bucketů v paměti procesu (LRU)
+# Sdílené buckety pro více procesů - cache server `manage.py run_cache_server` (viewer.cache.SocketCache)
+RATELIMIT_CACHE_SERVER = os.environ.get('ONLINESHOP_RATELIMIT_CACHE', SESSION_CACHE_SERVER)
+RATELIMIT_CACHE_ALIAS = None
+if RATELIMIT_CACHE_SERVER:
+    CACHES['ratelimit'] = {'BACKEND': 'viewer.cache.SocketCache', 'LOCATION': RATELIMIT_CACHE_SERVER}
+    RATELIMIT_CACHE_ALIAS = 'ratelimit'
+
+# Admin: filtrované seznamy velkých tabulek se počítají nejvýše do tohoto počtu řádků (viewer.admin)
+ADMIN_COUNT_LIMIT = 10000
+
+# Asynchronní pohledy katalogu, detailu, vyhledávání a košíku (viewer.async_views) pro provoz pod ASGI
+ASYNC_CATALOG_VIEWS = os.environ.get('ONLINESHOP_ASYNC_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
@@ -84,6 +237,64 @@ DATABASES = {
     }
 }
 
+# PRAGMA pro produkční provoz SQLite - WAL dovolí čtenářům běžet souběžně se zapisovatelem,
+# busy_timeout nechá spojení počkat na zámek místo okamžité chyby "database is locked".
+SQLITE_PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'mmap_size': 256 * 1024 * 1024,  # bajty
+    'cache_size': -20000,  # záporná hodnota = velikost v KiB
+    'temp_store': 'MEMORY',
+}
+
+# PRAGMA nastavené na každém novém spojení (viz viewer.db.apply_sqlite_pragmas)
+SQLITE_PRAGMAS = {}
+
+if DEPLOYMENT_PROFILE == 'production':
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,  # spojení se drží mezi požadavky
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 5,  # s, čekání na zámek na úrovni modulu sqlite3
+        },
+    })
+
+# Repliky pro čtení katalogu a historie objednávek (viz viewer.routers.ReplicaRouter).
+# Lokálně je replikou druhý soubor SQLite obnovovaný příkazem refresh_replica (backup API).
+REPLICA_DATABASES = []
+if os.environ.get('ONLINESHOP_SQLITE_REPLICA') == '1':
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / 'db_replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES = ['replica']
+
+DATABASE_ROUTERS = ['viewer.routers.ReplicaRouter']
+
+REPLICA_READ_MODELS = [
+    'viewer.television', 'viewer.brand', 'viewer.category', 'viewer.tvdisplaytechnology',
+    'viewer.tvdisplayresolution', 'viewer.tvoperationsystem', 'viewer.itemsonstock',
+    'viewer.order', 'viewer.orderitem', 'viewer.dailysalesrollup',
+]
+REPLICA_PIN_COOKIE = 'replica_pin'
+REPLICA_PIN_SECONDS = 10  # s, po zápisu čte uživatel z primární databáze
+
+# Write pipeline - zápisy objednávek a skladu přes jedno zapisovací vlákno se skupinovým commitem
+WRITE_PIPELINE_ENABLED = os.environ.get('ONLINESHOP_WRITE_PIPELINE') == '1'
+WRITE_PIPELINE_BATCH_SIZE = 32  # max. počet úloh v jedné transakci
+WRITE_PIPELINE_BATCH_WAIT = 0.002  # s, jak dlouho čekat na další úlohy do dávky
+WRITE_PIPELINE_TIMEOUT = 30  # s, jak dlouho požadavek čeká na výsledek zápisu
+
+
+# Uživatel se načítá s profilem a skupinami najednou (viewer.auth). Jediný backend - session
+# přihlášené přes ModelBackend by se profilem nikdy nenačítaly (jejich uživatelé se přihlásí znovu).
+AUTHENTICATION_BACKENDS = [
+    'viewer.auth.ProfileModelBackend',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -123,6 +334,20 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / "viewer/static",
 ]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+# MEDIA_ROOT je uvnitř viewer/static - finders ho vynechají (viewer.staticfiles)
+STATICFILES_FINDERS = [
+    'viewer.staticfiles.MediaExcludingFileSystemFinder',
+    'viewer.staticfiles.MediaExcludingAppDirectoriesFinder',
+]
+
+# V produkci collectstatic otiskne do názvů souborů hash obsahu a uloží k nim varianty .gz/.br
+# (viewer.staticfiles); aplikace je pak servíruje sama (viewer.views.serve_static)
+if DEPLOYMENT_PROFILE == 'production':
+    STATICFILES_STORAGE = 'viewer.staticfiles.CompressedManifestStaticFilesStorage'
+STATIC_SERVE = DEPLOYMENT_PROFILE == 'production'  # vypnout, pokud /static/ obsluhuje front-end server
+STATIC_MAX_AGE = 3600  # s, soubory bez hashe v názvu
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # s, otisknuté soubory
 
 
 # Default primary key field type
@@ -132,4 +357,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'viewer/static/media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'viewer/static/media')
+
+# Nahrané soubory servíruje viewer.views.serve_media (kontrola přístupu k avatarům, ETag, Range).
+# MEDIA_SENDFILE 'x-accel-redirect' (nginx) nebo 'x-sendfile' (Apache, lighttpd) předá přenos front-end serveru;
+# nginx: location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+MEDIA_SERVE = True  # vypnout, pokud /media/ obsluhuje front-end server bez aplikace
+MEDIA_SENDFILE = os.environ.get('ONLINESHOP_MEDIA_SENDFILE')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_MAX_AGE = 24 * 3600  # s
\ No newline at end of file
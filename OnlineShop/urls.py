@@ -13,10 +13,11 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 
 from viewer.views import (BaseView, TVDetailView, TVListView, TVCreateView, TVUpdateView, TVDeleteView,
                           FilteredTelevisionListView, ProfileView, SubmittableLoginView, CustomLogoutView,
@@ -26,13 +27,16 @@ from viewer.views import (BaseView, TVDetailView, TVListView, TVCreateView, TVUp
                           ItemOnStockCreateView, ItemOnStockUpdateView, ItemOnStockDeleteView, BrandDeleteView,
                           TVDisplayTechnologyCreateView, DisplayResolutionCreateView, OperationSystemCreateView,
                           TVDisplayTechnologyDeleteView, TVDisplayResolutionDeleteView, TVOperationSystemDeleteView,
-                          terms_view)
-from viewer.models import (Profile, Television, Brand, TVOperationSystem, TVDisplayResolution, TVDisplayTechnology,
-                           Order, ItemsOnStock
-                           )
+                          terms_view, ProfilingListView, profile_download, MemoryDiagnosticsView,
+                          SalesDashboardView, television_lookup, serve_static,
+                          serve_media, CategoryListView, CategoryDetailView,
+                          OrderQueueView)
+from viewer.async_views import AsyncTVListView, AsyncTVDetailView, AsyncSearchResultsView, AsyncCartView
 
-admin.site.register([Television, Brand, TVDisplayResolution, TVDisplayTechnology, TVOperationSystem, Profile,
-                     Order, ItemsOnStock])
+# Pod ASGI lze katalog obsluhovat asynchronními pohledy (viz settings.ASYNC_CATALOG_VIEWS)
+if settings.ASYNC_CATALOG_VIEWS:
+    TVListView, TVDetailView, SearchResultsView, CartView = (AsyncTVListView, AsyncTVDetailView,
+                                                             AsyncSearchResultsView, AsyncCartView)
 
 urlpatterns = [
     path('', BaseView.as_view(), name='home'),
@@ -66,7 +70,10 @@ urlpatterns = [
     path('tv/brand/<str:brand>/technology/<str:technology>/', FilteredTelevisionListView.as_view(),
          name='filtered_tv_by_brand_and_technology'),
     # ----------------Sklad sekce----------------
+    path('categories/', CategoryListView.as_view(), name='category_list'),
+    path('categories/<int:pk>/', CategoryDetailView.as_view(), name='category_detail'),
     path('stock', ItemOnStockListView.as_view(), name='stock_list'),
+    path('stock/television-lookup/', television_lookup, name='television_lookup'),
     path('stock/create/', ItemOnStockCreateView.as_view(), name='item_on_stock_create'),
     path('stock/update/<pk>', ItemOnStockUpdateView.as_view(), name='item_on_stock_update'),
     path('stock/delete/<pk>', ItemOnStockDeleteView.as_view(), name='item_on_stock_delete'),
@@ -78,10 +85,22 @@ urlpatterns = [
     path('order/success/<uuid:order_id>/', OrderSuccessView.as_view(), name='order_success'),
     path('order/pdf/<uuid:order_id>/', generate_order_pdf, name='order_pdf'),
     path('orders/', OrderListView.as_view(), name='order_list'),
+    path('orders/queue/', OrderQueueView.as_view(), name='order_queue'),
     path('order/<uuid:order_id>/', OrderDetailView.as_view(), name='order_detail'),
     path('order/delete/<uuid:order_id>/', OrderDeleteView.as_view(), name='order_delete'),
     path('terms/', terms_view, name='terms'),
+    path('sales/dashboard/', SalesDashboardView.as_view(), name='sales_dashboard'),
+    path('diagnostics/profiles/', ProfilingListView.as_view(), name='profile_list'),
+    path('diagnostics/profiles/<str:filename>', profile_download, name='profile_download'),
+    path('diagnostics/memory/', MemoryDiagnosticsView.as_view(), name='memory_diagnostics'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.STATIC_SERVE:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), serve_static, name='static'),
+    ]
+
+if settings.MEDIA_SERVE:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+    ]
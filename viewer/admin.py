@@ -1,3 +1,218 @@
-from django.contrib import admin
+"""
+Administrace obchodu.
 
-# Register your models here.
+Seznamy v adminu nedělají COUNT(*) přes celou tabulku (EstimatedCountPaginator), cizí klíče
+v seznamech načítají přes list_select_related a velké číselníky (televize, uživatelé) vybírají
+přes raw-id nebo autocomplete místo selectu se všemi řádky. Hromadné změny stavu objednávek jdou
+přes viewer.order_workflow.bulk_transition - jeden UPDATE na každý výchozí stav.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from viewer.db import estimated_row_count
+from viewer.models import (ArchivedOrder, ArchivedOrderItem, Brand, ItemsOnStock, NotificationJob, Order, OrderItem,
+                           OrderStatusChange, Profile, StockMovement, Television, TVDisplayResolution, TVDisplayTechnology,
+                           TVOperationSystem)
+from viewer.order_workflow import STATUS_LABELS, TRANSITIONS, bulk_transition
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Stránkování bez přesného počtu řádků.
+
+    Nefiltrovaný seznam bere počet z odhadu databáze (viewer.db.estimated_row_count), filtrovaný
+    počítá nejvýše do settings.ADMIN_COUNT_LIMIT řádků - další stránky jsou dostupné zúžením filtru.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None:
+                return estimate
+        return queryset.order_by()[:settings.ADMIN_COUNT_LIMIT].count()
+
+
+class FastChangeListAdmin(admin.ModelAdmin):
+    """Základ pro velké tabulky - odhad počtu místo COUNT(*) na každé stránce seznamu."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+def transition_action(to_status):
+    """Akce adminu převádějící vybrané objednávky do stavu `to_status` (jen z povolených stavů)."""
+
+    def action(modeladmin, request, queryset):
+        selected = defaultdict(list)
+        for pk, status in queryset.order_by().values_list('pk', 'status'):
+            selected[status].append(pk)
+        changed = skipped = 0
+        for from_status, pks in selected.items():
+            if to_status in TRANSITIONS.get(from_status, ()):
+                changed += bulk_transition(pks, from_status, to_status, request.user)
+            else:
+                skipped += len(pks)
+        modeladmin.message_user(request, f'Stav změněn u {changed} objednávek.', messages.SUCCESS)
+        if skipped:
+            modeladmin.message_user(request, f'{skipped} objednávek nelze převést do stavu '
+                                             f'{STATUS_LABELS[to_status]}.', messages.WARNING)
+
+    action.__name__ = f'mark_{to_status}'
+    return admin.action(description=f'Změnit stav na {STATUS_LABELS[to_status]}')(action)
+
+
+@admin.register(Brand)
+class BrandAdmin(admin.ModelAdmin):
+    search_fields = ['brand_name']
+
+
+@admin.register(TVDisplayTechnology, TVDisplayResolution, TVOperationSystem)
+class TelevisionParameterAdmin(admin.ModelAdmin):
+    search_fields = ['name']
+
+
+@admin.register(Television)
+class TelevisionAdmin(FastChangeListAdmin):
+    list_display = ['brand_model', 'brand', 'tv_screen_size', 'display_technology', 'display_resolution', 'price']
+    list_select_related = ['brand', 'display_technology', 'display_resolution']
+    list_filter = ['display_technology', 'display_resolution', 'smart_tv']
+    # Hledání od začátku textu (LIKE 'x%') místo LIKE '%x%' přes celou tabulku
+    search_fields = ['^brand_model', '^brand__brand_name']
+    autocomplete_fields = ['brand']
+
+
+@admin.register(ItemsOnStock)
+class ItemsOnStockAdmin(FastChangeListAdmin):
+    list_display = ['television_id', 'quantity']
+    list_select_related = ['television_id__brand']
+    search_fields = ['^television_id__brand_model']
+    autocomplete_fields = ['television_id']
+
+    def get_readonly_fields(self, request, obj=None):
+        # Uložení formuláře by přepsalo prodeje od jeho načtení - počet kusů se upravuje
+        # ve skladu (/stock/) jako rozdíl (viewer.stock.adjust)
+        return ['television_id', 'quantity'] if obj is not None else []
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(FastChangeListAdmin):
+    # Kniha pohybů se jen doplňuje - v adminu je jen ke čtení
+    list_display = ['television', 'kind', 'delta', 'order_uuid', 'created_at']
+    list_select_related = ['television__brand']
+    list_filter = ['kind']
+    search_fields = ['=order_uuid']
+    raw_id_fields = ['television']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ['television']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('television__brand')
+
+
+@admin.register(Order)
+class OrderAdmin(FastChangeListAdmin):
+    list_display = ['order_id', 'user', 'order_date', 'status', 'price']
+    list_select_related = ['user']
+    # Filtr stavu a řazení podle data používají index order_status_date_idx
+    list_filter = ['status']
+    search_fields = ['=order_id', '^user__username']
+    ordering = ['-order_date', '-id']
+    raw_id_fields = ['user', 'television']
+    # Stav se mění jen akcemi (stavový automat, auditní záznam, oznámení zákazníkovi)
+    readonly_fields = ['order_id', 'order_date', 'status']
+    inlines = [OrderItemInline]
+    actions = [transition_action(status) for status in ('processing', 'on_hold', 'dispatched', 'delivered',
+                                                        'completed', 'cancelled')]
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+    fields = readonly_fields = ['television', 'quantity']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('television__brand')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(FastChangeListAdmin):
+    list_display = ['order_id', 'user', 'order_date', 'status', 'price', 'archived_at']
+    list_select_related = ['user']
+    list_filter = ['status']
+    search_fields = ['=order_id', '^user__username']
+    raw_id_fields = ['user']
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OrderStatusChange)
+class OrderStatusChangeAdmin(FastChangeListAdmin):
+    list_display = ['order_uuid', 'from_status', 'to_status', 'changed_by', 'changed_at']
+    list_select_related = ['changed_by']
+    list_filter = ['to_status']
+    search_fields = ['=order_uuid']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(NotificationJob)
+class NotificationJobAdmin(FastChangeListAdmin):
+    list_display = ['kind', 'order_uuid', 'user', 'channel', 'status', 'attempts', 'run_after', 'sent_at']
+    list_select_related = ['user']
+    # Filtr stavu používá index fronty notification_queue_idx
+    list_filter = ['status', 'kind', 'channel']
+    search_fields = ['=order_uuid']
+    raw_id_fields = ['user']
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Odeslat znovu')
+    def retry(self, request, queryset):
+        retried = queryset.filter(status='failed').update(status='pending', attempts=0, run_after=timezone.now(),
+                                                         last_error='')
+        self.message_user(request, f'Do fronty vráceno {retried} oznámení.', messages.SUCCESS)
+
+
+@admin.register(Profile)
+class ProfileAdmin(FastChangeListAdmin):
+    list_display = ['user', 'first_name', 'last_name', 'city']
+    list_select_related = ['user']
+    search_fields = ['^user__username', '^last_name']
+    raw_id_fields = ['user']
@@ -1,6 +1,53 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
 
 
 class ViewerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'viewer'
+
+    def ready(self):
+        from viewer.db import apply_sqlite_pragmas
+        from viewer.metrics import install_query_recorder
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='viewer_sqlite_pragmas')
+        connection_created.connect(install_query_recorder, dispatch_uid='viewer_query_recorder')
+
+        # Průběžná aktualizace denních souhrnů prodejů
+        from viewer import rollups
+        from viewer.models import Order
+        post_init.connect(rollups.remember_status, sender=Order, dispatch_uid='viewer_rollups_post_init')
+        post_save.connect(rollups.remember_status, sender=Order, dispatch_uid='viewer_rollups_post_save')
+        pre_save.connect(rollups.order_status_changed, sender=Order, dispatch_uid='viewer_rollups_pre_save')
+        pre_delete.connect(rollups.order_deleted, sender=Order, dispatch_uid='viewer_rollups_pre_delete')
+
+        # Průběžný přepočet podobných televizí
+        from viewer import recommendations
+        from viewer.models import Television
+        post_save.connect(recommendations.television_saved, sender=Television,
+                          dispatch_uid='viewer_recommendations_post_save')
+        pre_delete.connect(recommendations.television_deleted, sender=Television,
+                           dispatch_uid='viewer_recommendations_pre_delete')
+
+        # Mazání předpočítaných seznamů televizí v kategoriích
+        from viewer import categories
+        from viewer.models import Category
+        m2m_changed.connect(categories.membership_changed, sender=Television.categories.through,
+                            dispatch_uid='viewer_categories_m2m_changed')
+        post_save.connect(categories.television_changed, sender=Television, dispatch_uid='viewer_categories_tv_save')
+        pre_delete.connect(categories.television_changed, sender=Television,
+                           dispatch_uid='viewer_categories_tv_delete')
+        post_save.connect(categories.category_changed, sender=Category, dispatch_uid='viewer_categories_save')
+        post_delete.connect(categories.category_changed, sender=Category, dispatch_uid='viewer_categories_delete')
+
+        # Kniha skladových pohybů pro změny zásob přes save()/delete()
+        from viewer import stock
+        from viewer.models import ItemsOnStock
+        post_init.connect(stock.remember_quantity, sender=ItemsOnStock, dispatch_uid='viewer_stock_post_init')
+        post_save.connect(stock.stock_saved, sender=ItemsOnStock, dispatch_uid='viewer_stock_post_save')
+        post_delete.connect(stock.stock_deleted, sender=ItemsOnStock, dispatch_uid='viewer_stock_post_delete')
+
+        if settings.MEMORY_TRACING_ENABLED:
+            from viewer.memory import start_tracing
+            start_tracing()
@@ -0,0 +1,92 @@
+"""
+Archivace starých uzavřených objednávek (modely ArchivedOrder, ArchivedOrderItem).
+
+Objednávky ve stavech settings.ORDER_ARCHIVE_STATUSES starší než settings.ORDER_ARCHIVE_AFTER_DAYS
+se po dávkách přesouvají do archivních tabulek: každá dávka je jedna transakce (zkopírování objednávek
+a položek, smazání originálů), takže objednávka je vždy právě v jedné z tabulek. Archiv zachovává primární
+klíč i order_id; find_order hledá nejdřív v provozní tabulce a pak v archivu. Souhrny prodejů se při
+archivaci nemění (objednávky dál patří do historie) a rebuild_sales_rollups počítá i s archivem.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from viewer.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from viewer.rollups import rollups_paused
+
+ARCHIVED_FIELDS = ('order_id', 'user_id', 'order_date', 'price', 'first_name', 'last_name', 'address', 'city',
+                   'zipcode', 'phone_number', 'status')
+
+
+def archive_cutoff(days=None):
+    """Hranice archivace - objednávky vytvořené před ní jsou dost staré."""
+    if days is None:
+        days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def archivable_orders(before):
+    """Objednávky, které lze archivovat (uzavřený stav, order_date před `before`)."""
+    return Order.objects.filter(status__in=settings.ORDER_ARCHIVE_STATUSES, order_date__lt=before)
+
+
+def archive_batch(order_ids, before):
+    """
+    Přesune jednu dávku objednávek do archivu v jedné transakci.
+
+    Stav a stáří se ověří znovu pod zámkem - objednávka změněná od výběru dávky se přeskočí.
+
+    Vrací:
+        int: Počet archivovaných objednávek.
+    """
+    with transaction.atomic():
+        orders = list(archivable_orders(before).select_for_update().filter(pk__in=order_ids)
+                      .values('pk', *ARCHIVED_FIELDS))
+        if not orders:
+            return 0
+        ids = [order.pop('pk') for order in orders]
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(id=pk, **order) for pk, order in zip(ids, orders)])
+        ArchivedOrderItem.objects.bulk_create(
+            [ArchivedOrderItem(order_id=order_id, television_id=television_id, quantity=quantity, unit_price=unit_price)
+             for order_id, television_id, quantity, unit_price in OrderItem.objects.filter(order_id__in=ids)
+             .values_list('order_id', 'television_id', 'quantity', 'unit_price')])
+        # Objednávky z historie nemizí, jen se přesouvají - souhrny prodejů zůstávají beze změny
+        with rollups_paused():
+            Order.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive_orders(days=None, batch_size=None, progress=None):
+    """
+    Archivuje všechny objednávky starší než `days` dní po dávkách o `batch_size` objednávkách.
+
+    `progress` (volitelně) se volá s počtem objednávek archivovaných v každé dávce.
+
+    Vrací:
+        int: Celkový počet archivovaných objednávek.
+    """
+    before = archive_cutoff(days)
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    total, last_pk = 0, 0
+    while True:
+        ids = list(archivable_orders(before).filter(pk__gt=last_pk).order_by('pk')
+                   .values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        archived = archive_batch(ids, before)
+        total += archived
+        last_pk = ids[-1]
+        if progress is not None:
+            progress(archived)
+
+
+def find_order(order_id):
+    """Objednávka podle order_id z provozní tabulky, jinak z archivu (None, pokud neexistuje)."""
+    for model in (Order, ArchivedOrder):
+        order = (model.objects.select_related('user').prefetch_related('items__television')
+                 .filter(order_id=order_id).first())
+        if order is not None:
+            return order
+    return None
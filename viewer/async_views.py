@@ -0,0 +1,121 @@
+"""
+Asynchronní varianty pohledů katalogu a košíku pro provoz pod ASGI.
+
+Pod ASGI server neposílá tyto pohledy do thread executoru celé - dotazy používají asynchronní
+API querysetů. Django 4.1 ale asynchronní dotazy provádí přes sync_to_async(thread_sensitive=True),
+tedy jeden po druhém ve společném vlákně a spojení; dotazy se proto čekají postupně a souběžné
+nejsou (asyncio.gather by jen předstíral souběh). Výhodou je, že event loop mezi dotazy obsluhuje
+jiné požadavky. Přihlášeného uživatele a session je nutné načíst přes sync_to_async (Django 4.1
+pro ně asynchronní API nemá), stejně tak vykreslení šablony, protože context processory
+pracují s databází synchronně.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404
+from django.shortcuts import render
+from django.views.generic import View
+
+from viewer.auth import cached_group_names
+from viewer.catalog import catalog_queryset, filter_catalog, search_catalog, stock_queryset, attach_stock
+from viewer.models import ItemsOnStock
+from viewer.ratelimit import RateLimitMixin
+from viewer.recommendations import similarities
+
+
+async def aget_user(request):
+    """Vyhodnotí líně načítaného request.user mimo event loop a vrátí ho."""
+    def load():
+        request.user.is_authenticated  # Vynutí načtení uživatele ze session
+        return request.user
+    return await sync_to_async(load)()
+
+
+async def ais_in_group(user, group_name):
+    if not user.is_authenticated:
+        return False
+    names = cached_group_names(user)  # Skupiny načtené už s uživatelem (viewer.auth)
+    if names is not None:
+        return group_name in names
+    return await user.groups.filter(name=group_name).aexists()
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def arender(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+class AsyncTVListView(View):
+    """Asynchronní obdoba TVListView."""
+    template_name = 'television/tv_list.html'
+
+    async def get(self, request):
+        user = await aget_user(request)
+        queryset = filter_catalog(catalog_queryset(), request.GET)
+        televisions = await alist(queryset)
+        stock_items = await alist(stock_queryset(queryset.values('id')))
+        is_tv_admin = await ais_in_group(user, 'tv_admin')
+        return await arender(request, self.template_name, {
+            'object_list': attach_stock(televisions, stock_items),
+            'is_tv_admin': is_tv_admin,
+            'selected_brand': request.GET.getlist('brand'),
+            'selected_technology': request.GET.getlist('technology'),
+            'selected_resolution': request.GET.getlist('resolution'),
+        })
+
+
+class AsyncTVDetailView(View):
+    """Asynchronní obdoba TVDetailView."""
+    template_name = 'television/tv_detail.html'
+
+    async def get(self, request, pk):
+        user = await aget_user(request)
+        television = await catalog_queryset().filter(pk=pk).afirst()
+        if television is None:
+            raise Http404('Televize nenalezena.')
+        item_on_stock = await ItemsOnStock.objects.filter(television_id=pk).afirst()
+        is_tv_admin = await ais_in_group(user, 'tv_admin')
+        similar_televisions = await alist(similarities(pk))
+        return await arender(request, self.template_name, {
+            'object': television,
+            'television': television,
+            'item_on_stock': item_on_stock,
+            'is_tv_admin': is_tv_admin,
+            'similar_televisions': similar_televisions,
+        })
+
+
+class AsyncSearchResultsView(RateLimitMixin, View):
+    """Asynchronní obdoba SearchResultsView."""
+    template_name = 'search_results.html'
+    ratelimit_group = 'search'
+
+    async def get(self, request):
+        search_results = await alist(search_catalog(request.GET.get('q')))
+        return await arender(request, self.template_name, {
+            'search_results': search_results,
+            'object_list': search_results,
+        })
+
+
+class AsyncCartView(View):
+    """Asynchronní obdoba CartView - košík se čte ze session mimo event loop."""
+    template_name = 'order/cart.html'
+
+    async def get(self, request):
+        user = await aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        cart = await sync_to_async(request.session.get)('cart', {})
+
+        # Vypocet celkove ceny a poctu polozek
+        total_price = sum(float(item['price']) * int(item['quantity']) for item in cart.values())
+        total_items = sum(int(item['quantity']) for item in cart.values())
+
+        return await arender(request, self.template_name, {
+            'cart': cart,
+            'total_price': total_price,
+            'total_items': total_items,
+        })
@@ -0,0 +1,41 @@
+"""
+Načtení přihlášeného uživatele včetně profilu a skupin a kontroly rolí bez dalších dotazů.
+
+ProfileModelBackend.get_user (volá ho AuthenticationMiddleware při prvním přístupu k request.user)
+načte uživatele s profilem jedním JOINem a jeho skupiny jedním dalším dotazem. Pohledy, formuláře
+i context processory pak sdílí stejný objekt - user.profile ani kontrola role přes is_in_group
+už do databáze nejdou.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+
+
+class ProfileModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        try:
+            user = User._default_manager.select_related('profile').prefetch_related('groups').get(pk=user_id)
+        except User.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+def cached_group_names(user):
+    """Názvy skupin uživatele, pokud jsou už načtené (prefetch nebo dřívější volání), jinak None."""
+    names = getattr(user, '_group_names', None)
+    if names is None and 'groups' in getattr(user, '_prefetched_objects_cache', {}):
+        names = user._group_names = frozenset(group.name for group in user.groups.all())
+    return names
+
+
+def group_names(user):
+    """Názvy skupin uživatele; načtou se nejvýše jednou za životnost objektu uživatele."""
+    if not user.is_authenticated:
+        return frozenset()
+    names = cached_group_names(user)
+    if names is None:
+        names = user._group_names = frozenset(user.groups.values_list('name', flat=True))
+    return names
+
+
+def is_in_group(user, name):
+    return name in group_names(user)
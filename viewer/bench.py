@@ -0,0 +1,123 @@
+"""Pomocné funkce pro výkonnostní měření (benchmarky v management příkazech)."""
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+
+def percentile(values, pct):
+    """Vrátí pct-tý percentil (0-100) ze seznamu hodnot, pro prázdný seznam 0."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors=0):
+    """
+    Shrne latence (v sekundách) jednoho měření.
+
+    Vrací:
+        dict: počet operací, propustnost za sekundu, počet chyb a percentily p50/p95/p99 v ms.
+    """
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'throughput': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def run_load(operation, concurrency=8, requests=None, duration=None, prepare=None):
+    """
+    Spustí operaci opakovaně ze `concurrency` vláken a změří latence.
+
+    Parametry:
+        operation (callable): Volá se s indexem vlákna; výjimka se počítá jako chyba.
+        prepare (callable): Volá se s indexem vlákna před každou operací, do latence se nepočítá.
+        concurrency (int): Počet souběžných vláken.
+        requests (int): Celkový počet volání (rozdělí se mezi vlákna), nebo
+        duration (float): Délka měření v sekundách.
+
+    Vrací:
+        dict: Výsledek funkce summarize().
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0)
+                  for i in range(concurrency)] if requests else [None] * concurrency
+
+    def worker(index):
+        local, failed, done = [], 0, 0
+        while (per_thread[index] is None or done < per_thread[index]) and \
+                (deadline is None or time.perf_counter() < deadline):
+            try:
+                if prepare is not None:
+                    prepare(index)
+                start = time.perf_counter()
+                operation(index)
+                local.append(time.perf_counter() - start)
+            except Exception:
+                failed += 1
+            done += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, time.perf_counter() - started, errors[0])
+
+
+def compare_results(current, baseline, tolerance=0.2):
+    """
+    Porovná výsledky benchmarku s uloženou baseline a vrátí seznam regresí.
+
+    Výsledky mají tvar {velikost_dat: {scénář: summarize() + 'queries_max'}}. Regresí je
+    p95 latence nebo propustnost horší o více než `tolerance` (poměr) a jakýkoli nárůst počtu
+    dotazů na požadavek. Scénáře, které v baseline chybí, se přeskočí.
+    """
+    regressions = []
+    for size, journeys in current.items():
+        for journey, result in journeys.items():
+            base = baseline.get(size, {}).get(journey)
+            if not base:
+                continue
+            label = f'{size}/{journey}'
+            if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f'{label}: p95 {base["p95_ms"]} ms -> {result["p95_ms"]} ms')
+            if result['throughput'] < base['throughput'] * (1 - tolerance):
+                regressions.append(f'{label}: throughput {base["throughput"]} -> {result["throughput"]} req/s')
+            if (result.get('queries_max') or 0) > (base.get('queries_max') or 0):
+                regressions.append(f'{label}: queries {base.get("queries_max")} -> {result["queries_max"]}')
+            if result['errors'] > base['errors']:
+                regressions.append(f'{label}: errors {base["errors"]} -> {result["errors"]}')
+    return regressions
+
+
+@contextmanager
+def temporary_database():
+    """Dočasná testovací databáze v souboru (sdílí ji vlákna souběžných klientů)."""
+    test_settings = settings.DATABASES['default'].setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    with tempfile.TemporaryDirectory() as directory:
+        test_settings['NAME'] = os.path.join(directory, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = old_test_name
@@ -0,0 +1,212 @@
+"""
+Jednoduchý síťový cache server a cache backend Django pro něj.
+
+Slouží jako lokální náhrada sdílené cache (memcached, Redis) pro vývoj a testy s více
+procesy: `python manage.py run_cache_server` spustí server a backend SocketCache se k němu
+připojí (CACHES LOCATION 'host:port'). Protokol je JSON po řádcích; obecné hodnoty posílá
+klient jako pickle, celá čísla přímo, aby je server uměl atomicky zvyšovat (incr). Operace take
+atomicky odebírá token z token bucketu (sdílený stav omezovače požadavků, viz viewer.ratelimit).
+Server drží nejvýše max_entries položek a při zaplnění zahazuje nejdéle nepoužité (LRU).
+"""
+import base64
+import json
+import pickle
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class LRUStore:
+    """Úložiště serveru - položky s absolutní expirací, LRU výběr při zaplnění."""
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def _store(self, key, value, expires):
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def _take(self, key, rate, burst):
+        # Token bucket: zásoba se doplňuje rychlostí `rate` tokenů/s až do `burst`
+        now = time.time()
+        entry = self._live(key)
+        tokens, stamp = entry[1]['bucket'] if entry and 'bucket' in entry[1] else (burst, now)
+        tokens = min(burst, tokens + (now - stamp) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Plný bucket je totéž co žádný záznam - položka může vypršet
+        self._store(key, {'bucket': [tokens, now]}, now + (burst - tokens) / rate)
+        return {'allowed': allowed, 'retry_after': 0 if allowed else (1 - tokens) / rate}
+
+    def execute(self, command):
+        op, key = command['op'], command.get('key')
+        with self._lock:
+            if op == 'get':
+                entry = self._live(key)
+                return {'value': entry[1] if entry else None}
+            if op == 'set':
+                self._store(key, command['value'], command.get('expires'))
+                return {'ok': True}
+            if op == 'add':
+                if self._live(key):
+                    return {'ok': False}
+                self._store(key, command['value'], command.get('expires'))
+                return {'ok': True}
+            if op == 'touch':
+                entry = self._live(key)
+                if entry:
+                    self._data[key] = (command.get('expires'), entry[1])
+                return {'ok': bool(entry)}
+            if op == 'delete':
+                return {'ok': self._data.pop(key, None) is not None}
+            if op == 'incr':
+                entry = self._live(key)
+                if entry is None or 'int' not in entry[1]:
+                    return {'error': 'missing'}
+                value = {'int': entry[1]['int'] + command['delta']}
+                self._data[key] = (entry[0], value)
+                return {'value': value}
+            if op == 'take':
+                return self._take(key, command['rate'], command['burst'])
+            if op == 'clear':
+                self._data.clear()
+                return {'ok': True}
+        return {'error': f'unknown op {op}'}
+
+
+class CacheRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.store.execute(json.loads(line))
+            except (ValueError, KeyError) as error:
+                response = {'error': str(error)}
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class CacheServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, max_entries=100000):
+        super().__init__(address, CacheRequestHandler)
+        self.store = LRUStore(max_entries)
+
+
+class SocketCache(BaseCache):
+    """Cache backend Django pro CacheServer; každé vlákno má vlastní trvalé spojení."""
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        host, _, port = server.rpartition(':')
+        self._address = (host or '127.0.0.1', int(port))
+        self._timeout = params.get('OPTIONS', {}).get('SOCKET_TIMEOUT', 5)
+        self._local = threading.local()
+
+    def _call(self, **command):
+        for attempt in range(2):
+            stream = getattr(self._local, 'stream', None)
+            try:
+                if stream is None:
+                    connection = socket.create_connection(self._address, timeout=self._timeout)
+                    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                    self._local.connection = connection
+                    stream = self._local.stream = connection.makefile('rwb')
+                stream.write(json.dumps(command).encode() + b'\n')
+                stream.flush()
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError('Cache server closed the connection.')
+                return json.loads(line)
+            except OSError:
+                # Spojení mohl server mezitím zavřít - jeden nový pokus
+                self._disconnect()
+                if attempt:
+                    raise
+
+    @staticmethod
+    def _encode(value):
+        if type(value) is int:
+            return {'int': value}
+        return {'pickle': base64.b64encode(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)).decode()}
+
+    @staticmethod
+    def _decode(value):
+        if 'int' in value:
+            return value['int']
+        return pickle.loads(base64.b64decode(value['pickle']))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._call(op='add', key=key, value=self._encode(value),
+                          expires=self.get_backend_timeout(timeout))['ok']
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self._call(op='get', key=key)['value']
+        return default if value is None else self._decode(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._call(op='set', key=key, value=self._encode(value), expires=self.get_backend_timeout(timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._call(op='touch', key=key, expires=self.get_backend_timeout(timeout))['ok']
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._call(op='delete', key=key)['ok']
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._call(op='get', key=key)['value'] is not None
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        response = self._call(op='incr', key=key, delta=delta)
+        if 'error' in response:
+            raise ValueError("Key '%s' not found" % key)
+        return response['value']['int']
+
+    def take(self, key, rate, burst, version=None):
+        """Atomicky odebere token z token bucketu na serveru; vrací (povoleno, za kolik s to zkusit znovu)."""
+        key = self.make_and_validate_key(key, version=version)
+        response = self._call(op='take', key=key, rate=rate, burst=burst)
+        return response['allowed'], response['retry_after']
+
+    def clear(self):
+        self._call(op='clear')
+
+    def close(self, **kwargs):
+        # Django volá close() po každém požadavku - spojení vlákna se ale drží dál
+        pass
+
+    def _disconnect(self):
+        stream, connection = getattr(self._local, 'stream', None), getattr(self._local, 'connection', None)
+        self._local.stream = self._local.connection = None
+        for resource in (stream, connection):
+            if resource is not None:
+                try:
+                    resource.close()
+                except OSError:
+                    pass
@@ -0,0 +1,70 @@
+"""
+Načítání katalogu televizí - sdílené synchronními i asynchronními pohledy.
+
+Televize se načítají jedním dotazem včetně značky a číselníků (select_related) a skladové
+zásoby celé stránky se doplní druhým dotazem, místo jednoho dotazu na každou televizi.
+"""
+from django.db.models import Q
+
+from viewer.models import Television, ItemsOnStock
+
+CATALOG_RELATED = ('brand', 'display_technology', 'display_resolution', 'operation_system')
+
+
+def catalog_queryset():
+    """Queryset televizí se všemi cizími klíči, které šablony katalogu zobrazují."""
+    return Television.objects.select_related(*CATALOG_RELATED)
+
+
+def filter_catalog(queryset, params):
+    """Filtruje queryset podle GET parametrů brand, technology a resolution (seznam hodnot)."""
+    # Filtrování podle značek
+    selected_brand = params.getlist('brand')
+    if selected_brand:
+        queryset = queryset.filter(brand__brand_name__in=selected_brand)
+
+    # Filtrování podle technologie
+    selected_technology = params.getlist('technology')
+    if selected_technology:
+        queryset = queryset.filter(display_technology__name__in=selected_technology)
+
+    # Filtrování podle rozliseni displeje
+    selected_resolution = params.getlist('resolution')
+    if selected_resolution:
+        queryset = queryset.filter(display_resolution__name__in=selected_resolution)
+    return queryset
+
+
+def search_catalog(query):
+    """Vyhledá televize podle názvu značky, technologie displeje nebo modelu."""
+    if not query:
+        return Television.objects.none()  # Vrací prázdný queryset pokud není žádný k dispozici
+    return catalog_queryset().filter(
+        Q(brand__brand_name__icontains=query) |  # Vyhledávání podle Brand name
+        Q(display_technology__name__icontains=query) |  # Vyhledávání podle Display technology
+        Q(brand_model__icontains=query)  # Vyhledávání podle Brand model
+    )
+
+
+def stock_queryset(televisions):
+    """Skladové zásoby pro televize - seznam instancí nebo queryset (pak jde o poddotaz)."""
+    if not hasattr(televisions, 'query'):
+        televisions = [television.id for television in televisions]
+    return ItemsOnStock.objects.filter(television_id__in=televisions)
+
+
+def attach_stock(televisions, stock_items=None):
+    """
+    Doplní každé televizi atribut item_on_stock (nebo None) jedním dotazem.
+
+    Parametry:
+        televisions (iterable): Televize (queryset se tím vyhodnotí a zůstane v cache).
+        stock_items (iterable): Již načtené zásoby; pokud chybí, načtou se.
+    """
+    televisions = list(televisions)
+    if stock_items is None:
+        stock_items = stock_queryset(televisions)
+    stock = {item.television_id_id: item for item in stock_items}
+    for television in televisions:
+        television.item_on_stock = stock.get(television.id)
+    return televisions
@@ -0,0 +1,91 @@
+"""
+Předpočítané seznamy televizí v kategoriích pro stránky kategorií.
+
+Pro každou kategorii se v cache settings.CATEGORY_CACHE_ALIAS drží název, seřazený seznam id
+televizí, jejich počet a cenové rozpětí; přehled všech kategorií je v cache zvlášť. Stránka
+kategorie tak M2M tabulku nečte vůbec - stránku id rozřízne v Pythonu a televize načte jako
+hlavní katalog (catalog_queryset + attach_stock). Cache se maže po commitu změny členství
+(signál m2m_changed), ceny televize, smazání televize nebo kategorie.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Max, Min
+
+from viewer.models import Category, Television
+
+OVERVIEW_KEY = 'categories:overview'
+
+
+def category_key(category_id):
+    return f'categories:{category_id}'
+
+
+def _cache():
+    return caches[settings.CATEGORY_CACHE_ALIAS]
+
+
+def category_overview():
+    """Všechny kategorie s počtem televizí a cenovým rozpětím: [{'id', 'name', 'count', 'min_price', 'max_price'}]."""
+    overview = _cache().get(OVERVIEW_KEY)
+    if overview is None:
+        overview = list(Category.objects.order_by('name')
+                        .annotate(count=Count('televisions'), min_price=Min('televisions__price'),
+                                  max_price=Max('televisions__price'))
+                        .values('id', 'name', 'count', 'min_price', 'max_price'))
+        _cache().set(OVERVIEW_KEY, overview, settings.CATEGORY_CACHE_TIMEOUT)
+    return overview
+
+
+def category_summary(category_id):
+    """
+    Souhrn kategorie z cache, případně spočítaný dvěma dotazy.
+
+    Vrací:
+        dict: 'id', 'name', 'ids' (id televizí seřazená podle značky a modelu), 'count',
+        'min_price', 'max_price'; None pro neexistující kategorii
+    """
+    key = category_key(category_id)
+    summary = _cache().get(key)
+    if summary is None:
+        category = Category.objects.filter(pk=category_id).values('id', 'name').first()
+        if category is None:
+            return None
+        rows = list(Television.objects.filter(categories=category_id)
+                    .order_by('brand__brand_name', 'brand_model', 'pk').values_list('pk', 'price'))
+        prices = [price for _, price in rows]
+        summary = {**category, 'ids': [pk for pk, _ in rows], 'count': len(rows),
+                   'min_price': min(prices, default=None), 'max_price': max(prices, default=None)}
+        _cache().set(key, summary, settings.CATEGORY_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_categories(category_ids):
+    """Po commitu smaže souhrny kategorií a přehled (v autocommitu hned)."""
+    keys = [category_key(category_id) for category_id in set(category_ids)] + [OVERVIEW_KEY]
+    transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """m2m_changed na Television.categories - z obou stran vztahu i pro clear()."""
+    if action == 'pre_clear':
+        # Po clear() už nejde zjistit, které vazby existovaly
+        instance._cleared_category_ids = (
+            [instance.pk] if reverse else list(instance.categories.values_list('pk', flat=True)))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_categories([instance.pk] if reverse else pk_set)
+    elif action == 'post_clear':
+        invalidate_categories(getattr(instance, '_cleared_category_ids', []))
+
+
+def television_changed(sender, instance, raw=False, **kwargs):
+    """post_save a pre_delete televize - mění se cena, pořadí nebo členství v jejích kategoriích."""
+    if not raw and instance.pk is not None:
+        category_ids = list(instance.categories.values_list('pk', flat=True))
+        if category_ids:
+            invalidate_categories(category_ids)
+
+
+def category_changed(sender, instance, **kwargs):
+    """post_save a post_delete kategorie."""
+    invalidate_categories([instance.pk])
@@ -0,0 +1,139 @@
+"""
+Komprese odpovědí gzip nebo Brotli (viewer.middleware.CompressionMiddleware).
+
+Kódování se vybírá podle Accept-Encoding (Brotli jen s nainstalovaným balíčkem `brotli`).
+Komprimují se jen textové typy (HTML, JSON, CSV, JS, CSS, SVG...) - obrázky, PDF a odpovědi
+s vlastním Content-Encoding (předkomprimované statické soubory) ne, stejně jako části souborů
+(206). Streamované odpovědi se komprimují po blocích a každý blok se hned odešle (sync flush),
+nic se nebufferuje celé. Zkomprimovaná těla veřejných odpovědí (požadavek bez session cookie,
+odpověď bez cookies a bez Cache-Control private/no-store) se ukládají do cache
+settings.COMPRESSION_CACHE_ALIAS pod otiskem obsahu - stejná stránka (např. katalog pro
+nepřihlášené) se tak komprimuje jen jednou. Stránky přihlášených se skoro neopakují, ty se
+komprimují rovnou bez hashování a zápisu do cache.
+"""
+import hashlib
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+
+from viewer.fileserving import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # volitelná závislost
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+                      'application/xhtml+xml', 'image/svg+xml')
+
+
+def negotiate_encoding(request):
+    accepted = accepted_encodings(request)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+class Compressor:
+    """Proudový kompresor; level None = settings.COMPRESSION_GZIP_LEVEL / COMPRESSION_BROTLI_QUALITY."""
+
+    def __init__(self, encoding, level=None):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY if level is None
+                                                 else level)
+        else:
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL if level is None else level,
+                                                zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data, flush=False):
+        """Zkomprimuje blok; s flush=True vrátí vše potřebné k dekompresi dosavadních dat."""
+        if self.encoding == 'br':
+            output = self._compressor.process(data)
+            return output + self._compressor.flush() if flush else output
+        output = self._compressor.compress(data)
+        return output + self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else output
+
+    def finish(self):
+        return self._compressor.finish() if self.encoding == 'br' else self._compressor.flush()
+
+
+def compress_body(content, encoding, level=None):
+    compressor = Compressor(encoding, level)
+    return compressor.compress(content) + compressor.finish()
+
+
+def compress_stream(chunks, encoding, level=None):
+    compressor = Compressor(encoding, level)
+    for chunk in chunks:
+        data = compressor.compress(chunk, flush=True)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def cache_key(content, encoding):
+    level = settings.COMPRESSION_BROTLI_QUALITY if encoding == 'br' else settings.COMPRESSION_GZIP_LEVEL
+    return f'compressed:{encoding}:{level}:{hashlib.sha1(content).hexdigest()}'
+
+
+def cached_compress(content, encoding):
+    """Zkomprimované tělo z cache nebo nově zkomprimované (velká těla se do cache neukládají)."""
+    if len(content) > settings.COMPRESSION_CACHE_MAX_SIZE:
+        return compress_body(content, encoding)
+    cache = caches[settings.COMPRESSION_CACHE_ALIAS]
+    key = cache_key(content, encoding)
+    compressed = cache.get(key)
+    if compressed is None:
+        compressed = compress_body(content, encoding)
+        cache.set(key, compressed, settings.COMPRESSION_CACHE_TIMEOUT)
+    return compressed
+
+
+def is_shared(request, response):
+    """Může stejné tělo dostat i jiný klient? (Jen takové má smysl ukládat do cache.)"""
+    if settings.SESSION_COOKIE_NAME in request.COOKIES or response.cookies:
+        return False
+    cache_control = response.get('Cache-Control', '').lower()
+    return 'private' not in cache_control and 'no-store' not in cache_control
+
+
+def is_compressible(response):
+    if response.has_header('Content-Encoding') or response.has_header('Content-Range'):
+        return False
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    if not content_type.startswith(COMPRESSIBLE_TYPES):
+        return False
+    return response.streaming or len(response.content) >= settings.COMPRESSION_MIN_SIZE
+
+
+def compress_response(request, response):
+    if not settings.COMPRESSION_ENABLED or not is_compressible(response):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return response
+    if response.streaming:
+        response.streaming_content = compress_stream(response.streaming_content, encoding)
+        if response.has_header('Content-Length'):
+            del response.headers['Content-Length']
+    else:
+        if is_shared(request, response):
+            compressed = cached_compress(response.content, encoding)
+        else:
+            compressed = compress_body(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+    # Zkomprimované tělo už není bajtově shodné s původním
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    response['Content-Encoding'] = encoding
+    return response
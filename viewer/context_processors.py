@@ -1,5 +1,8 @@
+from viewer.auth import is_in_group
+
+
 def stock_admin_context(request):
-    stock_admin = request.user.groups.filter(name='stock_admin').exists()
+    stock_admin = is_in_group(request.user, 'stock_admin')
     return {
         'stock_admin': stock_admin,
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,237 @@
+"""
+Generátor syntetických dat pro zátěžové testy a benchmarky.
+
+Vytváří značky, číselníky, kategorie, televize se zásobami, uživatele s profily, objednávky
+a jejich položky v nastavitelných objemech. Výsledek je pro stejný seed, objemy a referenční datum
+vždy stejný - roky výroby i data objednávek se počítají od referenčního data, ne od dneška.
+Zápisy jdou po dávkách přes bulk_create, hashování hesel (PBKDF2 je záměrně pomalé) běží
+v procesním poolu.
+"""
+import datetime
+import random
+import string
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from viewer.models import (Brand, Category, ItemsOnStock, Order, OrderItem, Profile, StockMovement, Television,
+                           TVDisplayResolution, TVDisplayTechnology, TVOperationSystem)
+
+DEFAULT_VOLUMES = {
+    'brands': 20,
+    'categories': 12,
+    'televisions': 2000,
+    'users': 1000,
+    'orders': 10000,
+    'max_items': 4,  # max. počet položek v jedné objednávce
+    'days': 730,  # přes kolik dní do minulosti se rozprostřou objednávky
+}
+
+TECHNOLOGIES = ['LED', 'OLED', 'QLED', 'Mini LED', 'NanoCell']
+RESOLUTIONS = ['HD Ready', 'Full HD', '4K Ultra HD', '8K Ultra HD']
+OPERATION_SYSTEMS = ['Android TV', 'Tizen', 'webOS', 'Google TV', 'Linux']
+SCREEN_SIZES = [32, 40, 43, 50, 55, 65, 75, 85]
+REFRESH_RATES = [50, 60, 100, 120, 144]
+CITIES = ['Praha', 'Brno', 'Ostrava', 'Plzeň', 'Olomouc', 'Liberec', 'Zlín', 'Pardubice']
+FIRST_NAMES = ['Jan', 'Petr', 'Eva', 'Jana', 'Tomáš', 'Lucie', 'Martin', 'Tereza']
+LAST_NAMES = ['Novák', 'Svoboda', 'Dvořák', 'Černý', 'Procházka', 'Kučera', 'Veselý', 'Horák']
+
+# Rozložení stavů objednávek - většina historie je dokončená
+STATUS_WEIGHTS = {
+    'submitted': 4, 'pending_payment': 2, 'processing': 4, 'on_hold': 1, 'dispatched': 4,
+    'delivered': 10, 'cancelled': 5, 'refunded': 2, 'returned': 1, 'completed': 67,
+}
+
+SALT_CHARS = string.ascii_letters + string.digits
+
+# Výchozí referenční datum - nejnovější rok výroby a konec období, přes které se rozprostřou objednávky
+REFERENCE_DATE = datetime.date(2026, 1, 1)
+
+
+def _rng(seed, component):
+    """Samostatný deterministický generátor pro každou část dat."""
+    return random.Random(f'{seed}:{component}')
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _init_worker():
+    # Při spuštění procesů metodou spawn je nutné Django nakonfigurovat znovu
+    django.setup()
+
+
+def _hash_chunk(args):
+    password, salts = args
+    return [make_password(password, salt) for salt in salts]
+
+
+def hash_passwords(password, count, seed, workers=None, chunk_size=50):
+    """Vrátí `count` hashů hesla s deterministickými solemi, spočtených v procesním poolu."""
+    rng = _rng(seed, 'salts')
+    salts = [''.join(rng.choices(SALT_CHARS, k=22)) for _ in range(count)]
+    if workers == 1 or count <= chunk_size:
+        return _hash_chunk((password, salts))
+    chunks = [(password, chunk) for chunk in _batches(salts, chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return [hashed for result in pool.map(_hash_chunk, chunks) for hashed in result]
+
+
+@contextmanager
+def explicit_order_dates():
+    """Dočasně vypne auto_now_add u Order.order_date, aby šlo objednávky rozprostřít v čase."""
+    field = Order._meta.get_field('order_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def _lookup(model, names, field='name'):
+    return [model.objects.get_or_create(**{field: name})[0] for name in names]
+
+
+def generate_catalog(volumes, seed, batch_size, reference_date=REFERENCE_DATE):
+    """Vytvoří číselníky, značky, kategorie, televize a jejich skladové zásoby."""
+    rng = _rng(seed, 'catalog')
+    technologies = _lookup(TVDisplayTechnology, TECHNOLOGIES)
+    resolutions = _lookup(TVDisplayResolution, RESOLUTIONS)
+    systems = _lookup(TVOperationSystem, OPERATION_SYSTEMS)
+    brands = _lookup(Brand, [f'Brand {i:03d}' for i in range(volumes['brands'])], field='brand_name')
+    categories = [Category.objects.get_or_create(name=f'Kategorie {i:02d}')[0]
+                  for i in range(volumes['categories'])]
+
+    televisions = [Television(
+        brand=rng.choice(brands),
+        brand_model=f'S{seed}-{i:07d}',
+        tv_released_year=rng.randint(2015, reference_date.year),
+        tv_screen_size=rng.choice(SCREEN_SIZES),
+        smart_tv=rng.random() < 0.85,
+        refresh_rate=rng.choice(REFRESH_RATES),
+        display_technology=rng.choice(technologies),
+        display_resolution=rng.choice(resolutions),
+        operation_system=rng.choice(systems),
+        description=f'Syntetická televize {i} pro zátěžové testy.',
+        price=Decimal(rng.randrange(4990, 99990, 100)),
+    ) for i in range(volumes['televisions'])]
+    for batch in _batches(televisions, batch_size):
+        Television.objects.bulk_create(batch)
+
+    through = Television.categories.through
+    links = [through(television_id=television.pk, category_id=category.pk)
+             for television in televisions
+             for category in rng.sample(categories, k=min(len(categories), rng.randint(0, 3)))]
+    through.objects.bulk_create(links, batch_size=batch_size)
+
+    stock = [ItemsOnStock(television_id=television, quantity=rng.randint(1, 200)) for television in televisions]
+    ItemsOnStock.objects.bulk_create(stock, batch_size=batch_size)
+    # bulk_create neposílá signály - příjem do knihy skladových pohybů se zapíše zvlášť
+    StockMovement.objects.bulk_create(
+        [StockMovement(television=item.television_id, kind='receipt', delta=item.quantity) for item in stock],
+        batch_size=batch_size)
+    return televisions
+
+
+def generate_users(volumes, seed, batch_size, workers, password):
+    """Vytvoří uživatele s profily; hesla se hashují v procesním poolu."""
+    rng = _rng(seed, 'users')
+    count = volumes['users']
+    hashes = hash_passwords(password, count, seed, workers=workers)
+    users = [User(
+        username=f'load{seed}_{i:07d}',
+        email=f'load{seed}_{i:07d}@example.com',
+        password=hashes[i],
+        first_name=rng.choice(FIRST_NAMES),
+        last_name=rng.choice(LAST_NAMES),
+    ) for i in range(count)]
+    for batch in _batches(users, batch_size):
+        User.objects.bulk_create(batch)
+    Profile.objects.bulk_create([Profile(
+        user=user,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        address=f'Ulice {rng.randint(1, 999)}',
+        city=rng.choice(CITIES),
+        zipcode=f'{rng.randint(10000, 79999)}',
+        phone_number=f'+420{rng.randint(600000000, 799999999)}',
+        communication_channel=rng.choice(['Pošta', 'Email', 'Telefon']),
+    ) for user in users], batch_size=batch_size)
+    return users
+
+
+def generate_orders(volumes, seed, batch_size, users, televisions, progress=None, reference_date=REFERENCE_DATE):
+    """Vytvoří objednávky a jejich položky po dávkách (každá dávka v jedné transakci)."""
+    rng = _rng(seed, 'orders')
+    statuses, weights = zip(*STATUS_WEIGHTS.items())
+    end = datetime.datetime.combine(reference_date, datetime.time(), tzinfo=datetime.timezone.utc)
+    history = datetime.timedelta(days=volumes['days']).total_seconds()
+    created = 0
+    with explicit_order_dates():
+        while created < volumes['orders']:
+            size = min(batch_size, volumes['orders'] - created)
+            orders, items = [], []
+            for _ in range(size):
+                user = rng.choice(users)
+                order = Order(
+                    order_id=uuid.UUID(int=rng.getrandbits(128), version=4),
+                    user=user,
+                    order_date=end - datetime.timedelta(seconds=rng.random() * history),
+                    first_name=user.first_name,
+                    last_name=user.last_name,
+                    address=f'Ulice {rng.randint(1, 999)}',
+                    city=rng.choice(CITIES),
+                    zipcode=f'{rng.randint(10000, 79999)}',
+                    status=rng.choices(statuses, weights)[0],
+                )
+                order_items = [(rng.choice(televisions), rng.randint(1, 3))
+                               for _ in range(rng.randint(1, volumes['max_items']))]
+                order.price = sum(television.price * quantity for television, quantity in order_items)
+                orders.append(order)
+                items.append(order_items)
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                OrderItem.objects.bulk_create([
+                    OrderItem(order=order, television=television, quantity=quantity, unit_price=television.price)
+                    for order, order_items in zip(orders, items)
+                    for television, quantity in order_items
+                ])
+            created += size
+            if progress:
+                progress(created)
+    return created
+
+
+def generate(volumes=None, seed=0, batch_size=5000, workers=None, password='heslo1234', progress=None,
+             reference_date=REFERENCE_DATE):
+    """
+    Vygeneruje celou sadu dat.
+
+    Parametry:
+        volumes (dict): Objemy (klíče viz DEFAULT_VOLUMES), chybějící se doplní výchozími.
+        seed (int): Seed - stejný seed, objemy a referenční datum dají stejná data.
+        batch_size (int): Velikost dávky pro bulk_create.
+        workers (int): Počet procesů pro hashování hesel (None = počet CPU).
+        password (str): Heslo všech vygenerovaných uživatelů.
+        progress (callable): Volá se s počtem dosud vytvořených objednávek.
+        reference_date (datetime.date): Den, ke kterému se data generují (objednávky končí před ním).
+
+    Návratová hodnota:
+        dict: Počty vytvořených záznamů.
+    """
+    volumes = {**DEFAULT_VOLUMES, **(volumes or {})}
+    with transaction.atomic():
+        televisions = generate_catalog(volumes, seed, batch_size, reference_date)
+    with transaction.atomic():
+        users = generate_users(volumes, seed, batch_size, workers, password)
+    orders = (generate_orders(volumes, seed, batch_size, users, televisions, progress, reference_date)
+              if users and televisions else 0)
+    return {'televisions': len(televisions), 'users': len(users), 'orders': orders}
@@ -0,0 +1,77 @@
+import sqlite3
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def set_pragmas(raw_connection, pragmas):
+    """
+    Nastaví PRAGMA na surovém spojení sqlite3.
+
+    Parametry:
+        raw_connection (sqlite3.Connection): Spojení, na kterém se PRAGMA nastaví.
+        pragmas (dict): Název PRAGMA -> hodnota (např. {'journal_mode': 'WAL'}).
+    """
+    for name, value in pragmas.items():
+        raw_connection.execute(f'PRAGMA {name} = {value}')
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Příjemce signálu connection_created - aplikuje settings.SQLITE_PRAGMAS na nové spojení."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if pragmas:
+        set_pragmas(connection.connection, pragmas)
+
+
+def copy_sqlite_database(source_path, target_path, pages=1024):
+    """
+    Zkopíruje databázi SQLite do cílového souboru přes online backup API.
+
+    Kopie je konzistentní snímek i při souběžných zápisech do zdroje; kopíruje se po dávkách
+    `pages` stránek, aby zdroj nebyl blokován po celou dobu kopírování.
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target, pages=pages)
+    finally:
+        target.close()
+        source.close()
+
+
+def refresh_sqlite_replica(replica_alias, source_alias=DEFAULT_DB_ALIAS):
+    """Obnoví repliku (alias z settings.DATABASES) ze zdrojové databáze přes backup API."""
+    databases = settings.DATABASES
+    for alias in (replica_alias, source_alias):
+        if databases[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+            raise ValueError(f'Database "{alias}" is not an SQLite database.')
+    connections[replica_alias].close()
+    copy_sqlite_database(databases[source_alias]['NAME'], databases[replica_alias]['NAME'])
+
+
+def estimated_row_count(model, using=DEFAULT_DB_ALIAS):
+    """
+    Odhad počtu řádků tabulky modelu bez COUNT(*) přes celou tabulku.
+
+    PostgreSQL a MySQL čtou statistiku z katalogu; u SQLite je odhadem nejvyšší primární klíč
+    (jeden krok v indexu - smazané řádky odhad nadsazují, poslední stránky pak mohou být prázdné).
+    Vrací None, pokud odhad není k dispozici.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [table])
+        elif connection.vendor == 'mysql':
+            cursor.execute('SELECT table_rows FROM information_schema.tables '
+                           'WHERE table_schema = DATABASE() AND table_name = %s', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'SELECT MAX({connection.ops.quote_name(model._meta.pk.column)}) '
+                           f'FROM {connection.ops.quote_name(table)}')
+            return cursor.fetchone()[0] or 0
+        else:
+            return None
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
@@ -0,0 +1,178 @@
+"""
+Servírování souborů z disku aplikací: podmíněné požadavky (ETag, Last-Modified), požadavky
+na část souboru (Range), výběr předkomprimované varianty (.br, .gz vedle původního souboru)
+podle hlavičky Accept-Encoding a předání přenosu front-end serveru (X-Sendfile, X-Accel-Redirect).
+"""
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+# Kódování předkomprimovaných variant a jejich přípony, v pořadí preference
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def resolve_path(root, name):
+    """Cesta k souboru `name` uvnitř adresáře `root`; mimo něj nebo neexistující soubor -> 404."""
+    try:
+        path = safe_join(root, name)
+    except (SuspiciousFileOperation, ValueError):
+        raise Http404('File not found.')
+    if not os.path.isfile(path):
+        raise Http404('File not found.')
+    return path
+
+
+def accepted_encodings(request):
+    """Kódování, která klient podle Accept-Encoding přijme (s nenulovou vahou q)."""
+    accepted = set()
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding.strip() and quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def precompressed_variant(request, path):
+    """Vrátí (cesta, kódování) nejlepší existující varianty souboru, kterou klient přijme."""
+    accepted = accepted_encodings(request)
+    for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+        if encoding in accepted and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+
+def file_etag(stat):
+    return quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+
+
+def parse_range(header, size):
+    """
+    Rozsah bajtů (začátek, konec včetně) z hlavičky Range.
+
+    Vrací None, když se má poslat celý soubor (jiné jednotky, více rozsahů nebo neplatná hlavička -
+    RFC 9110 dovoluje takový Range ignorovat), a vyhodí RangeNotSatisfiable pro rozsah mimo soubor.
+    """
+    unit, _, spec = header.partition('=')
+    first, separator, last = spec.strip().partition('-')
+    if unit.strip().lower() != 'bytes' or ',' in spec or not separator:
+        return None
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            suffix = int(last)
+            if suffix == 0:
+                raise RangeNotSatisfiable
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def read_range(file, start, length):
+    """Iterátor po blocích přes `length` bajtů souboru od pozice `start`; soubor na konci zavře."""
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def range_response(request, path, stat, content_type, etag):
+    """206 nebo 416 odpověď na Range požadavek; None, když se má poslat celý soubor."""
+    header = request.META.get('HTTP_RANGE')
+    if not header or request.method not in ('GET', 'HEAD'):
+        return None
+    # If-Range: část souboru jen tehdy, když má klient pořád stejnou verzi
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range not in (etag, http_date(stat.st_mtime)):
+        return None
+    try:
+        byte_range = parse_range(header, stat.st_size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if byte_range is None:
+        return None
+    start, end = byte_range
+    response = StreamingHttpResponse(read_range(open(path, 'rb'), start, end - start + 1),
+                                     status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Content-Length'] = end - start + 1
+    return response
+
+
+def sendfile_response(path, name, content_type, cache_control):
+    """
+    Prázdná odpověď, se kterou soubor pošle front-end server (settings.MEDIA_SENDFILE).
+
+    'x-sendfile' (Apache mod_xsendfile, lighttpd) dostane absolutní cestu, 'x-accel-redirect' (nginx)
+    URI interní location settings.MEDIA_ACCEL_REDIRECT_PREFIX + název souboru. Podmíněné požadavky
+    a Range pak obsluhuje front-end server, pracovní proces Pythonu soubor vůbec nečte.
+    """
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-sendfile':
+        response['X-Sendfile'] = path
+    elif settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+    else:
+        raise ValueError(f'Unknown MEDIA_SENDFILE mode {settings.MEDIA_SENDFILE!r}.')
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def serve_file(request, path, cache_control, precompressed=False):
+    """
+    Odpověď se souborem `path` (musí existovat).
+
+    Na podmíněný požadavek s odpovídajícím ETag nebo Last-Modified vrátí 304 bez těla, na Range
+    požadavek 206 s částí souboru (nebo 416). S precompressed=True pošle předkomprimovanou variantu
+    podle Accept-Encoding (Content-Type zůstává podle původního souboru) a přidá Vary: Accept-Encoding.
+    """
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    served_path, encoding = precompressed_variant(request, path) if precompressed else (path, None)
+    stat = os.stat(served_path)
+    etag = file_etag(stat)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = (range_response(request, served_path, stat, content_type, etag) or
+                    FileResponse(open(served_path, 'rb'), content_type=content_type))
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    if precompressed:
+        patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -4,6 +4,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm, PasswordChangeForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 
 from viewer.models import Profile, Television, Order, Brand, ItemsOnStock, TVDisplayTechnology, \
@@ -179,28 +180,49 @@ class TVOperationSystemDeleteForm(forms.Form):
         empty_label="Vybrat")
 
 
+class TelevisionSearchWidget(forms.Select):
+    """
+    Výběr televize s vyhledáváním na serveru (static/js/television_search.js).
+
+    Místo všech televizí vykreslí jen vybranou (jedním dotazem se značkou), další se
+    dohledávají přes JSON endpoint television_lookup podle prefixu značky nebo modelu.
+    """
+
+    class Media:
+        js = ('js/television_search.js',)
+
+    def __init__(self, attrs=None):
+        super().__init__(attrs={'data-search-url': reverse_lazy('television_lookup'), **(attrs or {})})
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [pk for pk in value if pk and str(pk).isdigit()]
+        televisions = Television.objects.select_related('brand').filter(pk__in=selected) if selected else []
+        self.choices = [('', '---------')] + [(television.pk, str(television)) for television in televisions]
+        return super().optgroups(name, value, attrs)
+
+
 class ItemOnStockForm(forms.ModelForm):
+    # Počet kusů, který uživatel ve formuláři viděl - úprava se uloží jako rozdíl proti němu (viewer.stock.adjust)
+    expected_quantity = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
     class Meta:
         model = ItemsOnStock
         fields = '__all__'
+        widgets = {'television_id': TelevisionSearchWidget}
 
-    """Definujeme si co chceme za chybovou hlášku v případě, že přidáváme na sklad existující komponentu"""
-
-    def clean(self):
-        cleaned_data = super().clean()
-        television_id = cleaned_data.get('television_id')
-
-        # Pokud je instance (tedy jde o update) a není zde konflikt s jiným záznamem
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
         if self.instance.pk:
-            existing_item = ItemsOnStock.objects.filter(television_id=television_id).exclude(pk=self.instance.pk)
-            if existing_item.exists():
-                raise ValidationError('Tato položka již je na skladě.')
-        else:
-            # Kontrola pro nový záznam
-            if ItemsOnStock.objects.filter(television_id=television_id).exists():
-                raise ValidationError('Tato položka již je na skladě.')
-
-        return cleaned_data
+            # Existující zásobu nelze převést na jinou televizi - kniha pohybů by nesouhlasila
+            self.fields['television_id'].disabled = True
+            self.fields['expected_quantity'].initial = self.instance.quantity
+
+    def quantity_delta(self):
+        """O kolik kusů uživatel počet změnil proti stavu, který viděl."""
+        expected = self.cleaned_data.get('expected_quantity')
+        if expected is None:
+            expected = self.initial.get('quantity', 0)
+        return self.cleaned_data['quantity'] - expected
 
 
 class OrderForm(forms.ModelForm):
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from viewer.archive import archivable_orders, archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    """
+    Přesune staré uzavřené objednávky do archivních tabulek (viz viewer.archive).
+
+    Každá dávka je samostatná transakce, příkaz lze proto kdykoli přerušit a spustit znovu.
+    Spouštějte pravidelně (cron), aby provozní tabulka objednávek nerostla.
+    """
+    help = 'Archivuje dokončené, zrušené a refundované objednávky starší než zadaný počet dní.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Stáří objednávek ve dnech (výchozí settings.ORDER_ARCHIVE_AFTER_DAYS).')
+        parser.add_argument('--batch-size', type=int,
+                            help='Objednávek na jednu transakci (výchozí settings.ORDER_ARCHIVE_BATCH_SIZE).')
+        parser.add_argument('--dry-run', action='store_true', help='Jen vypíše, kolik objednávek by se archivovalo.')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = archivable_orders(archive_cutoff(options['days'])).count()
+            self.stdout.write(f'{count} orders would be archived.')
+            return
+
+        started = time.perf_counter()
+
+        def progress(archived):
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  archived batch of {archived} orders')
+
+        count = archive_orders(options['days'], options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {count} orders in {time.perf_counter() - started:.1f} s.'))
@@ -0,0 +1,80 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from viewer import compression
+from viewer.bench import temporary_database
+from viewer.datagen import generate
+
+# Porovnávané úrovně komprese: (kódování, úroveň)
+LEVELS = [('gzip', 1), ('gzip', 6), ('gzip', 9), ('br', 4), ('br', 5), ('br', 11)]
+
+STREAM_CHUNK_SIZE = 4096
+
+
+class Command(BaseCommand):
+    """
+    CPU cena komprese odpovědí proti ušetřeným bajtům.
+
+    Vykreslí typické stránky (katalog, filtrovaný katalog, vyhledávání, JSON vyhledávání televizí)
+    bez komprese a každé tělo opakovaně zkomprimuje pro několik úrovní gzip a Brotli - celé
+    najednou i po blocích jako streamovanou odpověď (sync flush po každém bloku). Nakonec změří,
+    kolik stojí zkomprimované tělo z cache (otisk obsahu a čtení z cache).
+    """
+    help = 'Změří CPU čas komprese odpovědí a ušetřené bajty pro gzip a Brotli.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=50, help='Počet komprimací každého těla.')
+
+    def handle(self, *args, **options):
+        levels = [(encoding, level) for encoding, level in LEVELS if encoding == 'gzip' or compression.brotli]
+        if compression.brotli is None:
+            self.stdout.write('brotli is not installed, measuring gzip only.')
+
+        with temporary_database(), override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'],
+                                                     COMPRESSION_ENABLED=False):
+            generate({'televisions': 500, 'users': 5, 'orders': 20})
+            client = Client()
+            client.force_login(User.objects.create_superuser(username='bench', password='heslo1234'))
+            bodies = {
+                'tv_list': client.get(reverse('tv_list')).content,
+                'tv_list_filtered': client.get(reverse('tv_list'), {'technology': ['OLED', 'QLED']}).content,
+                'search_results': client.get(reverse('search_results'), {'q': 'S0'}).content,
+                'lookup_json': client.get(reverse('television_lookup'), {'q': 'S'}).content,
+            }
+
+        repeat = options['repeat']
+        self.stdout.write(f'{"page":18} {"level":8} {"bytes":>17} {"saved":>6} {"cpu ms":>8} '
+                          f'{"MB/s":>6} {"stream":>8} {"stream ms":>9}')
+        for page, body in bodies.items():
+            for encoding, level in levels:
+                started = time.process_time()
+                for _ in range(repeat):
+                    compressed = compression.compress_body(body, encoding, level)
+                cpu = (time.process_time() - started) / repeat
+                chunks = [body[i:i + STREAM_CHUNK_SIZE] for i in range(0, len(body), STREAM_CHUNK_SIZE)]
+                started = time.process_time()
+                for _ in range(repeat):
+                    streamed = b''.join(compression.compress_stream(chunks, encoding, level))
+                stream_cpu = (time.process_time() - started) / repeat
+                self.stdout.write(
+                    f'{page:18} {encoding}-{level:<3} {len(body):>8}→{len(compressed):>8} '
+                    f'{1 - len(compressed) / len(body):>6.1%} {cpu * 1000:>8.3f} '
+                    f'{len(body) / cpu / 1e6 if cpu else 0:>6.0f} {len(streamed):>8} {stream_cpu * 1000:>9.3f}')
+
+        with override_settings(COMPRESSION_CACHE_ALIAS='bench_compression',
+                               CACHES={'bench_compression': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            for page, body in bodies.items():
+                if len(body) > settings.COMPRESSION_CACHE_MAX_SIZE:
+                    self.stdout.write(f'{page:18} not cached (larger than COMPRESSION_CACHE_MAX_SIZE)')
+                    continue
+                compression.cached_compress(body, 'gzip')
+                started = time.process_time()
+                for _ in range(repeat):
+                    compression.cached_compress(body, 'gzip')
+                cached = (time.process_time() - started) / repeat
+                self.stdout.write(f'{page:18} cached gzip body {cached * 1000:.3f} ms per response')
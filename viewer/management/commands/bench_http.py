@@ -0,0 +1,60 @@
+import http.client
+import threading
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from viewer.bench import run_load
+
+
+class Command(BaseCommand):
+    """
+    HTTP zátěžový test běžících serverů - porovnání WSGI a ASGI nasazení.
+
+    Servery se spouští zvlášť, například:
+        gunicorn OnlineShop.wsgi --threads 8 -b 127.0.0.1:8000
+        ONLINESHOP_ASYNC_VIEWS=1 uvicorn OnlineShop.asgi:application --port 8001
+    a pak:
+        python manage.py bench_http --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001
+    """
+    help = 'Změří req/s a percentily latence (p50/p95/p99) pro zadané servery a cesty.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True,
+                            help='Server ve tvaru jmeno=http://host:port (lze opakovat).')
+        parser.add_argument('--path', action='append',
+                            help='Měřená cesta (lze opakovat, výchozí: seznam, detail, vyhledávání).')
+        parser.add_argument('--concurrency', type=int, default=16, help='Počet souběžných klientů.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Délka měření jedné cesty v sekundách.')
+
+    def handle(self, *args, **options):
+        paths = options['path'] or ['/tv/list/', '/tv/1', '/search/?q=LG']
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f'Invalid target "{target}", expected name=url.')
+            for path in paths:
+                result = run_load(self._requester(url, path), concurrency=options['concurrency'],
+                                  duration=options['duration'])
+                self.stdout.write(f'{name:8} {path:30} {result}')
+
+    @staticmethod
+    def _requester(url, path):
+        parts = urlsplit(url)
+        local = threading.local()
+
+        def request(index):
+            # Každé vlákno drží vlastní keep-alive spojení
+            if getattr(local, 'connection', None) is None:
+                local.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            try:
+                local.connection.request('GET', path)
+                response = local.connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                local.connection.close()
+                local.connection = None
+                raise
+            if response.status >= 500:
+                raise RuntimeError(f'HTTP {response.status}')
+        return request
@@ -0,0 +1,152 @@
+import datetime
+import json
+import logging
+import random
+import re
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from viewer.bench import compare_results, run_load, temporary_database
+from viewer.datagen import generate
+from viewer.models import Order, Television
+
+# Předdefinované velikosti dat (doplní se výchozími objemy z viewer.datagen)
+SIZES = {
+    'small': {'televisions': 200, 'users': 50, 'orders': 2000},
+    'medium': {'televisions': 2000, 'users': 200, 'orders': 50000},
+    'large': {'televisions': 20000, 'users': 1000, 'orders': 500000},
+}
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Command(BaseCommand):
+    """
+    Výkonnostní benchmark hlavních uživatelských scénářů.
+
+    Pro každou velikost dat vytvoří dočasnou databázi, naplní ji generátorem (viewer.datagen)
+    a scénáře (domovská stránka, seznam s filtry, detail, vyhledávání, přidání do košíku,
+    checkout, seznam objednávek, PDF objednávky) spustí přes Django test client ze souběžných
+    vláken. Měří percentily latence, propustnost a počet SQL dotazů (z hlavičky Server-Timing).
+    Výsledek uloží do JSON a volitelně porovná s baseline - při regresi skončí chybou.
+    """
+    help = 'Změří latenci, propustnost a počet dotazů hlavních scénářů při několika velikostech dat.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small',
+                            help=f'Velikosti dat oddělené čárkou ({", ".join(SIZES)}).')
+        parser.add_argument('--requests', type=int, default=200, help='Počet požadavků na scénář.')
+        parser.add_argument('--concurrency', type=int, default=4, help='Počet souběžných klientů.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed generátoru dat.')
+        parser.add_argument('--output', default='bench_results.json', help='Soubor pro výsledky (JSON).')
+        parser.add_argument('--baseline', help='JSON s baseline, se kterou se výsledky porovnají.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Povolené zhoršení latence a propustnosti (poměr, výchozí 0.2 = 20 %%).')
+
+    def handle(self, *args, **options):
+        sizes = [size.strip() for size in options['sizes'].split(',') if size.strip()]
+        unknown = set(sizes) - set(SIZES)
+        if unknown:
+            raise CommandError(f'Unknown dataset size(s): {", ".join(sorted(unknown))}.')
+
+        # Varování o duplicitních dotazech by při zátěži zahltila výstup (zobrazí se s -v 2)
+        if options['verbosity'] < 2:
+            logging.getLogger('viewer.metrics').setLevel(logging.ERROR)
+
+        results = {}
+        for size in sizes:
+            self.stdout.write(f'[{size}] generating data...')
+            # Omezení počtu požadavků by zátěž z jednoho klienta odmítlo (429)
+            with temporary_database(), override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'],
+                                                         RATELIMIT_ENABLED=False, REQUEST_METRICS_SERVER_TIMING=True):
+                generate(SIZES[size], seed=options['seed'])
+                results[size] = self.run_journeys(options)
+            for journey, result in results[size].items():
+                self.stdout.write(f'  {journey:18} {result}')
+
+        report = {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'options': {key: options[key] for key in ('requests', 'concurrency', 'seed')},
+            'results': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+        self.stdout.write(f'Results written to {options["output"]}.')
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)['results']
+            regressions = compare_results(results, baseline, options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(f'REGRESSION {regression}')
+                raise CommandError(f'{len(regressions)} performance regression(s) against the baseline.')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
+
+    def run_journeys(self, options):
+        # Přihlášený uživatel s historií objednávek - první vygenerovaný uživatel
+        order = Order.objects.select_related('user').filter(user__username__startswith='load').first()
+        user = order.user
+        order_ids = list(Order.objects.filter(user=user).values_list('order_id', flat=True)[:50])
+        television_ids = list(Television.objects.filter(itemsonstock__quantity__gt=0)
+                              .values_list('id', flat=True)[:500])
+        checkout_data = {'first_name': 'Jan', 'last_name': 'Novak', 'address': 'Ulice 1', 'city': 'Praha',
+                         'zipcode': '11000', 'phone_number': '123456789'}
+
+        local = threading.local()
+
+        def state(index):
+            if getattr(local, 'client', None) is None:
+                local.client = Client()
+                local.client.force_login(user)
+                local.rng = random.Random(index)
+            return local.client, local.rng
+
+        def add_to_cart(client, rng):
+            client.session.flush()  # Nový košík, aby nedošlo na limit skladu
+            client.force_login(user)
+            return client.get(reverse('add_to_cart', args=[rng.choice(television_ids)]))
+
+        journeys = {
+            'home': lambda client, rng: client.get(reverse('home')),
+            'tv_list': lambda client, rng: client.get(reverse('tv_list')),
+            'tv_list_filtered': lambda client, rng: client.get(
+                reverse('tv_list'), {'technology': ['OLED', 'QLED'], 'resolution': '4K Ultra HD'}),
+            'tv_detail': lambda client, rng: client.get(reverse('tv_detail', args=[rng.choice(television_ids)])),
+            'search': lambda client, rng: client.get(reverse('search_results'), {'q': f'S{options["seed"]}-000'}),
+            'add_to_cart': add_to_cart,
+            'checkout': lambda client, rng: client.post(reverse('checkout'), checkout_data),
+            'order_list': lambda client, rng: client.get(reverse('order_list')),
+            'order_pdf': lambda client, rng: client.get(reverse('order_pdf', args=[rng.choice(order_ids)])),
+        }
+        # Checkout potřebuje neprázdný košík - připraví se mimo měřený čas
+        prepare = {'checkout': lambda client, rng: client.get(
+            reverse('add_to_cart', args=[rng.choice(television_ids)]))}
+
+        results = {}
+        for name, journey in journeys.items():
+            queries, lock = [], threading.Lock()
+
+            def operation(index, journey=journey, queries=queries, lock=lock):
+                client, rng = state(index)
+                response = journey(client, rng)
+                if response.status_code >= 400:
+                    raise RuntimeError(f'HTTP {response.status_code}')
+                match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+                if match:
+                    with lock:
+                        queries.append(int(match.group(1)))
+
+            def prepare_operation(index, step=prepare.get(name)):
+                if step is not None:
+                    step(*state(index))
+
+            result = run_load(operation, concurrency=options['concurrency'], requests=options['requests'],
+                              prepare=prepare_operation)
+            result['queries_avg'] = round(sum(queries) / len(queries), 1) if queries else None
+            result['queries_max'] = max(queries, default=None)
+            results[name] = result
+        return results
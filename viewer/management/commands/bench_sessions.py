@@ -0,0 +1,90 @@
+import random
+import time
+from importlib import import_module
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from viewer.bench import summarize, temporary_database
+
+# Porovnávané konfigurace: jméno -> (SESSION_ENGINE, cache)
+CONFIGURATIONS = {
+    'db': ('django.contrib.sessions.backends.db', None),
+    'cached_db+locmem': ('django.contrib.sessions.backends.cached_db',
+                         {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}),
+    'viewer+locmem': ('viewer.sessions',
+                      {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench'}),
+}
+
+
+class Command(BaseCommand):
+    """
+    Benchmark session I/O na jeden požadavek pro různé session engine a cache.
+
+    Simuluje požadavky přihlášených uživatelů s košíkem: každý načte session, část z nich
+    košík změní (--write-ratio) a ostatní ho jen znovu přiřadí beze změny (jako pohledy košíku).
+    Měří latenci práce se session a počet databázových čtení a zápisů na požadavek.
+    S --cache-server host:port se přidá konfigurace se sdíleným cache serverem (run_cache_server).
+    """
+    help = 'Změří databázové dotazy a latenci práce se session pro různé session engine.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--sessions', type=int, default=200, help='Počet různých session (uživatelů).')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Podíl požadavků, které mění košík.')
+        parser.add_argument('--cache-server', help='Adresa host:port serveru z run_cache_server.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        configurations = dict(CONFIGURATIONS)
+        if options['cache_server']:
+            configurations['viewer+socket'] = ('viewer.sessions', {'BACKEND': 'viewer.cache.SocketCache',
+                                                                   'LOCATION': options['cache_server']})
+        with temporary_database():
+            for name, (engine, cache) in configurations.items():
+                caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+                if cache:
+                    caches['bench_sessions'] = cache
+                with override_settings(SESSION_ENGINE=engine, CACHES=caches, SESSION_CACHE_ALIAS='bench_sessions'):
+                    result = self.run(import_module(engine).SessionStore, options)
+                self.stdout.write(f'{name:18} {result}')
+
+    @staticmethod
+    def run(store_class, options):
+        rng = random.Random(options['seed'])
+        keys = []
+        for i in range(options['sessions']):
+            store = store_class()
+            store['cart'] = {str(i): {'name': 'Brand', 'model': f'M{i}', 'price': '9990.00', 'quantity': 1}}
+            store.save()
+            keys.append(store.session_key)
+
+        counts = {'reads': 0, 'writes': 0}
+
+        def count_queries(execute, sql, params, many, context):
+            statement = sql.lstrip()[:6].upper()
+            if statement == 'SELECT':
+                counts['reads'] += 1
+            elif statement in ('INSERT', 'UPDATE', 'DELETE'):
+                counts['writes'] += 1
+            return execute(sql, params, many, context)
+
+        latencies = []
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_queries):
+            for _ in range(options['requests']):
+                request_started = time.perf_counter()
+                store = store_class(rng.choice(keys))
+                cart = store.get('cart', {})
+                if rng.random() < options['write_ratio']:
+                    item = next(iter(cart.values()))
+                    item['quantity'] = item['quantity'] % 5 + 1
+                store['cart'] = cart  # Jako pohledy košíku - přiřazení označí session jako změněnou
+                if store.modified:
+                    store.save()
+                latencies.append(time.perf_counter() - request_started)
+        result = summarize(latencies, time.perf_counter() - started)
+        result['db_reads_per_request'] = round(counts['reads'] / options['requests'], 3)
+        result['db_writes_per_request'] = round(counts['writes'] / options['requests'], 3)
+        return result
@@ -0,0 +1,103 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from viewer.bench import summarize
+from viewer.db import set_pragmas
+
+
+class Command(BaseCommand):
+    """
+    Souběžný benchmark čtení a zápisu nad SQLite.
+
+    Porovná výchozí režim (rollback journal, spojení pro každou operaci jako bez CONN_MAX_AGE)
+    s produkčním profilem (WAL + settings.SQLITE_PRODUCTION_PRAGMAS, trvalá spojení).
+    Měří se nad dočasnou databází, skutečná db.sqlite3 se nemění.
+    """
+    help = 'Porovná propustnost souběžného čtení/zápisu SQLite před a po nasazení produkčního profilu.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Počet čtecích vláken.')
+        parser.add_argument('--writers', type=int, default=2, help='Počet zapisujících vláken.')
+        parser.add_argument('--duration', type=float, default=5.0, help='Délka měření jednoho profilu v sekundách.')
+        parser.add_argument('--rows', type=int, default=10000, help='Počet řádků v testovací tabulce.')
+
+    def handle(self, *args, **options):
+        profiles = [
+            ('default', {}, False),
+            ('production', settings.SQLITE_PRODUCTION_PRAGMAS, True),
+        ]
+        for name, pragmas, persistent in profiles:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'bench.sqlite3')
+                self._prepare(path, pragmas, options['rows'])
+                reads, writes = self._run(path, pragmas, persistent, options)
+            self.stdout.write(f'[{name}]')
+            self.stdout.write(f'  reads:  {reads}')
+            self.stdout.write(f'  writes: {writes}')
+
+    @staticmethod
+    def _connect(path, pragmas):
+        connection = sqlite3.connect(path, timeout=5)
+        set_pragmas(connection, pragmas)
+        return connection
+
+    def _prepare(self, path, pragmas, rows):
+        connection = self._connect(path, pragmas)
+        connection.execute('CREATE TABLE stock (id INTEGER PRIMARY KEY, quantity INTEGER NOT NULL)')
+        connection.executemany('INSERT INTO stock (id, quantity) VALUES (?, ?)',
+                               ((i, 1000) for i in range(1, rows + 1)))
+        connection.commit()
+        connection.close()
+
+    def _run(self, path, pragmas, persistent, options):
+        rows = options['rows']
+        deadline = time.perf_counter() + options['duration']
+        results = {'read': ([], [0]), 'write': ([], [0])}
+        lock = threading.Lock()
+
+        def worker(kind, seed):
+            rng = random.Random(seed)
+            latencies, errors = [], 0
+            connection = self._connect(path, pragmas) if persistent else None
+            while time.perf_counter() < deadline:
+                conn = connection or self._connect(path, pragmas)
+                start = time.perf_counter()
+                try:
+                    if kind == 'read':
+                        low = rng.randint(1, rows)
+                        conn.execute('SELECT SUM(quantity) FROM stock WHERE id BETWEEN ? AND ?',
+                                     (low, low + 100)).fetchone()
+                    else:
+                        conn.execute('UPDATE stock SET quantity = quantity - 1 WHERE id = ?',
+                                     (rng.randint(1, rows),))
+                        conn.commit()
+                    latencies.append(time.perf_counter() - start)
+                except sqlite3.OperationalError:
+                    errors += 1
+                    conn.rollback()
+                finally:
+                    if connection is None:
+                        conn.close()
+            if connection is not None:
+                connection.close()
+            with lock:
+                results[kind][0].extend(latencies)
+                results[kind][1][0] += errors
+
+        threads = [threading.Thread(target=worker, args=('read', i)) for i in range(options['readers'])]
+        threads += [threading.Thread(target=worker, args=('write', 1000 + i)) for i in range(options['writers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return (summarize(results['read'][0], elapsed, results['read'][1][0]),
+                summarize(results['write'][0], elapsed, results['write'][1][0]))
@@ -0,0 +1,102 @@
+import re
+import tempfile
+import time
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client, RequestFactory, override_settings
+from django.urls import reverse
+from django.views.static import serve
+
+from viewer import staticfiles
+from viewer.bench import temporary_database
+from viewer.datagen import generate
+from viewer.models import Television
+from viewer.views import serve_static
+
+# Porovnávané konfigurace: jméno -> (úložiště pro collectstatic, Accept-Encoding prohlížeče)
+MODES = {
+    'plain': ('django.contrib.staticfiles.storage.StaticFilesStorage', ''),
+    'manifest+gzip': ('viewer.staticfiles.CompressedManifestStaticFilesStorage', 'gzip, deflate'),
+    'manifest+br': ('viewer.staticfiles.CompressedManifestStaticFilesStorage', 'gzip, deflate, br'),
+}
+
+
+class Command(BaseCommand):
+    """
+    Přenesené bajty a počet požadavků na statické soubory při zobrazení stránek.
+
+    Pro každou konfiguraci provede collectstatic do dočasného adresáře, vykreslí stránky obchodu,
+    najde v nich odkazy na statické soubory a stáhne je jako prohlížeč: při první návštěvě
+    (prázdná cache) a při opakované po vypršení max-age - soubory s immutable se pak nestahují
+    vůbec, ostatní se ověří podmíněným požadavkem. 'plain' odpovídá původnímu stavu
+    (StaticFilesStorage a django.views.static.serve), ostatní úložišti viewer.staticfiles
+    a pohledu serve_static.
+    """
+    help = 'Změří bajty a požadavky na statické soubory na jedno zobrazení stránky.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', default='home,tv_list,tv_detail',
+                            help='Stránky oddělené čárkou (home, tv_list, tv_detail).')
+
+    def handle(self, *args, **options):
+        modes = dict(MODES)
+        if staticfiles.brotli is None:
+            del modes['manifest+br']
+            self.stdout.write('brotli is not installed, skipping manifest+br.')
+
+        with temporary_database(), override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+            generate({'televisions': 50, 'users': 5, 'orders': 20})
+            pages = {'home': reverse('home'), 'tv_list': reverse('tv_list'),
+                     'tv_detail': reverse('tv_detail', args=[Television.objects.values_list('pk', flat=True)[0]])}
+            urls = [pages[page.strip()] for page in options['pages'].split(',') if page.strip()]
+            self.stdout.write(f'{"mode":15} {"html":>10} {"first view":>22} {"repeat view":>22}')
+            for name, (storage, accept_encoding) in modes.items():
+                with tempfile.TemporaryDirectory() as static_root, \
+                        override_settings(STATIC_ROOT=static_root, STATICFILES_STORAGE=storage):
+                    call_command('collectstatic', interactive=False, verbosity=0)
+                    result = self.measure(urls, accept_encoding, plain=name == 'plain')
+                self.stdout.write(
+                    f'{name:15} {result["html_bytes"]:>8} B '
+                    f'{result["first_requests"]:>4} req {result["first_bytes"]:>10} B '
+                    f'{result["repeat_requests"]:>4} req {result["repeat_bytes"]:>10} B '
+                    f'({result["ms_per_view"]:.1f} ms/view)')
+
+    @staticmethod
+    def measure(urls, accept_encoding, plain=False):
+        """Průměr na zobrazení stránky: bajty HTML a statických souborů, počet požadavků, čas."""
+        client, factory = Client(), RequestFactory()
+        asset_pattern = re.compile(re.escape(settings.STATIC_URL) + r'[^"\'()<>]+')
+        browser_cache = {}
+        totals = {'html_bytes': 0, 'first_requests': 0, 'first_bytes': 0, 'repeat_requests': 0, 'repeat_bytes': 0}
+        started = time.perf_counter()
+        for visit in ('first', 'repeat'):
+            for url in urls:
+                html = client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding).content
+                if visit == 'first':
+                    totals['html_bytes'] += len(html)
+                for asset in dict.fromkeys(asset_pattern.findall(html.decode())):
+                    cached = browser_cache.get(asset)
+                    if cached is not None and 'immutable' in cached.get('Cache-Control', ''):
+                        continue
+                    headers = {'HTTP_ACCEPT_ENCODING': accept_encoding}
+                    if cached is not None:
+                        headers['HTTP_IF_NONE_MATCH'] = cached.get('ETag', '')
+                        headers['HTTP_IF_MODIFIED_SINCE'] = cached.get('Last-Modified', '')
+                    request = factory.get(asset, **headers)
+                    path = unquote(asset[len(settings.STATIC_URL):])
+                    response = (serve(request, path, document_root=settings.STATIC_ROOT) if plain
+                                else serve_static(request, path))
+                    body = b''.join(response.streaming_content) if response.streaming else response.content
+                    if hasattr(response, 'close'):
+                        response.close()
+                    totals[f'{visit}_requests'] += 1
+                    totals[f'{visit}_bytes'] += len(body)
+                    if response.status_code == 200:
+                        browser_cache[asset] = response
+        views = len(urls)
+        result = {key: value // views for key, value in totals.items()}
+        result['ms_per_view'] = (time.perf_counter() - started) * 1000 / (2 * views)
+        return result
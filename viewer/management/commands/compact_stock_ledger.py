@@ -0,0 +1,27 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from viewer.stock import compact_ledger
+
+
+class Command(BaseCommand):
+    """
+    Započte skladové pohyby do snímků stavu (StockSnapshot), aby výpočet stavu z knihy pohybů
+    sčítal jen pohyby od posledního zhuštění. S --prune-days smaže započtené pohyby starší
+    než zadaný počet dní (historie se tím zkrátí). Spouštějte pravidelně, např. z cronu.
+    """
+    help = 'Zhustí knihu skladových pohybů do snímků stavu.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lag', type=int,
+                            help='Nezapočítávat pohyby mladší než N sekund (výchozí settings.STOCK_COMPACTION_LAG).')
+        parser.add_argument('--prune-days', type=int, help='Smazat započtené pohyby starší než N dní.')
+
+    def handle(self, *args, **options):
+        prune_before = None
+        if options['prune_days'] is not None:
+            prune_before = timezone.now() - datetime.timedelta(days=options['prune_days'])
+        snapshots, pruned = compact_ledger(options['lag'], prune_before)
+        self.stdout.write(self.style.SUCCESS(f'Compacted movements of {snapshots} televisions, pruned {pruned}.'))
@@ -0,0 +1,54 @@
+import datetime
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from viewer.datagen import DEFAULT_VOLUMES, REFERENCE_DATE, generate
+
+
+class Command(BaseCommand):
+    """
+    Naplní databázi syntetickými daty pro zátěžové testy.
+
+    Příklad (cca 1M objednávek):
+        python manage.py generate_shop_data --televisions 20000 --users 20000 --orders 1000000 --workers 8
+    """
+    help = 'Vygeneruje deterministická syntetická data (katalog, sklad, uživatelé, objednávky).'
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_VOLUMES.items():
+            parser.add_argument(f'--{name.replace("_", "-")}', type=int, default=default, dest=name,
+                                help=f'Výchozí: {default}.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed generátoru (stejný seed, objemy a --reference-date = stejná data).')
+        parser.add_argument('--reference-date', type=datetime.date.fromisoformat, default=REFERENCE_DATE,
+                            help=f'Den, ke kterému se data generují, RRRR-MM-DD (výchozí: {REFERENCE_DATE}).')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Velikost dávky pro bulk_create.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Počet procesů pro hashování hesel (výchozí: počet CPU).')
+        parser.add_argument('--password', default='heslo1234', help='Heslo vygenerovaných uživatelů.')
+
+    def handle(self, *args, **options):
+        seed = options['seed']
+        if User.objects.filter(username__startswith=f'load{seed}_').exists():
+            raise CommandError(f'Data for seed {seed} already exist, use a different --seed.')
+
+        volumes = {name: options[name] for name in DEFAULT_VOLUMES}
+        step = max(1, volumes['orders'] // 20)
+
+        def progress(created):
+            if created % step < options['batch_size'] or created == volumes['orders']:
+                self.stdout.write(f'  orders: {created}/{volumes["orders"]}')
+
+        started = time.perf_counter()
+        result = generate(volumes, seed=seed, batch_size=options['batch_size'], workers=options['workers'],
+                          password=options['password'], progress=progress,
+                          reference_date=options['reference_date'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result["televisions"]} televisions, {result["users"]} users and '
+            f'{result["orders"]} orders in {elapsed:.1f} s.'))
+        # Televize a objednávky se vkládají přes bulk_create (bez signálů), odvozené tabulky je třeba přepočítat
+        self.stdout.write('Run "python manage.py rebuild_sales_rollups" to update the sales rollups '
+                          'and "python manage.py rebuild_recommendations" to update similar televisions.')
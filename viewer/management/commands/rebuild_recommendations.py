@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from viewer.recommendations import rebuild_all
+
+
+class Command(BaseCommand):
+    """
+    Přepočítá podobné televize (TelevisionSimilarity) pro celý katalog.
+
+    Po uložení nebo smazání jedné televize se sousedé přepočítají průběžně; příkaz je potřeba
+    po hromadných změnách bez signálů (generate_shop_data, import) a občas i jindy, protože
+    průběžný přepočet neopravuje posun standardizace vlastností celého katalogu.
+    """
+    help = 'Přepočítá předpočítané podobné televize pro všechny televize.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbours', type=int, help='Počet sousedů (výchozí settings.RECOMMENDATIONS_NEIGHBOURS).')
+        parser.add_argument('--batch-size', type=int,
+                            help='Televizí na maticovou dávku (výchozí settings.RECOMMENDATIONS_BATCH_SIZE).')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_all(options['neighbours'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Recommendations rebuilt for {count} televisions in {time.perf_counter() - started:.1f} s.'))
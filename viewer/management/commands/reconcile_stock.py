@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from viewer.stock import reconcile_stock
+
+
+class Command(BaseCommand):
+    """
+    Ověří, že ItemsOnStock.quantity (kopie pro rychlé čtení) odpovídá knize skladových pohybů.
+
+    Bez --fix při nesouladu skončí chybou (vhodné pro monitoring), s --fix kopii opraví podle knihy.
+    """
+    help = 'Porovná zásoby v ItemsOnStock se stavem podle knihy skladových pohybů.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Přepsat ItemsOnStock stavem podle knihy pohybů.')
+
+    def handle(self, *args, **options):
+        mismatches = reconcile_stock(fix=options['fix'])
+        for television_id, quantity, expected in mismatches:
+            self.stdout.write(f'  television {television_id}: stock {quantity}, ledger {expected}')
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Stock matches the ledger.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(mismatches)} stock rows from the ledger.'))
+        else:
+            raise CommandError(f'{len(mismatches)} stock rows do not match the ledger.')
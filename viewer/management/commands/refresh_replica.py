@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from viewer.db import refresh_sqlite_replica
+
+
+class Command(BaseCommand):
+    help = 'Obnoví SQLite repliky z primární databáze přes backup API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*',
+                            help='Aliasy replik (výchozí: všechny ze settings.REPLICA_DATABASES).')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or settings.REPLICA_DATABASES
+        if not aliases:
+            raise CommandError('No replica databases configured (set ONLINESHOP_SQLITE_REPLICA=1).')
+        for alias in aliases:
+            if alias not in settings.DATABASES:
+                raise CommandError(f'Unknown database alias "{alias}".')
+            refresh_sqlite_replica(alias)
+            self.stdout.write(self.style.SUCCESS(f'Replica "{alias}" refreshed.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from viewer.cache import CacheServer
+
+
+class Command(BaseCommand):
+    """
+    Spustí lokální cache server (viewer.cache) jako sdílenou cache pro více procesů.
+
+    Příklad:
+        python manage.py run_cache_server --port 11311
+        ONLINESHOP_SESSION_CACHE=127.0.0.1:11311 gunicorn OnlineShop.wsgi -w 4
+    """
+    help = 'Spustí jednoduchý LRU cache server pro backend viewer.cache.SocketCache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=11311)
+        parser.add_argument('--max-entries', type=int, default=100000, help='Max. počet položek (LRU).')
+
+    def handle(self, *args, **options):
+        with CacheServer((options['host'], options['port']), options['max_entries']) as server:
+            self.stdout.write(f'Cache server listening on {options["host"]}:{server.server_address[1]}.')
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from viewer.notifications import process_batch, worker_name
+
+
+class Command(BaseCommand):
+    """
+    Worker fronty oznámení (viz viewer.notifications).
+
+    Bere dávky čekajících úloh a odesílá je přes kanály podle preferencí zákazníků. Workerů lze
+    spustit více (více procesů i strojů) - dávky si zamykají podmíněným UPDATE. S --once
+    zpracuje frontu a skončí (cron, testy), jinak běží a prázdnou frontu kontroluje po
+    settings.NOTIFICATION_POLL_INTERVAL sekundách.
+    """
+    help = 'Odesílá oznámení zákazníkům z fronty v databázi.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Úloh na dávku (výchozí settings.NOTIFICATION_BATCH_SIZE).')
+        parser.add_argument('--once', action='store_true', help='Zpracovat čekající úlohy a skončit.')
+
+    def handle(self, *args, **options):
+        worker = worker_name()
+        processed = 0
+        try:
+            while True:
+                count = process_batch(worker, options['batch_size'])
+                processed += count
+                if count:
+                    continue
+                if options['once']:
+                    break
+                close_old_connections()
+                time.sleep(settings.NOTIFICATION_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} notification jobs.'))
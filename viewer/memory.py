@@ -0,0 +1,173 @@
+"""
+Diagnostika paměti pracovních procesů (tracemalloc, RSS).
+
+Když je tracemalloc zapnutý (settings.MEMORY_TRACING_ENABLED nebo tlačítkem na stránce
+diagnostiky), middleware měří špičku alokací každého pohledu a personál může ukládat
+snímky (na stránce diagnostiky nebo parametrem `?memory_snapshot=1` po požadavku)
+a porovnávat je. Nezávisle na tom se každých settings.MEMORY_RSS_CHECK_INTERVAL požadavků
+kontroluje RSS procesu - po překročení settings.MEMORY_RSS_LIMIT_MB se pošle signál
+worker_memory_exceeded a volitelně OS signál settings.MEMORY_RECYCLE_SIGNAL (např. SIGTERM,
+po kterém gunicorn proces po dokončení požadavků nahradí novým).
+"""
+import itertools
+import logging
+import datetime
+import os
+import signal
+import sys
+import threading
+import tracemalloc
+from collections import deque
+
+from django.conf import settings
+from django.dispatch import Signal
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Posílá se jednou za život procesu, argumenty: rss (bajty), limit (bajty)
+worker_memory_exceeded = Signal()
+
+# Alokace samotného měření a importů do výsledků nepatří
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_lock = threading.Lock()
+_snapshots = deque()
+_snapshot_ids = itertools.count(1)
+_view_peaks = {}
+_request_counter = itertools.count(1)
+_recycle_requested = False
+
+
+def current_rss():
+    """Aktuální RSS procesu v bajtech (Linux /proc, jinde maximum z getrusage, na Windows None)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return None
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def start_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_TRACING_FRAMES)
+
+
+def stop_tracing():
+    """Vypne tracemalloc; uložené snímky a špičky pohledů se zahodí."""
+    tracemalloc.stop()
+    with _lock:
+        _snapshots.clear()
+        _view_peaks.clear()
+
+
+def tracing_status():
+    """Stav tracemalloc: {'enabled', 'current', 'peak'} (velikosti v bajtech)."""
+    current, peak = tracemalloc.get_traced_memory()
+    return {'enabled': tracemalloc.is_tracing(), 'current': current, 'peak': peak}
+
+
+def take_snapshot(label):
+    """Uloží snímek alokací (nejstarší snímky nad settings.MEMORY_SNAPSHOTS_KEEP zahodí) a vrátí jeho id."""
+    if not tracemalloc.is_tracing():
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    with _lock:
+        snapshot_id = next(_snapshot_ids)
+        _snapshots.append({'id': snapshot_id, 'label': label, 'snapshot': snapshot,
+                           'created': datetime.datetime.now(datetime.timezone.utc),
+                           'size': sum(stat.size for stat in snapshot.statistics('filename'))})
+        while len(_snapshots) > settings.MEMORY_SNAPSHOTS_KEEP:
+            _snapshots.popleft()
+    return snapshot_id
+
+
+def snapshots():
+    with _lock:
+        return list(_snapshots)
+
+
+def get_snapshot(snapshot_id):
+    return next((entry for entry in snapshots() if entry['id'] == snapshot_id), None)
+
+
+def top_allocations(snapshot, limit=None):
+    """Nejvíc alokující místa v kódu: [{'location', 'size', 'count'}]."""
+    return [{'location': _location(stat.traceback), 'size': stat.size, 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:limit or settings.MEMORY_TOP_STATS]]
+
+
+def diff_snapshots(old, new, limit=None):
+    """Rozdíl dvou snímků seřazený podle nárůstu: [{'location', 'size', 'size_diff', 'count_diff'}]."""
+    return [{'location': _location(stat.traceback), 'size': stat.size, 'size_diff': stat.size_diff,
+             'count_diff': stat.count_diff}
+            for stat in new.compare_to(old, 'lineno')[:limit or settings.MEMORY_TOP_STATS]]
+
+
+def _location(traceback):
+    frame = traceback[0]
+    return f'{frame.filename}:{frame.lineno}'
+
+
+def record_view_peak(view_name, peak):
+    with _lock:
+        stats = _view_peaks.setdefault(view_name, {'requests': 0, 'max_peak': 0, 'total_peak': 0})
+        stats['requests'] += 1
+        stats['max_peak'] = max(stats['max_peak'], peak)
+        stats['total_peak'] += peak
+
+
+def view_peaks():
+    """Špičky alokací podle pohledu, od největší: [{'view', 'requests', 'max_peak', 'avg_peak'}]."""
+    with _lock:
+        rows = [{'view': view, 'requests': stats['requests'], 'max_peak': stats['max_peak'],
+                 'avg_peak': stats['total_peak'] // stats['requests']} for view, stats in _view_peaks.items()]
+    return sorted(rows, key=lambda row: row['max_peak'], reverse=True)
+
+
+def check_rss():
+    """Každých settings.MEMORY_RSS_CHECK_INTERVAL volání porovná RSS s limitem (viz docstring modulu)."""
+    global _recycle_requested
+    limit = settings.MEMORY_RSS_LIMIT_MB * 1024 * 1024
+    if not limit or _recycle_requested or next(_request_counter) % settings.MEMORY_RSS_CHECK_INTERVAL:
+        return
+    rss = current_rss()
+    if rss is None or rss < limit:
+        return
+    _recycle_requested = True
+    logger.warning('Worker %s RSS %.1f MB exceeded limit %s MB', os.getpid(), rss / 1024 / 1024,
+                   settings.MEMORY_RSS_LIMIT_MB)
+    worker_memory_exceeded.send(sender=None, rss=rss, limit=limit)
+    if settings.MEMORY_RECYCLE_SIGNAL:
+        os.kill(os.getpid(), getattr(signal, settings.MEMORY_RECYCLE_SIGNAL))
+
+
+def before_request():
+    """Vrátí velikost alokací na začátku požadavku (None bez tracemalloc) a vynuluje špičku."""
+    if not tracemalloc.is_tracing():
+        return None
+    tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def after_request(request, started_at):
+    if started_at is not None and tracemalloc.is_tracing():
+        peak = tracemalloc.get_traced_memory()[1] - started_at
+        view_name = getattr(request.resolver_match, 'view_name', None) or request.path
+        record_view_peak(view_name, max(0, peak))
+        if (request.GET.get(settings.MEMORY_SNAPSHOT_QUERY_PARAM) == '1' and
+                getattr(request, 'user', None) is not None and request.user.is_staff):
+            take_snapshot(f'{request.method} {request.path}')
+    check_rss()
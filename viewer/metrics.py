@@ -0,0 +1,118 @@
+"""
+Měření jednotlivých požadavků - počet a čas SQL dotazů, čas vykreslení šablon a čas pohledu.
+
+Metriky aktuálního požadavku jsou v ContextVar, takže je vidí i dotazy spuštěné přes
+sync_to_async v asynchronních pohledech. SQL se zaznamenává wrapperem, který se na každé
+databázové spojení přidá při jeho vytvoření (signál connection_created), šablony měří
+backend TimedDjangoTemplates. Výstup obstarává viewer.middleware.RequestMetricsMiddleware.
+"""
+import hashlib
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalizuje SQL (seznamy IN, bílé znaky) tak, aby stejné dotazy s jinými parametry splynuly."""
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', sql)).strip()
+
+
+class RequestMetrics:
+    """
+    Metriky jednoho požadavku.
+
+    Atributy:
+        query_count (int): Počet SQL dotazů.
+        sql_time (float): Celkový čas SQL v sekundách.
+        template_time (float): Čas vykreslení šablon v sekundách (vnořená vykreslení se nepočítají dvakrát).
+        queries (Counter): Počet výskytů každého otisku (fingerprint) dotazu.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.queries = Counter()
+        self._template_depth = 0
+        self._view_started = None
+        self._sql_before_view = 0.0
+
+    def start_view(self):
+        self._view_started = time.perf_counter()
+        self._sql_before_view = self.sql_time
+
+    def view_time(self):
+        """Čas od zavolání pohledu do teď bez SQL a vykreslení šablon (vlastní práce Pythonu v pohledu)."""
+        if self._view_started is None:
+            return 0.0
+        elapsed = time.perf_counter() - self._view_started
+        return max(0.0, elapsed - (self.sql_time - self._sql_before_view) - self.template_time)
+
+    def duplicates(self, threshold):
+        """Vrátí [(otisk, počet)] dotazů opakovaných alespoň threshold-krát, nejčastější první."""
+        return [(sql, count) for sql, count in self.queries.most_common() if count >= threshold]
+
+    @staticmethod
+    def fingerprint_id(sql):
+        return hashlib.sha1(sql.encode()).hexdigest()[:12]
+
+
+def record_query(execute, sql, params, many, context):
+    """Wrapper databázového spojení - do metrik aktuálního požadavku zapíše čas a otisk dotazu."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_time += time.perf_counter() - start
+        metrics.query_count += 1
+        metrics.queries[fingerprint(sql)] += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Příjemce signálu connection_created - přidá na spojení wrapper record_query."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class TimedTemplate:
+    """Obal šablony backendu Django, který měří čas vykreslení do metrik požadavku."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        metrics._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics._template_depth -= 1
+            if not metrics._template_depth:
+                metrics.template_time += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Šablonový backend Django, jehož šablony měří dobu vykreslení (viz TimedTemplate)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
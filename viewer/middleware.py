@@ -0,0 +1,225 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from viewer import memory
+from viewer.compression import compress_response
+from viewer.metrics import RequestMetrics, current_metrics
+from viewer.profiling import is_profiling_requested, run_profiled
+from viewer.routers import ReplicaState, replica_state
+
+metrics_logger = logging.getLogger('viewer.metrics')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Určuje, zda smí požadavek číst katalog z repliky.
+
+    POST a další nebezpečné metody a požadavky s cookie settings.REPLICA_PIN_COOKIE čtou
+    z primární databáze. Po POST nebo po zápisu se nastaví cookie na settings.REPLICA_PIN_SECONDS -
+    i následující požadavek (např. přesměrování po checkoutu) tak uvidí vlastní zápis, než se
+    replika obnoví. POST se počítá vždy, protože zápis mohl proběhnout v zapisovacím vlákně.
+    Middleware funguje synchronně i asynchronně (pod ASGI se kvůli němu nepřepíná do vlákna).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, token = self.enter(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_state.reset(token)
+        return self.leave(request, state, response)
+
+    async def __acall__(self, request):
+        state, token = self.enter(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_state.reset(token)
+        return self.leave(request, state, response)
+
+    @staticmethod
+    def enter(request):
+        state = ReplicaState(pinned=request.method not in ('GET', 'HEAD', 'OPTIONS') or
+                             settings.REPLICA_PIN_COOKIE in request.COOKIES)
+        return state, replica_state.set(state)
+
+    @staticmethod
+    def leave(request, state, response):
+        unsafe = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        if (unsafe or state.wrote) and settings.REPLICA_DATABASES:
+            response.set_cookie(settings.REPLICA_PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Měří každý požadavek: počet SQL dotazů, čas SQL, čas vykreslení šablon a čas pohledu.
+
+    Metriky posílá v hlavičce Server-Timing (settings.REQUEST_METRICS_SERVER_TIMING) a jako
+    JSON řádek do loggeru 'viewer.metrics'. Požadavky pomalejší než settings.REQUEST_METRICS_SLOW_MS
+    a dotazy opakované alespoň settings.REQUEST_METRICS_DUPLICATE_THRESHOLD-krát (typicky N+1)
+    se logují jako varování s otiskem dotazu. Middleware má být v MIDDLEWARE první, aby měřil
+    i ostatní middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS_ENABLED:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.start_view()
+
+    @staticmethod
+    def report(request, response, metrics, total):
+        timings = {
+            'db': metrics.sql_time * 1000,
+            'tpl': metrics.template_time * 1000,
+            'view': metrics.view_time() * 1000,
+            'total': total * 1000,
+        }
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={value:.2f}' + (f';desc="{metrics.query_count} queries"' if name == 'db' else '')
+                for name, value in timings.items())
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'queries': metrics.query_count,
+            **{f'{name}_ms': round(value, 2) for name, value in timings.items()},
+        }
+        metrics_logger.info(json.dumps(record, ensure_ascii=False))
+
+        if timings['total'] >= settings.REQUEST_METRICS_SLOW_MS:
+            metrics_logger.warning(json.dumps({'event': 'slow_request', **record}, ensure_ascii=False))
+        for sql, count in metrics.duplicates(settings.REQUEST_METRICS_DUPLICATE_THRESHOLD):
+            metrics_logger.warning(json.dumps({
+                'event': 'duplicate_query',
+                'path': request.path,
+                'view': record['view'],
+                'count': count,
+                'fingerprint': RequestMetrics.fingerprint_id(sql),
+                'sql': sql[:500],
+            }, ensure_ascii=False))
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Komprimuje odpovědi gzip nebo Brotli podle Accept-Encoding (viz viewer.compression).
+
+    Patří v MIDDLEWARE hned za RequestMetricsMiddleware - vidí tak konečné tělo odpovědi
+    a čas komprese se započítá do měřeného času požadavku.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compress_response(request, await self.get_response(request))
+
+
+class ProfilingMiddleware:
+    """
+    Na vyžádání profiluje požadavek pomocí cProfile (viz viewer.profiling).
+
+    Musí být v MIDDLEWARE za AuthenticationMiddleware (vyžádat profil smí jen personál).
+    Bez vyžádání stojí jen kontrolu hlavičky a parametru. cProfile sleduje jedno vlákno,
+    proto je middleware jen synchronní - pod ASGI ho Django spustí ve vlákně.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if is_profiling_requested(request):
+            return run_profiled(self.get_response, request)
+        return self.get_response(request)
+
+
+class MemoryDiagnosticsMiddleware:
+    """
+    Měří špičku alokací pohledů, na vyžádání ukládá snímky a hlídá RSS procesu (viz viewer.memory).
+
+    Bez zapnutého tracemalloc jen počítá požadavky pro kontrolu RSS. Špička alokací je
+    v tracemalloc společná pro celý proces, při souběžných požadavcích ve vláknech je proto
+    jen horním odhadem pro daný pohled.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started_at = memory.before_request()
+        response = self.get_response(request)
+        memory.after_request(request, started_at)
+        return response
+
+    async def __acall__(self, request):
+        started_at = memory.before_request()
+        response = await self.get_response(request)
+        # request.user se může teprve načítat z databáze
+        await sync_to_async(memory.after_request)(request, started_at)
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.1 on 2026-10-19 19:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0022_delete_mobileoperationsystem_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('submitted', 'Submitted'), ('pending_payment', 'Pending Payment'), ('processing', 'Processing'), ('on_hold', 'On Hold'), ('dispatched', 'Dispatched'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded'), ('returned', 'Returned'), ('completed', 'Completed')], max_length=20)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('units', models.IntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('brand', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='viewer.brand')),
+                ('display_technology', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='viewer.tvdisplaytechnology')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'brand', 'display_technology', 'status'), name='unique_daily_sales_rollup'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.1.1 on 2026-10-19 19:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0023_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelevisionSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='viewer.television')),
+                ('television', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='viewer.television')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='televisionsimilarity',
+            constraint=models.UniqueConstraint(fields=('television', 'rank'), name='unique_television_similarity_rank'),
+        ),
+    ]
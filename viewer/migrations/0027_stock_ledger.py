@@ -0,0 +1,51 @@
+# Generated by Django 4.1.1 on 2026-10-19 19:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def opening_balances(apps, schema_editor):
+    """Počáteční příjem pro každou existující zásobu, aby kniha pohybů odpovídala ItemsOnStock."""
+    ItemsOnStock = apps.get_model('viewer', 'ItemsOnStock')
+    StockMovement = apps.get_model('viewer', 'StockMovement')
+    StockMovement.objects.bulk_create(
+        [StockMovement(television_id=television_id, kind='receipt', delta=quantity)
+         for television_id, quantity in ItemsOnStock.objects.values_list('television_id', 'quantity').iterator()
+         if quantity],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0026_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('last_movement_id', models.BigIntegerField()),
+                ('taken_at', models.DateTimeField(auto_now=True)),
+                ('television', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshot', to='viewer.television')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receipt', 'Příjem'), ('sale', 'Prodej'), ('adjustment', 'Úprava')], max_length=20)),
+                ('delta', models.IntegerField()),
+                ('order_uuid', models.UUIDField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('television', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='viewer.television')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['television', 'id'], name='stock_movement_television_idx'),
+        ),
+        migrations.RunPython(opening_balances, migrations.RunPython.noop),
+    ]
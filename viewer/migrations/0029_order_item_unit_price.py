@@ -0,0 +1,35 @@
+# Generated by Django 4.1.1 on 2026-10-19 21:10
+
+from django.db import migrations, models
+
+
+def fill_unit_prices(apps, schema_editor):
+    """Dosavadní položky nemají cenu z checkoutu - doplní se aktuální cenou televize (tak je počítaly i souhrny)."""
+    for model_name in ('OrderItem', 'ArchivedOrderItem'):
+        model = apps.get_model('viewer', model_name)
+        Television = apps.get_model('viewer', 'Television')
+        model.objects.update(unit_price=models.Subquery(
+            Television.objects.filter(pk=models.OuterRef('television_id')).values('price')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0028_notification_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_unit_prices, migrations.RunPython.noop),
+    ]
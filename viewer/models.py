@@ -80,6 +80,63 @@ class ItemsOnStock(models.Model):
     def __str__(self):
         return f'{self.quantity}x {self.television_id}'
 
+    """Definujeme si co chceme za chybovou hlášku v případě, že přidáváme na sklad existující komponentu"""
+
+    def unique_error_message(self, model_class, unique_check):
+        if unique_check == ('television_id',):
+            return ValidationError('Tato položka již je na skladě.', code='unique')
+        return super().unique_error_message(model_class, unique_check)
+
+
+class StockMovement(models.Model):
+    """
+    Pohyb na skladě - záznam v knize pohybů, která se jen doplňuje (viz viewer.stock).
+
+    Každý příjem, prodej a ruční úprava zásoby přidá řádek se změnou počtu kusů; souběžné vkládání
+    řádků se navzájem neblokuje. Skutečný stav = StockSnapshot + novější pohyby, ItemsOnStock.quantity
+    je jeho průběžně udržovaná kopie pro rychlé čtení.
+
+    Atributy:
+        delta (IntegerField): Změna počtu kusů (prodej je záporný).
+        order_uuid (UUIDField): Order.order_id u prodeje, jinak None.
+    """
+    KIND_CHOICES = [
+        ('receipt', 'Příjem'),
+        ('sale', 'Prodej'),
+        ('adjustment', 'Úprava'),
+    ]
+
+    television = models.ForeignKey(Television, on_delete=models.CASCADE, related_name='stock_movements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    delta = models.IntegerField()
+    order_uuid = models.UUIDField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['television', 'id'], name='stock_movement_television_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.television}: {self.delta:+d} ({self.kind})'
+
+
+class StockSnapshot(models.Model):
+    """
+    Zhuštěný stav skladu televize - součet pohybů až po last_movement_id (viz viewer.stock.compact_ledger).
+
+    Atributy:
+        quantity (IntegerField): Počet kusů po započtení pohybů s id <= last_movement_id.
+        last_movement_id (BigIntegerField): Poslední pohyb zahrnutý ve snímku.
+    """
+    television = models.OneToOneField(Television, on_delete=models.CASCADE, related_name='stock_snapshot')
+    quantity = models.IntegerField()
+    last_movement_id = models.BigIntegerField()
+    taken_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.television}: {self.quantity} (do pohybu {self.last_movement_id})'
+
 
 def validate_not_future_date(value):
     if value > timezone.now().date():
@@ -190,6 +247,15 @@ class Order(models.Model):
     phone_number = models.CharField(max_length=20, blank=True)
     status = models.CharField(max_length=20, choices=ORDER_STATUS_CHOICES, default='submitted')
 
+    class Meta:
+        indexes = [
+            # Fronta objednávek pro personál: filtr podle stavu, stránkování od nejnovějších (keyset)
+            models.Index(fields=['status', '-order_date', '-id'], name='order_status_date_idx'),
+        ]
+
+    # Odlišení od ArchivedOrder ve sdílených šablonách detailu objednávky
+    is_archived = False
+
     def __str__(self):
         return f"Order #{self.order_id} by {self.user}"
 
@@ -198,3 +264,167 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
     television = models.ForeignKey(Television, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
+    # Cena za kus v okamžiku checkoutu - pozdější změna ceny televize objednávku ani souhrny nemění
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+
+class OrderStatusChange(models.Model):
+    """
+    Auditní záznam změny stavu objednávky (viz viewer.order_workflow).
+
+    Na objednávku odkazuje jen jejím UUID, ne cizím klíčem - záznam tak přežije smazání
+    i archivaci objednávky.
+
+    Atributy:
+        order_uuid (UUIDField): Order.order_id změněné objednávky.
+        changed_by (ForeignKey): Kdo stav změnil (None = systém nebo smazaný uživatel).
+    """
+    order_uuid = models.UUIDField(db_index=True)
+    from_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.order_uuid}: {self.from_status} -> {self.to_status}'
+
+
+class ArchivedOrder(models.Model):
+    """
+    Archivovaná objednávka (viz viewer.archive).
+
+    Uzavřené objednávky (dokončené, zrušené, refundované) starší než settings.ORDER_ARCHIVE_AFTER_DAYS
+    se přesouvají z tabulky Order sem, aby provozní tabulka objednávek zůstala malá. Primární klíč
+    i order_id zůstávají stejné, detail a PDF objednávky je najdou i po archivaci.
+
+    Atributy:
+        archived_at (DateTimeField): Kdy byla objednávka archivována.
+    """
+    order_id = models.UUIDField(unique=True, editable=False)
+    user = models.ForeignKey(User, on_delete=models.PROTECT, related_name='archived_orders')
+    order_date = models.DateTimeField()
+    price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    first_name = models.CharField(max_length=30, blank=True)
+    last_name = models.CharField(max_length=30, blank=True)
+    address = models.CharField(max_length=100, blank=True)
+    city = models.CharField(max_length=100, blank=True)
+    zipcode = models.CharField(max_length=20, blank=True)
+    phone_number = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    is_archived = True
+
+    def __str__(self):
+        return f"Archived order #{self.order_id} by {self.user}"
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(ArchivedOrder, related_name='items', on_delete=models.CASCADE)
+    television = models.ForeignKey(Television, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+
+class DailySalesRollup(models.Model):
+    """
+    Denní souhrn prodejů pro reporty (viz viewer.rollups).
+
+    Jeden řádek = den, značka, technologie displeje a stav objednávky. Checkout a změny stavu
+    objednávek ho aktualizují průběžně, příkaz rebuild_sales_rollups ho přepočítá z objednávek.
+
+    Atributy:
+        revenue (DecimalField): Tržba položek (cena za kus z checkoutu x počet kusů).
+        units (IntegerField): Počet prodaných kusů.
+        order_count (IntegerField): Počet objednávek s alespoň jednou položkou dané značky a technologie.
+    """
+    day = models.DateField()
+    brand = models.ForeignKey(Brand, on_delete=models.CASCADE)
+    display_technology = models.ForeignKey(TVDisplayTechnology, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    units = models.IntegerField(default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'brand', 'display_technology', 'status'],
+                                    name='unique_daily_sales_rollup')
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.brand} {self.display_technology} {self.status}: {self.revenue}'
+
+
+class TelevisionSimilarity(models.Model):
+    """
+    Předpočítané nejpodobnější televize pro detail televize (viz viewer.recommendations).
+
+    Pro každou televizi drží settings.RECOMMENDATIONS_NEIGHBOURS nejbližších sousedů podle
+    parametrů (úhlopříčka, frekvence, cena, rok, rozlišení, technologie, systém, značka).
+    Unikátní index (television, rank) slouží i ke čtení sousedů jedním dotazem v pořadí.
+
+    Atributy:
+        rank (PositiveSmallIntegerField): Pořadí souseda, 0 = nejpodobnější.
+        score (FloatField): Podobnost 1 / (1 + vzdálenost), vyšší = podobnější.
+    """
+    television = models.ForeignKey(Television, on_delete=models.CASCADE, related_name='similarities')
+    similar = models.ForeignKey(Television, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['television', 'rank'], name='unique_television_similarity_rank')
+        ]
+
+    def __str__(self):
+        return f'{self.television} #{self.rank}: {self.similar} ({self.score:.3f})'
+
+
+class NotificationJob(models.Model):
+    """
+    Úloha ve frontě oznámení zákazníkům (viz viewer.notifications).
+
+    Checkout a změny stavu objednávek jen vloží řádek ve stejné transakci; odeslání obstará
+    worker (manage.py run_notification_worker) mimo požadavek, s opakováním při chybě.
+
+    Atributy:
+        channel (CharField): Kanál podle Profile.communication_channel v okamžiku vložení.
+        payload (JSONField): Údaje objednávky pro text oznámení (order_id, cena, stavy).
+        run_after (DateTimeField): Nejdřívější čas (dalšího) pokusu o odeslání.
+        locked_by (CharField): Worker, který úlohu právě odesílá.
+    """
+    KIND_CHOICES = [
+        ('order_confirmation', 'Potvrzení objednávky'),
+        ('status_change', 'Změna stavu objednávky'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Čeká'),
+        ('sending', 'Odesílá se'),
+        ('sent', 'Odesláno'),
+        ('failed', 'Selhalo'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    channel = models.CharField(max_length=10, choices=Profile.communication_channel_choices)
+    order_uuid = models.UUIDField()
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Výběr dávky pro worker: čekající úlohy, jejichž čas už nastal
+            models.Index(fields=['status', 'run_after'], name='notification_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.order_uuid} via {self.channel}: {self.status}'
@@ -0,0 +1,244 @@
+"""
+Fronta oznámení zákazníkům (model NotificationJob) a kanály pro jejich odeslání.
+
+Checkout (place_order) a hromadná změna stavu (bulk_transition) jen vloží úlohy do tabulky
+ve stejné transakci jako objednávku - požadavek tak nečeká na SMTP ani jiný přenos. Worker
+(manage.py run_notification_worker, lze jich spustit více) si bere dávky úloh podmíněným UPDATE,
+takže žádnou úlohu neodešlou dva procesy, a odesílá je přes kanál podle Profile.communication_channel
+(settings.NOTIFICATION_CHANNELS). Neúspěšný pokus se opakuje s exponenciálně rostoucí prodlevou,
+po settings.NOTIFICATION_MAX_ATTEMPTS pokusech úloha skončí ve stavu 'failed'.
+"""
+import datetime
+import json
+import logging
+import os
+import socket
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from viewer.models import NotificationJob, Order, Profile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHANNEL = 'Email'
+STATUS_LABELS = dict(Order.ORDER_STATUS_CHOICES)
+
+
+class PermanentError(Exception):
+    """Oznámení nelze doručit ani dalším pokusem (např. chybí adresa příjemce)."""
+
+
+class Notification:
+    """Jedno oznámení pro kanál - příjemce a text (vytvoří render z úlohy)."""
+
+    def __init__(self, job, recipient, subject, body):
+        self.job = job
+        self.recipient = recipient
+        self.subject = subject
+        self.body = body
+
+
+class EmailChannel:
+    """Odesílá e-maily přes EMAIL_BACKEND Django - celá dávka jedním spojením (jedno SMTP přihlášení)."""
+
+    def send_batch(self, notifications):
+        errors = []
+        with get_connection() as connection:
+            for notification in notifications:
+                message = EmailMessage(notification.subject, notification.body, settings.DEFAULT_FROM_EMAIL,
+                                       [notification.recipient], connection=connection)
+                try:
+                    message.send()
+                except Exception as error:  # Chyba jednoho příjemce neovlivní zbytek dávky
+                    errors.append(error)
+                else:
+                    errors.append(None)
+        return errors
+
+
+class FileChannel:
+    """
+    Zapisuje oznámení jako JSON řádky do settings.NOTIFICATION_FILE_DIR/<kanál>.jsonl.
+
+    Náhrada skutečných kanálů pro vývoj a testy; u Pošty a Telefonu slouží jako podklad
+    pro tisk dopisů a SMS bránu.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, directory=None):
+        self.directory = directory or settings.NOTIFICATION_FILE_DIR
+
+    def send_batch(self, notifications):
+        os.makedirs(self.directory, exist_ok=True)
+        by_channel = defaultdict(list)
+        for notification in notifications:
+            by_channel[notification.job.channel].append(notification)
+        with self._lock:
+            for channel, items in by_channel.items():
+                with open(os.path.join(self.directory, f'{channel.lower()}.jsonl'), 'a', encoding='utf-8') as output:
+                    for notification in items:
+                        output.write(json.dumps({
+                            'job': notification.job.pk, 'kind': notification.job.kind,
+                            'order_id': str(notification.job.order_uuid), 'to': notification.recipient,
+                            'subject': notification.subject, 'body': notification.body,
+                        }, ensure_ascii=False) + '\n')
+        return [None] * len(notifications)
+
+
+_channels = {}
+
+
+def get_channel(name):
+    """Instance kanálu pro hodnotu Profile.communication_channel (podle settings.NOTIFICATION_CHANNELS)."""
+    path = settings.NOTIFICATION_CHANNELS[name]
+    if path not in _channels:
+        _channels[path] = import_string(path)()
+    return _channels[path]
+
+
+def user_channels(user_ids):
+    """Preferovaný kanál uživatelů jedním dotazem (uživatel bez profilu dostane Email)."""
+    channels = dict(Profile.objects.filter(user_id__in=user_ids).values_list('user_id', 'communication_channel'))
+    return {user_id: channels.get(user_id) or DEFAULT_CHANNEL for user_id in user_ids}
+
+
+def enqueue_order_confirmation(order):
+    """Zařadí potvrzení objednávky (volá se v transakci checkoutu - jeden INSERT, žádný přenos)."""
+    if not settings.NOTIFICATIONS_ENABLED:
+        return
+    profile = getattr(order.user, 'profile', None)  # Uživatel bez profilu -> None
+    NotificationJob.objects.create(
+        kind='order_confirmation', user=order.user, order_uuid=order.order_id,
+        channel=getattr(profile, 'communication_channel', None) or DEFAULT_CHANNEL,
+        payload={'price': str(order.price), 'status': order.status})
+
+
+def enqueue_status_changes(orders, from_status, to_status):
+    """Zařadí oznámení o změně stavu pro objednávky [(order_uuid, user_id)] - jedním bulk_create."""
+    if not settings.NOTIFICATIONS_ENABLED or not orders:
+        return
+    channels = user_channels({user_id for _, user_id in orders})
+    NotificationJob.objects.bulk_create([
+        NotificationJob(kind='status_change', user_id=user_id, order_uuid=order_uuid, channel=channels[user_id],
+                        payload={'from_status': from_status, 'status': to_status})
+        for order_uuid, user_id in orders
+    ], batch_size=1000)
+
+
+def recipient(job):
+    """Adresa příjemce podle kanálu úlohy - e-mail, telefon nebo poštovní adresa z profilu."""
+    user = job.user
+    profile = getattr(user, 'profile', None)
+    if job.channel == 'Email':
+        return user.email
+    if profile is None:
+        return ''
+    if job.channel == 'Telefon':
+        return profile.phone_number
+    if not profile.address:
+        return ''
+    name = ' '.join(part for part in (profile.first_name, profile.last_name) if part)
+    return f'{name}, {profile.address}, {profile.zipcode} {profile.city}'.strip(', ')
+
+
+def render(job):
+    """Oznámení k odeslání; PermanentError, pokud uživatel pro svůj kanál nemá adresu."""
+    to = recipient(job)
+    if not to:
+        raise PermanentError(f'User {job.user_id} has no address for channel {job.channel}.')
+    status = STATUS_LABELS.get(job.payload.get('status'), job.payload.get('status'))
+    if job.kind == 'order_confirmation':
+        subject = f'Potvrzení objednávky {job.order_uuid}'
+        body = (f'Děkujeme za objednávku {job.order_uuid}.\n'
+                f'Celková cena: {job.payload.get("price")} Kč\nStav: {status}\n')
+    else:
+        subject = f'Změna stavu objednávky {job.order_uuid}'
+        body = f'Objednávka {job.order_uuid} je nyní ve stavu: {status}.\n'
+    return Notification(job, to, subject, body)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def claim_batch(worker, batch_size=None):
+    """
+    Zamkne pro workera dávku čekajících úloh a vrátí je.
+
+    Úlohy zamčené déle než settings.NOTIFICATION_LOCK_TIMEOUT (worker spadl) se vrátí do fronty.
+    Zámek je podmíněný UPDATE (status='pending'), takže úlohu nezíská dvakrát ani souběžný worker.
+    """
+    now = timezone.now()
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    NotificationJob.objects.filter(
+        status='sending', locked_at__lt=now - datetime.timedelta(seconds=settings.NOTIFICATION_LOCK_TIMEOUT),
+    ).update(status='pending', locked_by='', locked_at=None)
+    with transaction.atomic():
+        ids = list(NotificationJob.objects.filter(status='pending', run_after__lte=now).order_by('run_after', 'id')
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return []
+        NotificationJob.objects.filter(id__in=ids, status='pending').update(
+            status='sending', locked_by=worker, locked_at=now)
+    return list(NotificationJob.objects.filter(id__in=ids, status='sending', locked_by=worker)
+                .select_related('user__profile').order_by('id'))
+
+
+def retry_delay(attempts):
+    """Prodleva před dalším pokusem (s) - settings.NOTIFICATION_RETRY_DELAY, pak dvojnásobek za každý pokus."""
+    return settings.NOTIFICATION_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def process_batch(worker=None, batch_size=None):
+    """
+    Odešle jednu dávku úloh; úlohy se po kanálech posílají najednou (send_batch).
+
+    Vrací:
+        int: Počet zpracovaných úloh (0 = fronta je prázdná).
+    """
+    worker = worker or worker_name()
+    jobs = claim_batch(worker, batch_size)
+    if not jobs:
+        return 0
+
+    sent, failures = [], []
+    by_channel = defaultdict(list)
+    for job in jobs:
+        try:
+            by_channel[job.channel].append(render(job))
+        except PermanentError as error:
+            failures.append((job, error, True))
+    for channel, notifications in by_channel.items():
+        try:
+            errors = get_channel(channel).send_batch(notifications)
+        except Exception as error:  # Kanál nedostupný - celá dávka kanálu se zopakuje
+            errors = [error] * len(notifications)
+        for notification, error in zip(notifications, errors):
+            if error is None:
+                sent.append(notification.job.pk)
+            else:
+                failures.append((notification.job, error, False))
+
+    now = timezone.now()
+    NotificationJob.objects.filter(id__in=sent).update(status='sent', sent_at=now, locked_by='', locked_at=None,
+                                                       attempts=F('attempts') + 1)
+    for job, error, permanent in failures:
+        job.attempts += 1
+        job.last_error = f'{type(error).__name__}: {error}'
+        job.locked_by, job.locked_at = '', None
+        if permanent or job.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            job.status = 'failed'
+            logger.warning('Notification %s failed permanently: %s', job.pk, job.last_error)
+        else:
+            job.status = 'pending'
+            job.run_after = now + datetime.timedelta(seconds=retry_delay(job.attempts))
+    NotificationJob.objects.bulk_update([job for job, _, _ in failures],
+                                        ['attempts', 'last_error', 'locked_by', 'locked_at', 'status', 'run_after'])
+    return len(jobs)
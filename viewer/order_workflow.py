@@ -0,0 +1,69 @@
+"""
+Stavový automat objednávek a hromadné změny stavu pro personál.
+
+TRANSITIONS určuje, do kterých stavů smí objednávka z daného stavu přejít. bulk_transition
+změní stav vybraných objednávek jedním UPDATE podmíněným původním stavem (objednávku, kterou
+mezitím změnil někdo jiný, nepřepíše), zapíše auditní záznamy OrderStatusChange přes
+bulk_create, přesune příspěvky objednávek v denních souhrnech prodejů (UPDATE neposílá signály)
+a zařadí zákazníkům oznámení o změně stavu (viewer.notifications).
+"""
+from django.db import transaction
+
+from viewer.models import Order, OrderStatusChange
+from viewer.notifications import enqueue_status_changes
+from viewer.rollups import move_orders
+
+TRANSITIONS = {
+    'submitted': ('pending_payment', 'processing', 'on_hold', 'cancelled'),
+    'pending_payment': ('processing', 'on_hold', 'cancelled'),
+    'processing': ('dispatched', 'on_hold', 'cancelled'),
+    'on_hold': ('processing', 'cancelled'),
+    'dispatched': ('delivered', 'returned'),
+    'delivered': ('completed', 'returned'),
+    'returned': ('refunded',),
+    'cancelled': ('refunded',),
+    'refunded': (),
+    'completed': (),
+}
+
+STATUS_LABELS = dict(Order.ORDER_STATUS_CHOICES)
+
+
+class InvalidTransition(Exception):
+    pass
+
+
+def allowed_targets(status):
+    """Stavy, do kterých smí objednávka ze stavu `status` přejít: [(hodnota, popisek)]."""
+    return [(target, STATUS_LABELS[target]) for target in TRANSITIONS.get(status, ())]
+
+
+def validate_transition(from_status, to_status):
+    if to_status not in TRANSITIONS.get(from_status, ()):
+        raise InvalidTransition(f'Order status cannot change from {from_status!r} to {to_status!r}.')
+
+
+def bulk_transition(order_ids, from_status, to_status, user=None):
+    """
+    Převede objednávky `order_ids`, které jsou ve stavu from_status, do stavu to_status.
+
+    Objednávky v jiném stavu se přeskočí. Vyhodí InvalidTransition pro přechod mimo TRANSITIONS.
+
+    Vrací:
+        int: Počet změněných objednávek.
+    """
+    validate_transition(from_status, to_status)
+    with transaction.atomic():
+        orders = list(Order.objects.select_for_update()
+                      .filter(pk__in=order_ids, status=from_status).values_list('pk', 'order_id', 'user_id'))
+        if not orders:
+            return 0
+        pks = [pk for pk, _, _ in orders]
+        updated = Order.objects.filter(pk__in=pks, status=from_status).update(status=to_status)
+        OrderStatusChange.objects.bulk_create([
+            OrderStatusChange(order_uuid=order_uuid, from_status=from_status, to_status=to_status, changed_by=user)
+            for _, order_uuid, _ in orders
+        ])
+        move_orders(pks, from_status, to_status)
+        enqueue_status_changes([(order_uuid, user_id) for _, order_uuid, user_id in orders], from_status, to_status)
+    return updated
@@ -0,0 +1,55 @@
+from viewer.models import StockMovement, Television, OrderItem
+from viewer.notifications import enqueue_order_confirmation
+from viewer.rollups import record_order
+from viewer.stock import sell
+
+
+class OutOfStockError(Exception):
+    """Na skladě není dostatek kusů pro položku košíku."""
+
+    def __init__(self, television):
+        super().__init__(f'Not enough stock for {television.brand_model}.')
+        self.television = television
+
+
+def place_order(order, cart):
+    """
+    Uloží objednávku, odečte kusy ze skladu (a zapíše je do knihy pohybů) a vytvoří položky objednávky.
+
+    Volá se uvnitř transakce (viz viewer.write_pipeline.run_write) - pokud některá položka
+    není skladem, vyvolá OutOfStockError a transakce vrátí všechny změny včetně objednávky.
+
+    Parametry:
+        order (Order): Neuložená objednávka s vyplněným uživatelem a doručovacími údaji.
+        cart (dict): Košík ze session (television_id -> {'quantity': ...}).
+
+    Návratová hodnota:
+        Order: Uložená objednávka s vypočtenou celkovou cenou.
+    """
+    order.price = 0  # Inicializace celkové ceny na 0
+    order.save()  # Nejprve ulozime objednavku
+
+    total_price = 0  # Proměnná pro výpočet celkové ceny
+    movements = []
+    for television_id, item in cart.items():
+        count = item['quantity']  # Získání počtu z košíku
+        television = Television.objects.get(id=television_id)
+
+        # Odečteme kusy ze skladu podmíněným UPDATE - selže, pokud na skladě není dost kusů
+        movement = sell(television, count, order.order_id)
+        if movement is None:
+            raise OutOfStockError(television)
+        movements.append(movement)
+
+        # Vytvoření položky objednávky
+        OrderItem.objects.create(order=order, television=television, quantity=count, unit_price=television.price)
+
+        total_price += television.price * count  # Přičtení ceny
+
+    StockMovement.objects.bulk_create(movements)  # Prodeje do knihy skladových pohybů
+    order.price = total_price
+    order.status = 'submitted'
+    order.save()
+    record_order(order)  # Denní souhrny prodejů ve stejné transakci
+    enqueue_order_confirmation(order)  # Jen úloha ve frontě - odešle ji worker mimo požadavek
+    return order
@@ -0,0 +1,165 @@
+"""
+Profilování jednotlivých požadavků na vyžádání (cProfile).
+
+Profil se pořídí, pokud o něj požádá přihlášený člen personálu hlavičkou `X-Profile: 1`
+nebo parametrem `?profile=1`, nebo náhodně s pravděpodobností settings.PROFILING_SAMPLE_RATE
+(vzorkování vybírá ze všech požadavků včetně nepřihlášených). V procesu běží nejvýše jeden profil
+najednou - od Pythonu 3.12 nelze spustit druhý cProfile ani v jiném vlákně; požadavek, který přijde
+během profilování jiného, proběhne bez profilu.
+Výsledek se uloží do settings.PROFILING_DIR jako `.prof` (pro pstats, snakeviz) a jako
+collapsed stacks (`.collapsed`, pro flamegraph.pl nebo speedscope); adresář se rotuje na
+settings.PROFILING_KEEP posledních profilů.
+"""
+import cProfile
+import datetime
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+PROFILE_EXTENSIONS = ('.prof', '.collapsed')
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_-]+')
+
+_profiler_lock = threading.Lock()
+
+
+def is_profiling_requested(request):
+    """Vrátí True, pokud se má požadavek profilovat (volá se až po AuthenticationMiddleware)."""
+    if not settings.PROFILING_ENABLED:
+        return False
+    requested = (request.META.get('HTTP_X_PROFILE') == '1' or
+                 request.GET.get(settings.PROFILING_QUERY_PARAM) == '1')
+    if requested:
+        return request.user.is_staff
+    return settings.PROFILING_SAMPLE_RATE > 0 and random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':  # vestavěné funkce
+        return name.replace(';', ':')
+    return f'{name} ({os.path.basename(filename)}:{line})'.replace(';', ':')
+
+
+def collapsed_stacks(stats, min_us=1, max_depth=64):
+    """
+    Převede pstats.Stats na collapsed stacks - řádky `a;b;c mikrosekundy`.
+
+    cProfile ukládá jen hrany volající -> volaný, celé zásobníky se proto rekonstruují
+    procházením grafu od kořenů. Čas funkce volané z více míst se mezi cesty rozdělí
+    v poměru časů jednotlivých hran. Rekurze se na zásobníku usekne.
+    """
+    callees = defaultdict(list)
+    roots = []
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        if not callers:
+            roots.append(func)
+        for caller, edge in callers.items():
+            callees[caller].append((func, edge[3]))
+
+    totals = defaultdict(float)
+
+    def walk(func, stack, weight):
+        _, _, tt, ct, _ = stats.stats[func]
+        stack = stack + [_label(func)]
+        totals[';'.join(stack)] += tt * weight
+        if len(stack) >= max_depth:
+            return
+        for callee, edge_time in callees[func]:
+            callee_total = stats.stats[callee][3]
+            if not callee_total or _label(callee) in stack:
+                continue
+            child_weight = weight * edge_time / callee_total
+            if edge_time * weight * 1e6 >= min_us:
+                walk(callee, stack, min(child_weight, 1.0))
+
+    for root in roots:
+        walk(root, [], 1.0)
+    return [f'{stack} {round(seconds * 1e6)}' for stack, seconds in sorted(totals.items())
+            if seconds * 1e6 >= min_us]
+
+
+def _rotate(directory, keep):
+    profiles = sorted((entry for entry in os.scandir(directory) if entry.name.endswith('.prof')),
+                      key=lambda entry: entry.stat().st_mtime)
+    for entry in profiles[:max(0, len(profiles) - keep)]:
+        stem = entry.path[:-len('.prof')]
+        for extension in PROFILE_EXTENSIONS:
+            try:
+                os.remove(stem + extension)
+            except FileNotFoundError:
+                pass
+
+
+def save_profile(profiler, request, elapsed):
+    """Uloží profil požadavku (.prof a .collapsed) a vrátí jméno souboru bez přípony."""
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    view = getattr(request.resolver_match, 'view_name', None) or request.path
+    name = '{}-{}-{}ms-{}'.format(time.strftime('%Y%m%d-%H%M%S'), _UNSAFE_CHARS.sub('_', view).strip('_')[:60],
+                                  round(elapsed * 1000), os.urandom(3).hex())
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path + '.prof')
+    with open(path + '.collapsed', 'w', encoding='utf-8') as output:
+        output.write('\n'.join(collapsed_stacks(pstats.Stats(profiler))) + '\n')
+    _rotate(directory, settings.PROFILING_KEEP)
+    return name
+
+
+def list_profiles():
+    """Vrátí uložené profily od nejnovějšího: [{'name', 'created', 'size', 'files'}]."""
+    directory = settings.PROFILING_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.prof'):
+            stem = entry.name[:-len('.prof')]
+            profiles.append({
+                'name': stem,
+                'created': datetime.datetime.fromtimestamp(entry.stat().st_mtime, tz=datetime.timezone.utc),
+                'size': entry.stat().st_size,
+                'files': [stem + extension for extension in PROFILE_EXTENSIONS
+                          if os.path.exists(os.path.join(directory, stem + extension))],
+            })
+    return sorted(profiles, key=lambda profile: profile['created'], reverse=True)
+
+
+def profile_file_path(filename):
+    """Cesta k souboru profilu, nebo None pro neplatné jméno (ochrana proti path traversal)."""
+    stem, extension = os.path.splitext(filename)
+    if extension not in PROFILE_EXTENSIONS or _UNSAFE_CHARS.sub('', stem) != stem:
+        return None
+    path = os.path.join(settings.PROFILING_DIR, filename)
+    return path if os.path.isfile(path) else None
+
+
+def run_profiled(get_response, request):
+    """
+    Zavolá get_response pod cProfile a profil uloží; jméno profilu vrátí v hlavičce X-Profile-Id.
+
+    Pokud se v procesu už profiluje jiný požadavek, zavolá get_response bez profilu.
+    """
+    if not _profiler_lock.acquire(blocking=False):
+        return get_response(request)
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Aktivní profiler spuštěný mimo tento modul
+            return get_response(request)
+        started = time.perf_counter()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+        response['X-Profile-Id'] = save_profile(profiler, request, time.perf_counter() - started)
+        return response
+    finally:
+        _profiler_lock.release()
@@ -0,0 +1,146 @@
+"""
+Omezení počtu požadavků (token bucket) pro drahé nebo zneužitelné pohledy.
+
+Pravidla jsou ve settings.RATELIMITS pod názvem skupiny; pohled se ke skupině přihlásí mixinem
+RateLimitMixin (atribut ratelimit_group). Kontrola běží v dispatch před vlastní prací pohledu
+(i před kontrolou přihlášení), při vyčerpání vrací 429 s hlavičkou Retry-After. Každé pravidlo má
+jeden nebo více klíčů - 'ip', 'user' (přihlášený uživatel, jinak IP) a 'username' (jméno
+z přihlašovacího formuláře) - a každý klíč svůj bucket.
+
+Buckety drží LRUStore v paměti procesu; při více procesech nastavte settings.RATELIMIT_CACHE_ALIAS
+na cache SocketCache (manage.py run_cache_server), kde se token odebírá atomicky na serveru.
+"""
+import hashlib
+import logging
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from viewer.cache import LRUStore
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class LocalStore:
+    """Buckety v paměti procesu - stejná logika jako na cache serveru (LRUStore, operace take)."""
+
+    def __init__(self, max_entries=100000):
+        self._store = LRUStore(max_entries)
+
+    def take(self, key, rate, burst):
+        response = self._store.execute({'op': 'take', 'key': key, 'rate': rate, 'burst': burst})
+        return response['allowed'], response['retry_after']
+
+
+_local_store = None
+
+
+def get_store():
+    global _local_store
+    if settings.RATELIMIT_CACHE_ALIAS:
+        return caches[settings.RATELIMIT_CACHE_ALIAS]
+    if _local_store is None:
+        _local_store = LocalStore(settings.RATELIMIT_MAX_KEYS)
+    return _local_store
+
+
+def parse_rate(rate):
+    """'30/m' -> 0.5 tokenu za sekundu."""
+    count, _, period = rate.partition('/')
+    return int(count) / PERIODS[period]
+
+
+def client_ip(request):
+    return request.META.get(settings.RATELIMIT_IP_META) or request.META.get('REMOTE_ADDR', '')
+
+
+def request_keys(request, keys):
+    """Klíče bucketů požadavku podle pravidla ('ip', 'user', 'username')."""
+    values = []
+    for kind in keys:
+        if kind == 'ip':
+            values.append(f'ip:{client_ip(request)}')
+        elif kind == 'user':
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                values.append(f'user:{user.pk}')
+            else:
+                values.append(f'ip:{client_ip(request)}')
+        elif kind == 'username':
+            username = request.POST.get('username', '').strip().lower()
+            if username:
+                # Zadané jméno je libovolný text - do klíče cache jde jeho otisk
+                values.append('username:' + hashlib.sha256(username.encode()).hexdigest()[:32])
+        else:
+            raise ValueError(f'Unknown rate limit key {kind!r}.')
+    return values
+
+
+def check(request, group):
+    """
+    Odebere token ze všech bucketů požadavku ve skupině `group`.
+
+    Vrací:
+        float | None: Za kolik sekund to zkusit znovu, None pokud požadavek smí pokračovat.
+    """
+    rule = settings.RATELIMITS.get(group)
+    if not settings.RATELIMIT_ENABLED or rule is None:
+        return None
+    if request.method not in rule.get('methods', ('GET', 'HEAD', 'POST')):
+        return None
+    rate, burst = parse_rate(rule['rate']), rule.get('burst', 1)
+    store = get_store()
+    retry_after = None
+    for key in request_keys(request, rule.get('keys', ['ip'])):
+        try:
+            allowed, wait = store.take(f'ratelimit:{group}:{key}', rate, burst)
+        except OSError:
+            # Nedostupný cache server nesmí shodit obchod - požadavek se pustí
+            logger.warning('Rate limit store unavailable, allowing request.', exc_info=True)
+            return None
+        if not allowed:
+            retry_after = max(retry_after or 0, wait)
+    return retry_after
+
+
+def too_many_requests(retry_after):
+    seconds = max(1, math.ceil(retry_after))
+    response = HttpResponse(f'Příliš mnoho požadavků, zkuste to znovu za {seconds} s.',
+                            status=429, content_type='text/plain; charset=utf-8')
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def limited_response(request, group):
+    """Odpověď 429, pokud požadavek překročil limit skupiny, jinak None."""
+    retry_after = check(request, group)
+    return None if retry_after is None else too_many_requests(retry_after)
+
+
+class RateLimitMixin:
+    """
+    Mixin pohledu - kontrola limitu skupiny `ratelimit_group` před zbytkem dispatch.
+
+    Uvádí se jako první předek (před LoginRequiredMixin), aby omezení platilo i pro nepřihlášené.
+    """
+    ratelimit_group = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._async_dispatch(request, *args, **kwargs)
+        response = limited_response(request, self.ratelimit_group)
+        if response is not None:
+            return response
+        return super().dispatch(request, *args, **kwargs)
+
+    async def _async_dispatch(self, request, *args, **kwargs):
+        # Klíč 'user' může načíst uživatele ze session - mimo event loop
+        response = await sync_to_async(limited_response)(request, self.ratelimit_group)
+        if response is not None:
+            return response
+        return await super().dispatch(request, *args, **kwargs)
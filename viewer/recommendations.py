@@ -0,0 +1,192 @@
+"""
+Doporučení podobných televizí pro detail televize (model TelevisionSimilarity).
+
+Každá televize se převede na číselný vektor: standardizovaná úhlopříčka, obnovovací frekvence,
+logaritmus ceny a rok vydání a one-hot rozlišení, technologie displeje, operační systém
+a značka, každá část s vahou z FEATURE_WEIGHTS. Nejbližší sousedé (euklidovská vzdálenost)
+se počítají po dávkách maticově v NumPy: |q|^2 + |x|^2 - 2 q.x pro celou dávku proti
+celému katalogu najednou, bez cyklu v Pythonu přes dvojice televizí.
+
+Po uložení televize se přepočítají jen dotčené řádky (refresh_televisions) - její vlastní
+sousedé, televize, které ji měly mezi sousedy, a televize, ke kterým se nově přiblížila.
+Každý přepočet načte celý katalog, proto se změny jedné transakce slučují do jediného přepočtu.
+Hromadné změny bez signálů (bulk_create generátoru dat) přepočítá příkaz rebuild_recommendations.
+"""
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from viewer.catalog import CATALOG_RELATED
+from viewer.models import Television, TelevisionSimilarity
+
+FEATURE_WEIGHTS = {
+    'tv_screen_size': 2.0,
+    'refresh_rate': 1.0,
+    'price': 2.0,
+    'tv_released_year': 1.0,
+    'display_resolution_id': 1.0,
+    'display_technology_id': 1.5,
+    'operation_system_id': 0.5,
+    'brand_id': 1.0,
+}
+NUMERIC_FEATURES = ('tv_screen_size', 'refresh_rate', 'price', 'tv_released_year')
+CATEGORICAL_FEATURES = ('display_resolution_id', 'display_technology_id', 'operation_system_id', 'brand_id')
+
+# Televize čekající na přepočet po commitu (transakce běží vždy v jednom vlákně)
+_pending = threading.local()
+
+
+def build_features():
+    """
+    Vektory všech televizí jedním dotazem.
+
+    Vrací:
+        tuple: (pole id televizí seřazených podle pk, matice float32 s řádkem pro každou televizi)
+    """
+    rows = list(Television.objects.order_by('pk').values_list('pk', *NUMERIC_FEATURES, *CATEGORICAL_FEATURES))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+    columns = list(zip(*rows))
+    blocks = []
+    for name, values in zip(NUMERIC_FEATURES, columns[1:]):
+        column = np.array(values, dtype=np.float64)
+        if name == 'price':
+            column = np.log1p(column)
+        std = column.std()
+        column = (column - column.mean()) / std if std else np.zeros_like(column)
+        blocks.append(column[:, None] * FEATURE_WEIGHTS[name])
+    for name, values in zip(CATEGORICAL_FEATURES, columns[1 + len(NUMERIC_FEATURES):]):
+        _, codes = np.unique(np.array(values, dtype=np.int64), return_inverse=True)
+        one_hot = np.zeros((len(rows), codes.max() + 1))
+        one_hot[np.arange(len(rows)), codes] = 1
+        # Dvě různé hodnoty jsou od sebe vzdálené přesně o váhu
+        blocks.append(one_hot * (FEATURE_WEIGHTS[name] / np.sqrt(2)))
+    return np.array(columns[0], dtype=np.int64), np.hstack(blocks).astype(np.float32)
+
+
+def nearest_neighbours(features, rows, k, batch_size=None):
+    """
+    k nejbližších sousedů pro řádky `rows` matice `features` (bez sebe sama).
+
+    Vrací:
+        tuple: (indexy sousedů, vzdálenosti) - dvě matice len(rows) x k, seřazené od nejbližšího
+    """
+    batch_size = batch_size or settings.RECOMMENDATIONS_BATCH_SIZE
+    k = min(k, len(features) - 1)
+    rows = np.asarray(rows, dtype=np.int64)
+    squared_norms = np.einsum('ij,ij->i', features, features)
+    indices = np.empty((len(rows), max(k, 0)), dtype=np.int64)
+    distances = np.empty((len(rows), max(k, 0)), dtype=np.float32)
+    if k <= 0:
+        return indices, distances
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        squared = squared_norms[batch, None] + squared_norms[None, :] - 2 * features[batch] @ features.T
+        np.maximum(squared, 0, out=squared)  # zaokrouhlovací chyby float32
+        squared[np.arange(len(batch)), batch] = np.inf
+        candidates = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        candidate_distances = np.take_along_axis(squared, candidates, axis=1)
+        # Seřadit podle vzdálenosti, při shodě podle pořadí televize (stabilní výsledek)
+        order = np.lexsort((candidates, candidate_distances), axis=1)
+        indices[start:start + len(batch)] = np.take_along_axis(candidates, order, axis=1)
+        distances[start:start + len(batch)] = np.sqrt(np.take_along_axis(candidate_distances, order, axis=1))
+    return indices, distances
+
+
+def similarity_rows(ids, rows, indices, distances):
+    return [TelevisionSimilarity(television_id=ids[row], similar_id=ids[neighbour], rank=rank,
+                                 score=float(1 / (1 + distance)))
+            for row, neighbours, row_distances in zip(rows, indices, distances)
+            for rank, (neighbour, distance) in enumerate(zip(neighbours, row_distances))]
+
+
+def rebuild_all(k=None, batch_size=None):
+    """Přepočítá sousedy všech televizí. Vrací počet televizí."""
+    k = k or settings.RECOMMENDATIONS_NEIGHBOURS
+    ids, features = build_features()
+    rows = np.arange(len(ids))
+    indices, distances = nearest_neighbours(features, rows, k, batch_size)
+    with transaction.atomic():
+        TelevisionSimilarity.objects.all().delete()
+        TelevisionSimilarity.objects.bulk_create(similarity_rows(ids, rows, indices, distances), batch_size=5000)
+    return len(ids)
+
+
+def refresh_televisions(television_ids, affected=()):
+    """
+    Přepočítá sousedy po změně televizí `television_ids` jen pro dotčené televize.
+
+    Dotčené jsou změněné televize samy, televize, které je měly mezi sousedy, a televize,
+    ke kterým je teď změněná televize blíž než jejich dosavadní nejvzdálenější soused;
+    `affected` přidá další televize (např. ty, které měly mezi sousedy smazanou televizi).
+    Standardizace se počítá z celého katalogu, malý posun průměrů ostatní řádky neopravuje -
+    to udělá až rebuild_recommendations.
+    """
+    k = settings.RECOMMENDATIONS_NEIGHBOURS
+    ids, features = build_features()
+    position = {television_id: row for row, television_id in enumerate(ids.tolist())}
+    affected = set(affected) | {television_id for television_id in television_ids if television_id in position}
+    affected.update(TelevisionSimilarity.objects.filter(similar_id__in=television_ids)
+                    .values_list('television_id', flat=True))
+
+    changed = [position[television_id] for television_id in television_ids if television_id in position]
+    if changed:
+        # Nejvzdálenější uložený soused každé televize (televize s méně sousedy bere každého)
+        farthest = np.full(len(ids), np.inf, dtype=np.float32)
+        for television_id, score in TelevisionSimilarity.objects.filter(rank=k - 1).values_list('television_id',
+                                                                                                  'score'):
+            if television_id in position:
+                farthest[position[television_id]] = 1 / score - 1
+        changed_features = features[changed]
+        squared = (np.einsum('ij,ij->i', changed_features, changed_features)[:, None]
+                   + np.einsum('ij,ij->i', features, features)[None, :] - 2 * changed_features @ features.T)
+        closer = (np.sqrt(np.maximum(squared, 0)) < farthest[None, :]).any(axis=0)
+        affected.update(ids[closer].tolist())
+
+    rows = np.array(sorted(position[television_id] for television_id in affected if television_id in position),
+                    dtype=np.int64)
+    indices, distances = nearest_neighbours(features, rows, k)
+    with transaction.atomic():
+        TelevisionSimilarity.objects.filter(television_id__in=affected).delete()
+        TelevisionSimilarity.objects.bulk_create(similarity_rows(ids, rows, indices, distances), batch_size=5000)
+    return len(rows)
+
+
+def similarities(television_id):
+    """Sousedé televize od nejpodobnější (s televizemi a číselníky) - jeden dotaz přes index (television, rank)."""
+    return (TelevisionSimilarity.objects.filter(television_id=television_id).order_by('rank')
+            .select_related(*(f'similar__{field}' for field in CATALOG_RELATED)))
+
+
+def _schedule_refresh(television_ids=(), affected=()):
+    """Přidá televize k přepočtu po commitu - všechny změny jedné transakce přepočítá jediné volání."""
+    if not hasattr(_pending, 'changed'):
+        _pending.changed, _pending.affected = set(), set()
+    _pending.changed.update(television_ids)
+    _pending.affected.update(affected)
+    # Callback se registruje při každé změně (odvolaný savepoint zahodí jen svůj), přepočítá ale jen první
+    transaction.on_commit(_run_pending_refresh)
+
+
+def _run_pending_refresh():
+    changed, affected = getattr(_pending, 'changed', set()), getattr(_pending, 'affected', set())
+    _pending.changed, _pending.affected = set(), set()
+    if changed or affected:
+        refresh_televisions(sorted(changed), affected=affected)
+
+
+def television_saved(sender, instance, raw=False, **kwargs):
+    """post_save - po commitu přepočítá sousedy dotčených televizí (settings.RECOMMENDATIONS_REFRESH_ON_SAVE)."""
+    if not raw and settings.RECOMMENDATIONS_REFRESH_ON_SAVE:
+        _schedule_refresh([instance.pk])
+
+
+def television_deleted(sender, instance, **kwargs):
+    """pre_delete - televize, které mazanou měly mezi sousedy, dostanou po commitu nové sousedy."""
+    if settings.RECOMMENDATIONS_REFRESH_ON_SAVE:
+        referencing = list(TelevisionSimilarity.objects.filter(similar=instance)
+                           .values_list('television_id', flat=True))
+        if referencing:
+            _schedule_refresh(affected=referencing)
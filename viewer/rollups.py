@@ -0,0 +1,202 @@
+"""
+Průběžně udržované denní souhrny prodejů (model DailySalesRollup).
+
+Každá objednávka přispívá do řádků (den, značka, technologie displeje, stav) tržbou, kusy
+a jednou objednávkou za každou skupinu, ve které má položku. Příspěvek se přičte při checkoutu
+(record_order v place_order), při změně stavu se přesune ze starého stavu do nového
+(signál pre_save) a při smazání objednávky se odečte (pre_delete). Hromadné operace bez
+signálů (QuerySet.update, bulk_create) musí souhrny upravit samy (hromadná změna stavu přes
+move_orders), nebo je přepočítat příkazem rebuild_sales_rollups. Archivace objednávek (viewer.archive)
+souhrny nemění a přepočet zahrnuje i archiv. Tržba se počítá z ceny za kus uložené v položce při checkoutu
+(OrderItem.unit_price), takže se odečte přesně to, co se přičetlo, i když se cena televize mezitím změnila.
+Řádky, ve kterých po odečtení nezůstane žádný kus, se smažou.
+"""
+import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from viewer.models import ArchivedOrder, ArchivedOrderItem, DailySalesRollup, Order, OrderItem
+
+_paused = ContextVar('sales_rollups_paused', default=False)
+
+REVENUE_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+
+@contextmanager
+def rollups_paused():
+    """Dočasně vypne průběžnou aktualizaci souhrnů (např. při archivaci objednávek)."""
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+def order_contributions(order, status=None, items=None):
+    """
+    Příspěvek objednávky do souhrnů.
+
+    Vrací:
+        dict: (den, brand_id, display_technology_id, stav) -> [tržba, kusy, počet objednávek]
+    """
+    if items is None:
+        items = order.items.select_related('television')
+    day = timezone.localdate(order.order_date)
+    contributions = {}
+    for item in items:
+        television = item.television
+        key = (day, television.brand_id, television.display_technology_id, status or order.status)
+        row = contributions.setdefault(key, [Decimal(0), 0, 1])
+        row[0] += item.unit_price * item.quantity
+        row[1] += item.quantity
+    return contributions
+
+
+def apply_contributions(contributions, sign=1):
+    """
+    Přičte (sign=1) nebo odečte (sign=-1) příspěvky - jeden UPDATE na skupinu, chybějící řádek se založí.
+
+    Po odečtení smaže jedním DELETE dotčené řádky, ve kterých nezůstal žádný kus.
+    """
+    emptied = Q(pk__in=[])
+    for (day, brand_id, technology_id, status), (revenue, units, orders) in contributions.items():
+        lookup = {'day': day, 'brand_id': brand_id, 'display_technology_id': technology_id, 'status': status}
+        emptied |= Q(**lookup)
+        changes = {'revenue': F('revenue') + sign * revenue, 'units': F('units') + sign * units,
+                   'order_count': F('order_count') + sign * orders}
+        if DailySalesRollup.objects.filter(**lookup).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                DailySalesRollup.objects.create(**lookup, revenue=sign * revenue, units=sign * units,
+                                                order_count=sign * orders)
+        except IntegrityError:
+            # Řádek mezitím založil souběžný zápis
+            DailySalesRollup.objects.filter(**lookup).update(**changes)
+    if sign < 0 and contributions:
+        DailySalesRollup.objects.filter(emptied, units__lte=0).delete()
+
+
+def record_order(order):
+    """Přičte novou objednávku do souhrnů (volá se v transakci checkoutu)."""
+    if not _paused.get():
+        apply_contributions(order_contributions(order))
+
+
+def remember_status(sender, instance, **kwargs):
+    """post_init/post_save - zapamatuje si stav, se kterým byla objednávka načtena nebo uložena."""
+    instance._rollup_status = instance.status
+
+
+def order_status_changed(sender, instance, raw=False, **kwargs):
+    """pre_save - při změně stavu uložené objednávky přesune její příspěvek do nového stavu."""
+    old_status = getattr(instance, '_rollup_status', None)
+    if raw or _paused.get() or instance.pk is None or old_status is None or old_status == instance.status:
+        return
+    items = list(instance.items.select_related('television'))
+    apply_contributions(order_contributions(instance, old_status, items), sign=-1)
+    apply_contributions(order_contributions(instance, items=items))
+
+
+def order_deleted(sender, instance, **kwargs):
+    """pre_delete - odečte příspěvek mazané objednávky (položky v tu chvíli ještě existují)."""
+    if not _paused.get():
+        apply_contributions(order_contributions(instance, getattr(instance, '_rollup_status', None)), sign=-1)
+
+
+def orders_contributions(order_ids, status):
+    """Příspěvek více objednávek (ve stavu `status`) jedním GROUP BY dotazem - formát jako order_contributions."""
+    rows = (OrderItem.objects.filter(order_id__in=order_ids)
+            .annotate(day=TruncDate('order__order_date'))
+            .values('day', 'television__brand_id', 'television__display_technology_id')
+            .annotate(revenue=Sum(F('quantity') * F('unit_price'), output_field=REVENUE_FIELD),
+                      units=Sum('quantity'), order_count=Count('order_id', distinct=True)))
+    return {(row['day'], row['television__brand_id'], row['television__display_technology_id'], status):
+            [row['revenue'], row['units'], row['order_count']] for row in rows}
+
+
+def move_orders(order_ids, from_status, to_status):
+    """Přesune příspěvek objednávek hromadně změněných přes QuerySet.update ze stavu from_status do to_status."""
+    if _paused.get() or not order_ids:
+        return
+    contributions = orders_contributions(order_ids, from_status)
+    apply_contributions(contributions, sign=-1)
+    apply_contributions({(day, brand_id, technology_id, to_status): values
+                         for (day, brand_id, technology_id, _), values in contributions.items()})
+
+
+def aggregate_range(start, end):
+    """Spočítá souhrny objednávek (provozních i archivovaných) s order_date v [start, end) - GROUP BY na tabulku."""
+    totals = {}
+    for items in (OrderItem.objects, ArchivedOrderItem.objects):
+        rows = (items
+                .filter(order__order_date__gte=start, order__order_date__lt=end)
+                .annotate(day=TruncDate('order__order_date'))
+                .values('day', 'television__brand_id', 'television__display_technology_id', 'order__status')
+                .annotate(revenue=Sum(F('quantity') * F('unit_price'), output_field=REVENUE_FIELD),
+                          units=Sum('quantity'), order_count=Count('order_id', distinct=True)))
+        for row in rows:
+            key = (row['day'], row['television__brand_id'], row['television__display_technology_id'],
+                   row['order__status'])
+            # Objednávka je vždy jen v jedné z tabulek, součty se proto nepřekrývají
+            total = totals.setdefault(key, [Decimal(0), 0, 0])
+            total[0] += row['revenue']
+            total[1] += row['units']
+            total[2] += row['order_count']
+    return [DailySalesRollup(day=day, brand_id=brand_id, display_technology_id=technology_id, status=status,
+                             revenue=revenue, units=units, order_count=order_count)
+            for (day, brand_id, technology_id, status), (revenue, units, order_count) in totals.items()]
+
+
+def rebuild_chunks(since=None, chunk_days=30):
+    """Rozdělí období [since nebo nejstarší objednávka včetně archivu, zítra) na úseky po chunk_days dnech."""
+    first = since
+    if first is None:
+        oldest = [model.objects.order_by('order_date').values_list('order_date', flat=True).first()
+                  for model in (Order, ArchivedOrder)]
+        first = min((date for date in oldest if date is not None), default=None)
+    if first is None:
+        return []
+    start = timezone.make_aware(datetime.datetime.combine(timezone.localdate(first), datetime.time()))
+    end = timezone.make_aware(datetime.datetime.combine(timezone.localdate() + datetime.timedelta(days=1),
+                                                        datetime.time()))
+    step = datetime.timedelta(days=chunk_days)
+    chunks = []
+    while start < end:
+        chunks.append((start, min(start + step, end)))
+        start += step
+    return chunks
+
+
+def sales_summary(days):
+    """
+    Data pro přehled prodejů za posledních `days` dní - čte jen souhrny, ne objednávky.
+
+    Tržbou jsou jen objednávky ve stavech settings.SALES_REVENUE_STATUSES (bez zrušených, refundovaných
+    a vrácených) - z nich se počítají 'totals', 'daily', 'by_brand' a 'by_technology'; 'by_status'
+    ukazuje všechny stavy.
+
+    Vrací:
+        dict: 'daily', 'by_brand', 'by_technology', 'by_status' (seznamy slovníků s revenue, units,
+        order_count) a 'totals' (tržba a kusy). Objednávka s položkami více skupin se v order_count
+        započítá u každé z nich, součty objednávek jsou proto horním odhadem.
+    """
+    since = timezone.localdate() - datetime.timedelta(days=days - 1)
+    rollups = DailySalesRollup.objects.filter(day__gte=since)
+    sales = rollups.filter(status__in=settings.SALES_REVENUE_STATUSES)
+    measures = {'revenue': Sum('revenue'), 'units': Sum('units'), 'order_count': Sum('order_count')}
+    return {
+        'since': since,
+        'daily': list(sales.values('day').annotate(**measures).order_by('-day')),
+        'by_brand': list(sales.values('brand__brand_name').annotate(**measures).order_by('-revenue')),
+        'by_technology': list(sales.values('display_technology__name').annotate(**measures).order_by('-revenue')),
+        'by_status': list(rollups.values('status').annotate(**measures).order_by('-revenue')),
+        'totals': sales.aggregate(revenue=Sum('revenue'), units=Sum('units')),
+    }
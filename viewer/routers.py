@@ -0,0 +1,67 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Stav aktuálního HTTP požadavku pro ReplicaRouter (nastavuje ReplicaPinningMiddleware).
+# Mimo požadavek (příkazy, testy) je None a vše se čte z primární databáze.
+replica_state = ContextVar('replica_state', default=None)
+
+
+class ReplicaState:
+    """
+    Stav požadavku vůči replikám.
+
+    Atributy:
+        pinned (bool): Požadavek čte vše z primární databáze (POST nebo nedávný zápis uživatele).
+        wrote (bool): Požadavek zapsal do modelu čteného z repliky - další čtení musí jít na primární.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+    @property
+    def use_primary(self):
+        return self.pinned or self.wrote
+
+
+class ReplicaRouter:
+    """
+    Router posílající čtení katalogu a historie objednávek na repliky.
+
+    Repliky jsou v settings.REPLICA_DATABASES, modely, jejichž čtení smí jít na repliku,
+    v settings.REPLICA_READ_MODELS. Zápisy jdou vždy na primární databázi a zároveň
+    přišpendlí zbytek požadavku k primární databázi (read-after-write).
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.REPLICA_DATABASES
+        state = replica_state.get()
+        if not replicas or state is None or state.use_primary:
+            return None
+        if model._meta.label_lower not in settings.REPLICA_READ_MODELS:
+            return None
+        # Uvnitř transakce na primární databázi čteme z ní - jinak bychom neviděli vlastní zápisy
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = replica_state.get()
+        if state is not None and model._meta.label_lower in settings.REPLICA_READ_MODELS:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Repliky jsou kopie primární databáze (refresh_replica), nemigrují se samostatně
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
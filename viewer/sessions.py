@@ -0,0 +1,35 @@
+"""
+Session engine: write-through cache nad databází, který neukládá nezměněné session.
+
+Vychází z django.contrib.sessions.backends.cached_db - čtení jde z cache settings.SESSION_CACHE_ALIAS
+(v jednom procesu LocMemCache, pro více procesů viewer.cache.SocketCache nebo jiná sdílená cache)
+a databáze se čte jen při chybějící položce. Zápis jde do databáze i do cache, ale jen pokud se
+data session od načtení opravdu změnila - pohledy často nastaví session['cart'] na stejnou hodnotu
+a označí session jako změněnou, i když se nic nezměnilo.
+"""
+import hashlib
+
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = 'viewer.sessions'
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded_digest = None
+
+    def _digest(self, data):
+        return hashlib.sha1(self.serializer().dumps(data)).hexdigest()
+
+    def load(self):
+        data = super().load()
+        self._loaded_digest = self._digest(data) if data else None
+        return data
+
+    def save(self, must_create=False):
+        if (not must_create and self.session_key is not None and self._loaded_digest is not None and
+                self._digest(self._get_session()) == self._loaded_digest):
+            return  # Data se od načtení nezměnila
+        super().save(must_create)
+        self._loaded_digest = self._digest(self._get_session())
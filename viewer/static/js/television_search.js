@@ -0,0 +1,38 @@
+// Vyhledávání televize ve formuláři skladu - možnosti selectu se načítají ze serveru podle zadaného textu
+document.addEventListener('DOMContentLoaded', () => {
+    document.querySelectorAll('select[data-search-url]').forEach((select) => {
+        const search = document.createElement('input');
+        search.type = 'search';
+        search.className = 'form-control mb-2';
+        search.placeholder = 'Hledat značku nebo model...';
+        select.parentNode.insertBefore(search, select);
+
+        let timer = null;
+        let lastQuery = null;
+
+        async function load(query) {
+            if (query === lastQuery) {
+                return;
+            }
+            lastQuery = query;
+            const response = await fetch(`${select.dataset.searchUrl}?q=${encodeURIComponent(query)}`, {
+                headers: {'Accept': 'application/json'},
+            });
+            if (!response.ok || query !== lastQuery) {
+                return; // Chyba nebo mezitím přišel novější dotaz
+            }
+            const data = await response.json();
+            const selected = select.value;
+            select.replaceChildren(new Option('---------', ''));
+            data.results.forEach((item) => {
+                select.add(new Option(item.text, item.id, false, String(item.id) === selected));
+            });
+        }
+
+        search.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => load(search.value.trim()), 250);
+        });
+        select.addEventListener('focus', () => load(search.value.trim()), {once: true});
+    });
+});
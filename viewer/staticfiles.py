@@ -0,0 +1,99 @@
+"""
+Statické soubory: finders bez MEDIA_ROOT a úložiště pro produkci - ManifestStaticFilesStorage (hash
+obsahu v názvu souboru), která při collectstatic uloží k textovým souborům i předkomprimované varianty
+.gz a .br.
+
+Brotli vyžaduje volitelný balíček `brotli`; bez něj se vytváří jen .gz. Varianty servíruje
+viewer.views.serve_static (nebo front-end server, např. nginx s gzip_static/brotli_static).
+"""
+import gzip
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import AppDirectoriesFinder, FileSystemFinder
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # volitelná závislost
+    brotli = None
+
+# Obrázky, fonty a archivy už komprimované jsou
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml', '.ico'}
+COMPRESS_MIN_SIZE = 256  # bajty, u menších souborů se komprese nevyplatí
+COMPRESS_MAX_RATIO = 0.95  # variantu uložit, jen když je aspoň o 5 % menší
+
+
+def compress_variants(data):
+    """Předkomprimované varianty obsahu: {přípona: bajty} (jen ty, které se vyplatí)."""
+    if len(data) < COMPRESS_MIN_SIZE:
+        return {}
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {suffix: compressed for suffix, compressed in variants.items()
+            if len(compressed) <= len(data) * COMPRESS_MAX_RATIO}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        """Uloží varianty souboru `name` vedle něj a vrátí jejich názvy."""
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            variants = compress_variants(source.read())
+        for suffix in ('.gz', '.br'):
+            if suffix in variants:
+                with open(path + suffix, 'wb') as target:
+                    target.write(variants[suffix])
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)  # zastaralá varianta z dřívějšího obsahu souboru bez hashe
+        return [name + suffix for suffix in variants]
+
+
+def in_media_root(path):
+    """Leží soubor `path` v MEDIA_ROOT?"""
+    media_root = os.path.abspath(settings.MEDIA_ROOT)
+    return os.path.commonpath([media_root, os.path.abspath(path)]) == media_root
+
+
+class MediaExcludingFinderMixin:
+    """
+    Finder, který nevrací soubory z MEDIA_ROOT.
+
+    MEDIA_ROOT leží ve viewer/static/media - nahrané soubory servíruje serve_media s kontrolou
+    přístupu, collectstatic (ani runserver přes /static/) je proto nesmí vydat jako veřejné statické
+    soubory. Na rozdíl od ignore_patterns to neskryje adresáře 'media' jinde.
+    """
+
+    def find(self, path, all=False):
+        if all:
+            return [match for match in super().find(path, all=True) if not in_media_root(match)]
+        match = super().find(path)
+        return match if match and not in_media_root(match) else []
+
+    def list(self, ignore_patterns):
+        for path, storage in super().list(ignore_patterns):
+            if not in_media_root(storage.path(path)):
+                yield path, storage
+
+
+class MediaExcludingFileSystemFinder(MediaExcludingFinderMixin, FileSystemFinder):
+    pass
+
+
+class MediaExcludingAppDirectoriesFinder(MediaExcludingFinderMixin, AppDirectoriesFinder):
+    pass
@@ -0,0 +1,180 @@
+"""
+Kniha skladových pohybů (StockMovement) a zhuštěné snímky stavu (StockSnapshot).
+
+Každá změna zásoby přidá do knihy řádek se změnou počtu kusů - vkládání se navzájem neblokuje
+a zůstává historie. Stav skladu je snímek (compact_ledger ho pravidelně posouvá) plus součet
+novějších pohybů (ledger_quantities). ItemsOnStock.quantity se dál udržuje jako kopie stavu pro
+rychlé čtení: checkout ji snižuje podmíněným UPDATE (sell) a úprava zásoby ve skladu ji mění
+o explicitní rozdíl (adjust) - obojí bez čtení řádku, takže se souběžné změny nepřepisují.
+Vytvoření, jiné uložení a smazání zásoby (admin, shell) zapíše pohyb signály post_save/post_delete.
+Hromadné operace bez signálů (bulk_create, QuerySet.update) musí pohyby zapsat samy; příkaz
+reconcile_stock porovná kopii s knihou.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Q, Sum
+from django.utils import timezone
+
+from viewer.models import ItemsOnStock, StockMovement, StockSnapshot, Television
+
+
+def sell(television, count, order_uuid):
+    """
+    Odečte prodané kusy ze zásoby jedním podmíněným UPDATE (bez čtení řádku) a vrátí pohyb k uložení.
+
+    Vrací:
+        StockMovement | None: Neuložený pohyb prodeje, None pokud na skladě není `count` kusů.
+    """
+    if not ItemsOnStock.objects.filter(television_id=television, quantity__gte=count).update(
+            quantity=F('quantity') - count):
+        return None
+    return StockMovement(television=television, kind='sale', delta=-count, order_uuid=order_uuid)
+
+
+def adjust(item, delta):
+    """
+    Změní počet kusů zásoby o `delta` podmíněným UPDATE a zapíše pohyb úpravy (v jedné transakci).
+
+    Rozdíl se přičte k aktuálnímu stavu v databázi - prodeje mezi načtením a odesláním formuláře
+    se tak nepřepíší.
+
+    Vrací:
+        bool: False, pokud by počet kusů klesl pod nulu (nic se nezmění).
+    """
+    if not delta:
+        return True
+    with transaction.atomic():
+        items = ItemsOnStock.objects.filter(pk=item.pk)
+        if delta < 0:
+            items = items.filter(quantity__gte=-delta)
+        if not items.update(quantity=F('quantity') + delta):
+            return False
+        StockMovement.objects.create(television_id=item.television_id_id, kind='adjustment', delta=delta)
+    return True
+
+
+def remember_quantity(sender, instance, **kwargs):
+    """post_init - zapamatuje si televizi a počet kusů, se kterými byla zásoba načtena."""
+    # Přes __dict__, aby odložené pole (only/defer) nevyvolalo dotaz
+    instance._ledger_quantity = instance.__dict__.get('quantity')
+    instance._ledger_television = instance.__dict__.get('television_id_id')
+
+
+def stock_saved(sender, instance, created, raw=False, **kwargs):
+    """post_save - zapíše příjem nové zásoby nebo úpravu počtu kusů (i přesun na jinou televizi) existující."""
+    if raw:
+        return
+    previous = getattr(instance, '_ledger_quantity', None) or 0
+    old_television = getattr(instance, '_ledger_television', None)
+    movements = []
+    if created:
+        movements.append(StockMovement(television_id=instance.television_id_id, kind='receipt',
+                                       delta=instance.quantity))
+    elif old_television is not None and old_television != instance.television_id_id:
+        # Zásoba se přesunula na jinou televizi - původní o kusy přijde, nová je získá
+        movements.append(StockMovement(television_id=old_television, kind='adjustment', delta=-previous))
+        movements.append(StockMovement(television_id=instance.television_id_id, kind='adjustment',
+                                       delta=instance.quantity))
+    else:
+        movements.append(StockMovement(television_id=instance.television_id_id, kind='adjustment',
+                                       delta=instance.quantity - previous))
+    StockMovement.objects.bulk_create([movement for movement in movements if movement.delta])
+    instance._ledger_quantity = instance.quantity
+    instance._ledger_television = instance.television_id_id
+
+
+def stock_deleted(sender, instance, origin=None, **kwargs):
+    """post_delete - smazaná zásoba vynuluje stav televize (ne při mazání celé televize)."""
+    if isinstance(origin, Television):
+        return
+    quantity = getattr(instance, '_ledger_quantity', None)
+    television_id = getattr(instance, '_ledger_television', None) or instance.television_id_id
+    if quantity:
+        StockMovement.objects.create(television_id=television_id, kind='adjustment', delta=-quantity)
+
+
+def unfolded_movements(movements):
+    """Pohyby, které ještě nejsou započtené ve snímku své televize."""
+    return movements.filter(Q(television__stock_snapshot__isnull=True) |
+                            Q(id__gt=F('television__stock_snapshot__last_movement_id')))
+
+
+def ledger_quantities(television_ids=None):
+    """
+    Stav skladu podle knihy pohybů: snímek + součet novějších pohybů (dva dotazy).
+
+    Vrací:
+        dict: television_id -> počet kusů (televize bez pohybů chybí).
+    """
+    snapshots, movements = StockSnapshot.objects.all(), StockMovement.objects.all()
+    if television_ids is not None:
+        snapshots = snapshots.filter(television_id__in=television_ids)
+        movements = movements.filter(television_id__in=television_ids)
+    quantities = dict(snapshots.values_list('television_id', 'quantity'))
+    for television_id, delta in (unfolded_movements(movements).values('television_id')
+                                 .annotate(total=Sum('delta')).values_list('television_id', 'total')):
+        quantities[television_id] = quantities.get(television_id, 0) + delta
+    return quantities
+
+
+def compact_ledger(lag=None, prune_before=None):
+    """
+    Započte pohyby do snímků a volitelně smaže započtené pohyby starší než `prune_before`.
+
+    Zhušťují se jen pohyby starší než `lag` sekund (výchozí settings.STOCK_COMPACTION_LAG), aby se
+    nepřeskočil pohyb z transakce, která ještě neskončila, přestože má nižší id.
+
+    Vrací:
+        tuple: (počet aktualizovaných snímků, počet smazaných pohybů)
+    """
+    if lag is None:
+        lag = settings.STOCK_COMPACTION_LAG
+    with transaction.atomic():
+        upto = (StockMovement.objects.filter(created_at__lte=timezone.now() - datetime.timedelta(seconds=lag))
+                .aggregate(Max('id'))['id__max'])
+        if upto is None:
+            return 0, 0
+        deltas = dict(unfolded_movements(StockMovement.objects.filter(id__lte=upto)).values('television_id')
+                      .annotate(total=Sum('delta')).values_list('television_id', 'total'))
+        snapshots = StockSnapshot.objects.select_for_update().in_bulk(deltas, field_name='television_id')
+        now = timezone.now()
+        for television_id, snapshot in snapshots.items():
+            snapshot.quantity += deltas[television_id]
+            snapshot.last_movement_id = upto
+            snapshot.taken_at = now  # bulk_update auto_now nenastaví
+        StockSnapshot.objects.bulk_update(snapshots.values(), ['quantity', 'last_movement_id', 'taken_at'],
+                                          batch_size=1000)
+        StockSnapshot.objects.bulk_create(
+            [StockSnapshot(television_id=television_id, quantity=delta, last_movement_id=upto)
+             for television_id, delta in deltas.items() if television_id not in snapshots],
+            batch_size=1000)
+        pruned = 0
+        if prune_before is not None:
+            pruned, _ = StockMovement.objects.filter(id__lte=upto, created_at__lt=prune_before).delete()
+    return len(deltas), pruned
+
+
+def reconcile_stock(fix=False):
+    """
+    Porovná ItemsOnStock.quantity se stavem podle knihy pohybů.
+
+    S fix=True přepíše kopii v ItemsOnStock stavem z knihy (bez signálů, takže nevzniknou nové pohyby).
+
+    Vrací:
+        list: (television_id, počet v ItemsOnStock nebo None, počet podle knihy) pro nesouhlasící televize.
+    """
+    ledger = ledger_quantities()
+    cached = dict(ItemsOnStock.objects.values_list('television_id', 'quantity'))
+    mismatches = [(television_id, cached.get(television_id), ledger.get(television_id, 0))
+                  for television_id in sorted(set(ledger) | set(cached))
+                  if cached.get(television_id, 0) != ledger.get(television_id, 0)]
+    if fix and mismatches:
+        with transaction.atomic():
+            for television_id, quantity, expected in mismatches:
+                if quantity is None:
+                    ItemsOnStock.objects.bulk_create([ItemsOnStock(television_id_id=television_id, quantity=expected)])
+                else:
+                    ItemsOnStock.objects.filter(television_id=television_id).update(quantity=expected)
+    return mismatches
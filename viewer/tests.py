@@ -1,11 +1,67 @@
-from .forms import CustomAuthenticationForm
+import cProfile
+import datetime
+import gzip
+import io
+import json
+import os
+import pstats
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import zlib
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import CommandError, call_command
+from django.contrib.auth.models import AnonymousUser, Group
+from django.core import mail
+from django.core.cache import caches
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.db import connection, transaction
+from django.db.models import F, Max, Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.test import SimpleTestCase, TransactionTestCase, RequestFactory, override_settings
+
+from . import memory, notifications, profiling, ratelimit, recommendations
+from .auth import is_in_group
+from .datagen import generate
+from .db import set_pragmas, apply_sqlite_pragmas, copy_sqlite_database
+from .async_views import AsyncTVListView, AsyncTVDetailView, AsyncCartView
+from .bench import compare_results
+from .cache import CacheServer, SocketCache
+from .categories import category_key, category_summary
+from .compression import cache_key, compress_response
+from .forms import CustomAuthenticationForm, ItemOnStockForm
+from .metrics import fingerprint
+from .profiling import collapsed_stacks
+from .admin import EstimatedCountPaginator
+from .archive import archive_orders
+from .order_workflow import InvalidTransition, bulk_transition
+from .orders import OutOfStockError, place_order
+from .stock import compact_ledger, ledger_quantities, reconcile_stock
+from .middleware import ReplicaPinningMiddleware, RequestMetricsMiddleware
+from .rollups import sales_summary
+from .routers import ReplicaRouter
+from .sessions import SessionStore
+from .staticfiles import MediaExcludingFileSystemFinder
+from .views import serve_static
+from .write_pipeline import WritePipeline
 from django.test import LiveServerTestCase
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.urls import reverse
-from .models import Brand, Television, ItemsOnStock, TVDisplayTechnology, TVDisplayResolution, TVOperationSystem
+from .models import (Brand, Television, ItemsOnStock, TVDisplayTechnology, TVDisplayResolution, TVOperationSystem,
+                     Order, OrderItem, Profile, DailySalesRollup, TelevisionSimilarity, Category,
+                     OrderStatusChange, ArchivedOrder, StockMovement, StockSnapshot, NotificationJob)
 
 
 # Ověřují, že se může úspěšně vytvořit značka
@@ -240,3 +296,1259 @@ class MySeleniumUserTests(LiveServerTestCase):
 
         # Ověření, že uživatel uvidí sekci "Odhlásit"
         self.assertIn("Odhlásit", page_source)
+
+
+# Ověřuje, že se PRAGMA produkčního profilu SQLite skutečně nastaví na spojení
+class SQLitePragmaTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.raw = sqlite3.connect(os.path.join(self.tmp.name, 'test.sqlite3'))
+
+    def tearDown(self):
+        self.raw.close()
+        self.tmp.cleanup()
+
+    def test_production_pragmas(self):
+        set_pragmas(self.raw, settings.SQLITE_PRODUCTION_PRAGMAS)
+        self.assertEqual(self.raw.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        self.assertEqual(self.raw.execute('PRAGMA synchronous').fetchone()[0], 1)  # NORMAL
+        self.assertEqual(self.raw.execute('PRAGMA busy_timeout').fetchone()[0], 5000)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_development_profile_keeps_defaults(self):
+        apply_sqlite_pragmas(None, SimpleNamespace(vendor='sqlite', connection=self.raw))
+        self.assertEqual(self.raw.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+
+
+# Zápisy přes zapisovací vlákno - souběžné úlohy se spojí do jednoho commitu a chyba jedné úlohy neovlivní ostatní
+class WritePipelineTests(TransactionTestCase):
+    def setUp(self):
+        self.pipeline = WritePipeline(batch_size=10, batch_wait=0)
+
+    def tearDown(self):
+        self.pipeline.stop()
+
+    def test_concurrent_jobs_share_one_commit(self):
+        started, release = threading.Event(), threading.Event()
+
+        def blocking_job():
+            started.set()
+            release.wait(5)
+            return Brand.objects.create(brand_name='First').pk
+
+        first = self.pipeline.submit(blocking_job)
+        started.wait(5)
+        futures = [self.pipeline.submit(Brand.objects.create, brand_name=f'Brand {i}') for i in range(5)]
+        release.set()
+
+        self.assertIsNotNone(first.result(5))
+        self.assertEqual([f.result(5).brand_name for f in futures], [f'Brand {i}' for i in range(5)])
+        self.assertEqual(self.pipeline.committed_batches, 2)
+        self.assertEqual(Brand.objects.count(), 6)
+
+    def test_failing_job_rolls_back_only_itself(self):
+        ok = self.pipeline.submit(Brand.objects.create, brand_name='Unique')
+        duplicate = self.pipeline.submit(Brand.objects.create, brand_name='Unique')
+
+        self.assertEqual(ok.result(5).brand_name, 'Unique')
+        with self.assertRaises(Exception):
+            duplicate.result(5)
+        self.assertEqual(Brand.objects.filter(brand_name='Unique').count(), 1)
+
+
+# Nedostatek zboží při checkoutu nesmí zanechat rozpracovanou objednávku ani odečtený sklad
+class CheckoutStockTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='testpassword')
+        Profile.objects.create(user=self.user, first_name='Jan', last_name='Novak')
+        self.client.login(username='buyer', password='testpassword')
+        self.television = Television.objects.create(
+            brand=Brand.objects.create(brand_name='Test Brand'),
+            brand_model='Test Model',
+            tv_released_year=2021,
+            tv_screen_size=55,
+            refresh_rate=60,
+            display_technology=TVDisplayTechnology.objects.create(name='LED'),
+            display_resolution=TVDisplayResolution.objects.create(name='4K'),
+            operation_system=TVOperationSystem.objects.create(name='Android TV'),
+            price=1000.00
+        )
+        self.stock_item = ItemsOnStock.objects.create(television_id=self.television, quantity=2)
+
+    def checkout(self, quantity):
+        session = self.client.session
+        session['cart'] = {str(self.television.id): {'name': 'Test Brand', 'model': 'Test Model',
+                                                     'price': '1000.00', 'quantity': quantity}}
+        session.save()
+        return self.client.post(reverse('checkout'), {
+            'first_name': 'Jan', 'last_name': 'Novak', 'address': 'Ulice 1', 'city': 'Praha',
+            'zipcode': '11000', 'phone_number': '123456789'})
+
+    def test_checkout_decrements_stock(self):
+        response = self.checkout(2)
+        order = Order.objects.get()
+        self.assertRedirects(response, reverse('order_success', args=[order.order_id]))
+        self.assertEqual(order.price, 2000)
+        self.stock_item.refresh_from_db()
+        self.assertEqual(self.stock_item.quantity, 0)
+
+    def test_out_of_stock_rolls_back_order(self):
+        response = self.checkout(3)
+        self.assertContains(response, 'Not enough stock for Test Model.')
+        self.assertFalse(Order.objects.exists())
+        self.stock_item.refresh_from_db()
+        self.assertEqual(self.stock_item.quantity, 2)
+
+
+# Čtení katalogu jde na repliku, zápisy a čtení po zápisu zůstávají na primární databázi
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, *actions):
+        """Projde požadavek middlewarem a vrátí databáze zvolené pro čtení Television během view."""
+        chosen = []
+
+        def view(request):
+            for action in actions:
+                if action == 'read':
+                    chosen.append(self.router.db_for_read(Television))
+                else:
+                    self.router.db_for_write(action)
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return chosen, response
+
+    def test_reads_outside_request_use_primary(self):
+        self.assertIsNone(self.router.db_for_read(Television))
+
+    def test_catalog_read_goes_to_replica(self):
+        chosen, response = self.route(self.factory.get('/tv/list/'), 'read')
+        self.assertEqual(chosen, ['replica'])
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_non_catalog_model_stays_on_primary(self):
+        self.assertIsNone(ReplicaRouter().db_for_read(User))
+
+    def test_read_after_write_is_sticky(self):
+        chosen, response = self.route(self.factory.get('/'), 'read', Order, 'read')
+        self.assertEqual(chosen, ['replica', None])
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_post_and_pin_cookie_use_primary(self):
+        chosen, _ = self.route(self.factory.post('/checkout/'), 'read')
+        self.assertEqual(chosen, [None])
+        request = self.factory.get('/order/')
+        request.COOKIES[settings.REPLICA_PIN_COOKIE] = '1'
+        chosen, _ = self.route(request, 'read')
+        self.assertEqual(chosen, [None])
+
+    def test_replica_refresh_via_backup_api(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source, replica = os.path.join(tmp, 'primary.sqlite3'), os.path.join(tmp, 'replica.sqlite3')
+            with sqlite3.connect(source) as conn:
+                conn.execute('CREATE TABLE t (x INTEGER)')
+                conn.execute('INSERT INTO t VALUES (42)')
+            conn.close()
+            copy_sqlite_database(source, replica)
+            conn = sqlite3.connect(replica)
+            self.assertEqual(conn.execute('SELECT x FROM t').fetchall(), [(42,)])
+            conn.close()
+
+
+def create_television(brand_name='Test Brand', brand_model='Test Model', quantity=None, **kwargs):
+    """Vytvoří televizi včetně číselníků (a volitelně skladové zásoby) pro testy."""
+    def lookup(model, name):
+        return model.objects.get_or_create(name=name)[0]
+
+    television = Television.objects.create(
+        brand=Brand.objects.get_or_create(brand_name=brand_name)[0],
+        brand_model=brand_model,
+        tv_released_year=kwargs.pop('tv_released_year', 2021),
+        tv_screen_size=kwargs.pop('tv_screen_size', 55),
+        refresh_rate=kwargs.pop('refresh_rate', 60),
+        display_technology=lookup(TVDisplayTechnology, kwargs.pop('technology', 'LED')),
+        display_resolution=lookup(TVDisplayResolution, kwargs.pop('resolution', '4K Ultra HD')),
+        operation_system=lookup(TVOperationSystem, kwargs.pop('operation_system', 'Android TV')),
+        price=kwargs.pop('price', 1000),
+        **kwargs
+    )
+    if quantity is not None:
+        ItemsOnStock.objects.create(television_id=television, quantity=quantity)
+    return television
+
+
+# Katalog načítá televize i zásoby konstantním počtem dotazů, synchronně i asynchronně
+class CatalogViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.televisions = [create_television('LG', f'OLED{i}', quantity=i + 1, technology='OLED') for i in range(5)]
+        cls.user = User.objects.create_user(username='viewer', password='testpassword')
+
+    def test_tv_list_query_count_is_constant(self):
+        with self.assertNumQueries(2):  # televize + zásoby (nepřihlášený uživatel nemá dotaz na skupiny)
+            response = self.client.get(reverse('tv_list'), {'technology': 'OLED'})
+        self.assertEqual(len(response.context['object_list']), 5)
+        self.assertContains(response, 'class="btn btn-success">Do košíku', count=0)
+
+    async def test_async_tv_list(self):
+        request = RequestFactory().get('/tv/list/', {'brand': 'LG'})
+        request.user = self.user
+        request.session = {}
+        response = await AsyncTVListView.as_view()(request)
+        self.assertContains(response, 'class="btn btn-success">Do košíku', count=5)
+
+    async def test_async_tv_detail_not_found(self):
+        request = RequestFactory().get('/tv/0')
+        request.user = self.user
+        with self.assertRaises(Http404):
+            await AsyncTVDetailView.as_view()(request, pk=0)
+
+    async def test_async_cart_requires_login(self):
+        request = RequestFactory().get('/cart/')
+        request.user = AnonymousUser()
+        response = await AsyncCartView.as_view()(request)
+        self.assertEqual(response.status_code, 302)
+
+
+# Middleware měří dotazy a čas požadavku a upozorní na opakované dotazy (N+1)
+class RequestMetricsMiddlewareTests(TestCase):
+    def test_server_timing_header(self):
+        create_television(quantity=1)
+        response = self.client.get(reverse('tv_list'))
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="2 queries", tpl;dur=[\d.]+, view;dur=[\d.]+, total;dur=[\d.]+$')
+
+    @override_settings(REQUEST_METRICS_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('tv_list')))
+
+    @override_settings(REQUEST_METRICS_DUPLICATE_THRESHOLD=3)
+    def test_duplicate_queries_are_logged(self):
+        def view(request):
+            for pk in range(3):
+                Brand.objects.filter(pk=pk).first()
+            return HttpResponse()
+
+        with self.assertLogs('viewer.metrics', level='WARNING') as logs:
+            RequestMetricsMiddleware(view)(RequestFactory().get('/n-plus-one/'))
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('"event": "duplicate_query"', logs.output[0])
+        self.assertIn('"count": 3', logs.output[0])
+
+    def test_fingerprint_collapses_in_lists(self):
+        self.assertEqual(fingerprint('SELECT * FROM t WHERE id IN (%s, %s,  %s)'),
+                         fingerprint('SELECT * FROM t WHERE id IN (%s)'))
+
+
+# Generátor syntetických dat je deterministický a vytváří konzistentní objednávky
+class DataGeneratorTests(TestCase):
+    volumes = {'brands': 3, 'categories': 2, 'televisions': 10, 'users': 3, 'orders': 25, 'max_items': 3}
+
+    def generate_order_ids(self):
+        with transaction.atomic():
+            generate(self.volumes, seed=7, batch_size=10, workers=1)
+            order_ids = list(Order.objects.order_by('order_id').values_list('order_id', flat=True))
+            transaction.set_rollback(True)
+        return order_ids
+
+    def test_same_seed_gives_same_data(self):
+        first = self.generate_order_ids()
+        self.assertEqual(len(first), 25)
+        self.assertEqual(first, self.generate_order_ids())
+
+    def test_generated_volumes_and_prices(self):
+        result = generate(self.volumes, seed=3, batch_size=10, workers=1)
+        self.assertEqual(result, {'televisions': 10, 'users': 3, 'orders': 25})
+        self.assertEqual(ItemsOnStock.objects.count(), 10)
+        self.assertEqual(Profile.objects.count(), 3)
+        self.assertTrue(User.objects.get(username='load3_0000000').check_password('heslo1234'))
+        items_total = OrderItem.objects.aggregate(total=Sum(F('quantity') * F('television__price')))['total']
+        self.assertEqual(Order.objects.aggregate(total=Sum('price'))['total'], items_total)
+        self.assertGreater(Order.objects.dates('order_date', 'day').count(), 1)
+
+    def test_dates_come_from_reference_date(self):
+        generate(self.volumes, seed=5, batch_size=10, workers=1, reference_date=datetime.date(2020, 6, 1))
+        self.assertLessEqual(Television.objects.aggregate(year=Max('tv_released_year'))['year'], 2020)
+        last_order = Order.objects.aggregate(last=Max('order_date'))['last']
+        self.assertLess(last_order, datetime.datetime(2020, 6, 1, tzinfo=datetime.timezone.utc))
+
+
+class BenchmarkComparisonTests(SimpleTestCase):
+    baseline = {'small': {'tv_list': {'p95_ms': 100.0, 'throughput': 50.0, 'queries_max': 6, 'errors': 0}}}
+
+    def result(self, **changes):
+        return {'small': {'tv_list': {**self.baseline['small']['tv_list'], **changes}}}
+
+    def test_within_tolerance(self):
+        self.assertEqual(compare_results(self.result(p95_ms=115.0, throughput=45.0), self.baseline), [])
+
+    def test_detects_regressions(self):
+        regressions = compare_results(self.result(p95_ms=130.0, throughput=30.0, queries_max=7), self.baseline)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(all(regression.startswith('small/tv_list') for regression in regressions))
+
+    def test_skips_journeys_missing_in_baseline(self):
+        current = {'large': {'tv_list': self.baseline['small']['tv_list']}}
+        self.assertEqual(compare_results(current, self.baseline), [])
+
+
+# Profil se pořídí jen na vyžádání personálu a uloží se do rotovaného adresáře
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        settings_override = override_settings(PROFILING_DIR=self.directory.name, PROFILING_SAMPLE_RATE=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.staff = User.objects.create_user(username='staff', password='heslo1234', is_staff=True)
+
+    def test_staff_request_is_profiled(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('tv_list'), {'profile': '1'})
+        name = response['X-Profile-Id']
+        self.assertIn('tv_list', name)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), [name + '.collapsed', name + '.prof'])
+
+        response = self.client.get(reverse('profile_list'))
+        self.assertContains(response, name + '.collapsed')
+        response = self.client.get(reverse('profile_download', args=[name + '.prof']))
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_non_staff_cannot_request_profile(self):
+        self.client.force_login(User.objects.create_user(username='customer', password='heslo1234'))
+        response = self.client.get(reverse('tv_list'), HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.directory.name), [])
+        self.assertEqual(self.client.get(reverse('profile_list')).status_code, 403)
+
+    @override_settings(PROFILING_KEEP=2)
+    def test_directory_is_rotated(self):
+        self.client.force_login(self.staff)
+        for _ in range(3):
+            self.client.get(reverse('home'), HTTP_X_PROFILE='1')
+        self.assertEqual(len(os.listdir(self.directory.name)), 4)
+
+    def test_concurrent_request_is_not_profiled(self):
+        self.client.force_login(self.staff)
+        with profiling._profiler_lock:  # Jiné vlákno právě profiluje
+            response = self.client.get(reverse('home'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_collapsed_stacks(self):
+        def leaf():
+            return sum(range(20000))
+
+        def root():
+            return leaf() + leaf()
+
+        profiler = cProfile.Profile()
+        profiler.runcall(root)
+        lines = collapsed_stacks(pstats.Stats(profiler))
+        self.assertTrue(any(re.search(r'root \(tests\.py:\d+\);leaf \(tests\.py:\d+\) \d+$', line) for line in lines))
+        for line in lines:
+            stack, _, micros = line.rpartition(' ')
+            self.assertTrue(stack)
+            self.assertGreaterEqual(int(micros), 1)
+
+
+# Diagnostika paměti: snímky a jejich rozdíly, špičky pohledů a hlídání RSS
+class MemoryDiagnosticsTests(TestCase):
+    def setUp(self):
+        memory.start_tracing()
+        self.addCleanup(memory.stop_tracing)
+        self.staff = User.objects.create_user(username='staff', password='heslo1234', is_staff=True)
+
+    def test_snapshots_and_view_peaks(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('tv_list'), {'memory_snapshot': '1'})
+        self.client.post(reverse('memory_diagnostics'), {'action': 'snapshot', 'label': 'po seznamu'})
+        self.assertEqual([entry['label'] for entry in memory.snapshots()], ['GET /tv/list/', 'po seznamu'])
+        self.assertIn('tv_list', [row['view'] for row in memory.view_peaks()])
+
+        response = self.client.get(reverse('memory_diagnostics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('diff', response.context)
+        self.assertTrue(response.context['top_allocations'])
+
+    def test_non_staff_cannot_take_snapshot(self):
+        self.client.force_login(User.objects.create_user(username='customer', password='heslo1234'))
+        self.client.get(reverse('tv_list'), {'memory_snapshot': '1'})
+        self.assertEqual(self.client.get(reverse('memory_diagnostics')).status_code, 403)
+        self.assertEqual(memory.snapshots(), [])
+
+    @override_settings(MEMORY_RSS_LIMIT_MB=1, MEMORY_RSS_CHECK_INTERVAL=1, MEMORY_RECYCLE_SIGNAL=None)
+    def test_rss_limit_sends_signal(self):
+        received = []
+
+        def receiver(sender, rss, limit, **kwargs):
+            received.append(rss)
+
+        memory.worker_memory_exceeded.connect(receiver)
+        self.addCleanup(memory.worker_memory_exceeded.disconnect, receiver)
+        self.addCleanup(setattr, memory, '_recycle_requested', False)
+        with self.assertLogs('viewer.memory', level='WARNING'):
+            self.client.get(reverse('home'))
+        self.client.get(reverse('home'))
+        self.assertEqual(len(received), 1)
+
+
+# Denní souhrny prodejů se aktualizují průběžně a přepočet dá stejný výsledek
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='heslo1234')
+        self.led = create_television('Alpha', 'A1', quantity=10, price=1000, technology='LED')
+        self.oled = create_television('Beta', 'B1', quantity=10, price=3000, technology='OLED')
+
+    def order(self, cart):
+        return place_order(Order(user=self.user), {str(tv.pk): {'quantity': quantity} for tv, quantity in cart})
+
+    def rollups(self):
+        return sorted(DailySalesRollup.objects.values_list('brand__brand_name', 'status', 'revenue', 'units',
+                                                           'order_count'))
+
+    def test_checkout_status_change_and_delete(self):
+        order = self.order([(self.led, 2), (self.oled, 1)])
+        self.order([(self.led, 1)])
+        self.assertEqual(self.rollups(), [('Alpha', 'submitted', 3000, 3, 2), ('Beta', 'submitted', 3000, 1, 1)])
+
+        order.status = 'completed'
+        order.save()
+        self.assertEqual(self.rollups(), [('Alpha', 'completed', 2000, 2, 1), ('Alpha', 'submitted', 1000, 1, 1),
+                                          ('Beta', 'completed', 3000, 1, 1)])
+
+        Order.objects.get(pk=order.pk).delete()
+        self.assertEqual(self.rollups(), [('Alpha', 'submitted', 1000, 1, 1)])
+
+    def test_price_change_after_checkout(self):
+        order = self.order([(self.led, 2)])
+        other = self.order([(self.oled, 1)])
+        Television.objects.filter(pk__in=[self.led.pk, self.oled.pk]).update(price=F('price') * 2)
+
+        order.status = 'processing'
+        order.save()
+        bulk_transition([other.pk], 'submitted', 'processing')
+        self.assertEqual(self.rollups(), [('Alpha', 'processing', 2000, 2, 1), ('Beta', 'processing', 3000, 1, 1)])
+        Order.objects.get(pk=order.pk).delete()
+        self.assertEqual(self.rollups(), [('Beta', 'processing', 3000, 1, 1)])
+
+    def test_rebuild_matches_incremental_rollups(self):
+        order = self.order([(self.led, 2), (self.oled, 1)])
+        self.order([(self.led, 1)])
+        order.status = 'completed'
+        order.save()
+        incremental = self.rollups()
+        DailySalesRollup.objects.all().delete()
+        call_command('rebuild_sales_rollups', workers=1, stdout=io.StringIO())
+        self.assertEqual(self.rollups(), [row for row in incremental if row[3]])
+
+    def test_dashboard_reads_only_rollups(self):
+        self.order([(self.led, 2), (self.oled, 1)])
+        self.client.force_login(User.objects.create_user(username='staff', password='heslo1234', is_staff=True))
+        # uživatel s profilem, jeho skupiny a 5 dotazů nad souhrny - bez ohledu na počet objednávek
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('sales_dashboard'), {'days': 7})
+        self.assertContains(response, 'Alpha')
+        self.assertEqual(response.context['totals']['units'], 3)
+
+    def test_cancelled_orders_are_not_revenue(self):
+        self.order([(self.led, 2)])
+        cancelled = self.order([(self.oled, 1)])
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        summary = sales_summary(7)
+        self.assertEqual(summary['totals'], {'revenue': 2000, 'units': 2})
+        self.assertEqual([row['brand__brand_name'] for row in summary['by_brand']], ['Alpha'])
+        self.assertEqual({row['status'] for row in summary['by_status']}, {'submitted', 'cancelled'})
+
+
+# Seznam skladu je stránkovaný, řazený a filtrovaný s konstantním počtem dotazů
+class StockListViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='heslo1234'))
+
+    def test_query_count_does_not_grow(self):
+        for i in range(5):
+            create_television(f'Brand {i}', f'Model {i}', quantity=i + 1)
+        # uživatel s profilem, jeho skupiny, počet, značky, stránka zásob (session je v cache)
+        with self.assertNumQueries(5):
+            self.client.get(reverse('stock_list'))
+        for i in range(5, 60):
+            create_television(f'Brand {i}', f'Model {i}', quantity=i + 1)
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('stock_list'))
+        self.assertEqual(len(response.context['items']), 50)
+        self.assertTrue(response.context['is_paginated'])
+
+    def test_sort_and_filters(self):
+        low = create_television('Alpha', 'A1', quantity=2)
+        create_television('Alpha', 'A2', quantity=50)
+        create_television('Beta', 'B1', quantity=1)
+        response = self.client.get(reverse('stock_list'))
+        self.assertEqual([item.quantity for item in response.context['items']], [1, 2, 50])
+
+        response = self.client.get(reverse('stock_list'), {'brand': low.brand_id, 'low_stock': 10})
+        self.assertEqual([item.television_id for item in response.context['items']], [low])
+
+        response = self.client.get(reverse('stock_list'), {'sort': '-quantity'})
+        self.assertEqual([item.quantity for item in response.context['items']], [50, 2, 1])
+
+
+# Formulář skladu nevykresluje všechny televize a validace stojí konstantní počet dotazů
+class ItemOnStockFormTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='heslo1234'))
+        self.televisions = [create_television(f'Brand {i}', f'Model {i}') for i in range(30)]
+
+    def test_widget_renders_only_selected_television(self):
+        stocked = self.televisions[3]
+        item = ItemsOnStock.objects.create(television_id=stocked, quantity=5)
+        form = ItemOnStockForm(instance=item)
+        with self.assertNumQueries(1):
+            html = str(form['television_id'])
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn(f'value="{stocked.pk}" selected', html)
+        self.assertIn('data-search-url="/stock/television-lookup/"', html)
+
+    def test_validation_queries(self):
+        television = self.televisions[0]
+        ItemsOnStock.objects.create(television_id=self.televisions[1], quantity=5)
+        # načtení televize podle pk + existence cizího klíče + UniqueConstraint modelu
+        with self.assertNumQueries(3):
+            self.assertTrue(ItemOnStockForm(data={'television_id': television.pk, 'quantity': 3}).is_valid())
+        with self.assertNumQueries(3):
+            form = ItemOnStockForm(data={'television_id': self.televisions[1].pk, 'quantity': 3})
+            self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors, {'television_id': ['Tato položka již je na skladě.']})
+
+    def test_concurrent_create_shows_form_error(self):
+        television = self.televisions[0]
+        ItemsOnStock.objects.create(television_id=television, quantity=5)
+        # souběžný požadavek naskladnil stejnou televizi až po validaci tohoto formuláře
+        with patch.object(ItemsOnStock, 'validate_constraints'):
+            response = self.client.post(reverse('item_on_stock_create'), {'television_id': television.pk, 'quantity': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['form'].errors, {'television_id': ['Tato položka již je na skladě.']})
+        self.assertEqual(ItemsOnStock.objects.get(television_id=television).quantity, 5)
+
+    def test_lookup_prefix_search_and_limit(self):
+        response = self.client.get(reverse('television_lookup'), {'q': 'brand 1'})
+        results = response.json()['results']
+        self.assertEqual([result['text'] for result in results][:2], ['Brand 1 -  Model 1 - 55"', 'Brand 10 -  Model 10 - 55"'])
+        self.assertEqual(len(results), 11)
+        self.assertEqual(len(self.client.get(reverse('television_lookup')).json()['results']), 20)
+
+
+# Session engine neukládá nezměněná data a socket cache server funguje jako sdílená cache
+class SessionCacheTests(TestCase):
+    def test_unchanged_session_is_not_saved(self):
+        store = SessionStore()
+        store['cart'] = {'1': {'quantity': 1}}
+        store.save()
+
+        store = SessionStore(store.session_key)
+        with self.assertNumQueries(0):
+            store['cart'] = store['cart']  # načtení z cache a přiřazení stejné hodnoty
+            store.save()
+        store['cart']['1']['quantity'] = 2
+        with self.assertNumQueries(3):  # UPDATE v savepointu
+            store.save()
+        self.assertEqual(SessionStore(store.session_key)['cart'], {'1': {'quantity': 2}})
+
+    def test_socket_cache(self):
+        server = CacheServer(('127.0.0.1', 0), max_entries=2)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        cache = SocketCache(f'127.0.0.1:{server.server_address[1]}', {})
+
+        cache.set('cart', {'1': {'quantity': 1}})
+        self.assertEqual(cache.get('cart'), {'1': {'quantity': 1}})
+        self.assertFalse(cache.add('cart', 'other'))
+        cache.set('counter', 1)
+        self.assertEqual(cache.incr('counter', 5), 6)
+        cache.set('third', 'x')  # max_entries=2 - vypadne nejdéle nepoužitá položka
+        self.assertIsNone(cache.get('cart'))
+        self.assertTrue(cache.delete('third'))
+        cache.set('short', 'x', timeout=-1)
+        self.assertIsNone(cache.get('short'))
+
+
+# Uživatel se načítá s profilem a skupinami jednou za požadavek, kontroly rolí už dotazy nestojí
+class UserLoadingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='stocker', password='heslo1234')
+        Profile.objects.create(user=self.user, first_name='Jan', last_name='Novak')
+        self.user.groups.add(Group.objects.create(name='stock_admin'))
+        self.client.force_login(self.user)
+
+    def test_profile_page_query_count(self):
+        # uživatel s profilem (JOIN) a jeho skupiny; profil v šabloně i context processor už z paměti
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('profile_detail'))
+        self.assertContains(response, 'Jan Novak')
+        self.assertTrue(response.context['stock_admin'])
+
+    def test_group_names_are_cached(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_in_group(user, 'stock_admin'))
+            self.assertFalse(is_in_group(user, 'tv_admin'))
+        self.assertFalse(is_in_group(AnonymousUser(), 'stock_admin'))
+
+    def test_signup_logs_in_with_profile_backend(self):
+        self.client.logout()
+        response = self.client.post(reverse('signup'), {
+            'username': 'novy', 'email': 'novy@example.com', 'password1': 'Tajne-heslo-42',
+            'password2': 'Tajne-heslo-42'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session['_auth_user_backend'], 'viewer.auth.ProfileModelBackend')
+        self.assertEqual(self.client.session['_auth_user_id'], str(User.objects.get(username='novy').pk))
+
+
+# collectstatic otiskne názvy a předkomprimuje textové soubory, serve_static vybírá variantu a cachuje natrvalo
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        source = os.path.join(directory.name, 'source')
+        self.static_root = os.path.join(directory.name, 'root')
+        os.makedirs(os.path.join(source, 'css'))
+        self.css = b'body { color: #333; }\n' * 100
+        with open(os.path.join(source, 'css', 'site.css'), 'wb') as css:
+            css.write(self.css)
+        with open(os.path.join(source, 'logo.png'), 'wb') as png:
+            png.write(os.urandom(2048))
+        overrides = override_settings(
+            STATICFILES_DIRS=[source], STATIC_ROOT=self.static_root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATICFILES_STORAGE='viewer.staticfiles.CompressedManifestStaticFilesStorage')
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed_css = staticfiles_storage.stored_name('css/site.css')
+
+    def serve(self, path, **headers):
+        return serve_static(RequestFactory().get('/static/' + path, **headers), path)
+
+    def test_collectstatic_precompresses_text_files(self):
+        with open(os.path.join(self.static_root, self.hashed_css + '.gz'), 'rb') as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), self.css)
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, staticfiles_storage.stored_name('logo.png') + '.gz')))
+
+    def test_serve_static_negotiates_encoding(self):
+        response = self.serve(self.hashed_css, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.css)
+
+        response = self.serve(self.hashed_css, HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(b''.join(response.streaming_content), self.css)
+
+        response = self.serve('css/site.css')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.STATIC_MAX_AGE}')
+        self.assertEqual(self.serve('css/site.css', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.assertRaises(Http404):
+            self.serve('../source/css/site.css')
+
+    def test_finder_skips_only_media_root(self):
+        source = settings.STATICFILES_DIRS[0]
+        for name in ('uploads/avatars/a.png', 'media/logo.svg'):
+            os.makedirs(os.path.join(source, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(source, name), 'wb') as file:
+                file.write(b'x')
+        with override_settings(MEDIA_ROOT=os.path.join(source, 'uploads')):
+            finder = MediaExcludingFileSystemFinder()
+            listed = {path.replace(os.sep, '/') for path, _ in finder.list([])}
+            self.assertIn('media/logo.svg', listed)
+            self.assertNotIn('uploads/avatars/a.png', listed)
+            self.assertEqual(finder.find('uploads/avatars/a.png'), [])
+            self.assertEqual(finder.find('uploads/avatars/a.png', all=True), [])
+
+
+# Nahrané soubory: Range, podmíněné požadavky, přístup k avatarům a předání přenosu front-end serveru
+class MediaServingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        overrides = override_settings(MEDIA_ROOT=directory.name, MEDIA_SENDFILE=None)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.image = os.urandom(1000)
+        for name, content in (('television_images/tv.png', self.image), ('avatars/owner.png', b'avatar')):
+            os.makedirs(os.path.join(directory.name, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(directory.name, name), 'wb') as file:
+                file.write(content)
+        self.owner = User.objects.create_user(username='owner', password='heslo1234')
+        Profile.objects.create(user=self.owner, avatar='avatars/owner.png')
+
+    def test_range_and_conditional_requests(self):
+        response = self.client.get('/media/television_images/tv.png')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.MEDIA_MAX_AGE}')
+        self.assertEqual(b''.join(response.streaming_content), self.image)
+        etag = response['ETag']
+
+        response = self.client.get('/media/television_images/tv.png', HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/1000')
+        self.assertEqual(b''.join(response.streaming_content), self.image[100:200])
+
+        response = self.client.get('/media/television_images/tv.png', HTTP_RANGE='bytes=-10', HTTP_IF_RANGE=etag)
+        self.assertEqual(b''.join(response.streaming_content), self.image[-10:])
+        response = self.client.get('/media/television_images/tv.png', HTTP_RANGE='bytes=-10', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/media/television_images/tv.png', HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */1000')
+        self.assertEqual(self.client.get('/media/television_images/tv.png', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_avatar_access(self):
+        self.assertEqual(self.client.get('/media/avatars/owner.png').status_code, 404)
+        self.client.force_login(User.objects.create_user(username='other', password='heslo1234'))
+        self.assertEqual(self.client.get('/media/avatars/owner.png').status_code, 404)
+        self.client.force_login(self.owner)
+        response = self.client.get('/media/avatars/owner.png')
+        self.assertEqual(b''.join(response.streaming_content), b'avatar')
+        self.assertTrue(response['Cache-Control'].startswith('private'))
+        self.assertEqual(self.client.get('/media/avatars/../../etc/passwd').status_code, 404)
+
+    def test_avatar_access_with_dot_segments(self):
+        for path in ('/media/./avatars/owner.png', '/media/x/../avatars/owner.png', '/media/avatars//owner.png'):
+            self.assertEqual(self.client.get(path).status_code, 404, path)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.client.get('/media/x/../avatars/owner.png').status_code, 200)
+
+    def test_sendfile_offloading(self):
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+            response = self.client.get('/media/television_images/tv.png')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/television_images/tv.png')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content, b'')
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            response = self.client.get('/media/television_images/tv.png')
+        self.assertEqual(response['X-Sendfile'], os.path.join(settings.MEDIA_ROOT, 'television_images', 'tv.png'))
+
+
+# Komprese odpovědí: výběr kódování, streamování po blocích, přeskočení obrázků a cache zkomprimovaných těl
+class CompressionMiddlewareTests(TestCase):
+    def setUp(self):
+        for i in range(20):
+            create_television(f'Brand {i}', f'Model {i}')
+
+    def test_html_page_is_gzipped(self):
+        plain = self.client.get(reverse('tv_list'))
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        response = self.client.get(reverse('tv_list'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertIsNotNone(caches[settings.COMPRESSION_CACHE_ALIAS].get(cache_key(plain.content, 'gzip')))
+
+    def test_private_pages_are_not_cached(self):
+        self.client.force_login(User.objects.create_user(username='buyer', password='heslo1234'))
+        plain = self.client.get(reverse('tv_list'))
+        response = self.client.get(reverse('tv_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertIsNone(caches[settings.COMPRESSION_CACHE_ALIAS].get(cache_key(plain.content, 'gzip')))
+
+    def test_streaming_response_is_compressed_chunk_by_chunk(self):
+        chunks = [f'{i};Model {i}\n'.encode() * 50 for i in range(5)]
+        response = compress_response(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'),
+                                     StreamingHttpResponse(iter(chunks), content_type='text/csv'))
+        compressed = list(response.streaming_content)
+        self.assertEqual(len(compressed), len(chunks) + 1)
+        # Každý blok jde dekomprimovat hned, bez čekání na konec odpovědi
+        self.assertEqual(zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(compressed[0]), chunks[0])
+        self.assertEqual(gzip.decompress(b''.join(compressed)), b''.join(chunks))
+
+    def test_skips_already_compressed_content(self):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        image = compress_response(request, HttpResponse(b'\x89PNG' * 1000, content_type='image/png'))
+        self.assertNotIn('Content-Encoding', image)
+        encoded = HttpResponse(b'x' * 1000, content_type='text/css')
+        encoded['Content-Encoding'] = 'br'
+        self.assertEqual(compress_response(request, encoded)['Content-Encoding'], 'br')
+        small = compress_response(request, HttpResponse(b'{"results": []}', content_type='application/json'))
+        self.assertNotIn('Content-Encoding', small)
+
+
+# Podobné televize: maticový výpočet sousedů, předpočítaná tabulka a její průběžný přepočet
+@override_settings(RECOMMENDATIONS_NEIGHBOURS=2)
+class RecommendationTests(TestCase):
+    def setUp(self):
+        self.small = create_television('Alpha', 'S1', tv_screen_size=32, price=5000)
+        self.small_twin = create_television('Alpha', 'S2', tv_screen_size=32, price=5200)
+        self.medium = create_television('Beta', 'M1', tv_screen_size=50, price=15000)
+        self.large = create_television('Gamma', 'L1', tv_screen_size=75, price=40000, technology='OLED')
+        self.large_twin = create_television('Gamma', 'L2', tv_screen_size=77, price=42000, technology='OLED')
+        recommendations.rebuild_all()
+
+    def neighbours(self, television):
+        return [similarity.similar for similarity in recommendations.similarities(television.pk)]
+
+    def test_nearest_neighbours_match_brute_force(self):
+        features = np.random.default_rng(0).random((50, 6), dtype=np.float32)
+        indices, distances = recommendations.nearest_neighbours(features, range(50), 3, batch_size=7)
+        for row in range(50):
+            brute = np.linalg.norm(features - features[row], axis=1)
+            brute[row] = np.inf
+            self.assertEqual(list(indices[row]), list(np.argsort(brute)[:3]))
+            np.testing.assert_allclose(distances[row], np.sort(brute)[:3], rtol=1e-3, atol=1e-3)
+
+    def test_detail_page_reads_neighbours_in_one_query(self):
+        self.assertEqual(self.neighbours(self.small), [self.small_twin, self.medium])
+        self.assertEqual(self.neighbours(self.large)[0], self.large_twin)
+        with self.assertNumQueries(1):
+            list(recommendations.similarities(self.small.pk))
+        response = self.client.get(reverse('tv_detail', args=[self.small.pk]))
+        self.assertEqual([similarity.similar for similarity in response.context['similar_televisions']],
+                         [self.small_twin, self.medium])
+        self.assertContains(response, 'Podobné televize')
+
+    def test_incremental_refresh_on_save_and_delete(self):
+        self.medium.tv_screen_size, self.medium.price = 76, 41000
+        self.medium.display_technology = self.large.display_technology
+        self.medium.brand = self.large.brand
+        with self.captureOnCommitCallbacks(execute=True):
+            self.medium.save()
+        self.assertEqual(set(self.neighbours(self.medium)), {self.large, self.large_twin})
+        self.assertIn(self.medium, self.neighbours(self.large))
+        self.assertNotIn(self.medium, self.neighbours(self.small))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.small_twin.delete()
+        self.assertEqual(len(self.neighbours(self.small)), 2)
+        self.assertFalse(TelevisionSimilarity.objects.filter(similar_id=self.small_twin.pk).exists())
+
+    def test_changes_in_one_transaction_are_refreshed_once(self):
+        refresh = recommendations.refresh_televisions
+        with patch.object(recommendations, 'refresh_televisions', wraps=refresh) as refresh_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for television in (self.small, self.medium, self.large):
+                        television.price += 100
+                        television.save()
+                    self.small_twin.delete()
+        self.assertEqual(refresh_mock.call_count, 1)
+        changed, = refresh_mock.call_args.args
+        self.assertTrue({self.small.pk, self.medium.pk, self.large.pk} <= set(changed))
+        self.assertEqual(self.neighbours(self.small), [self.medium, self.large])
+
+
+# Stránky kategorií čtou předpočítané seznamy z cache, změny členství a cen je mažou
+class CategoryPageTests(TestCase):
+    def setUp(self):
+        caches[settings.CATEGORY_CACHE_ALIAS].clear()
+        self.category = Category.objects.create(name='Herní')
+        self.televisions = [create_television('Alpha', f'A{i}', price=1000 * (i + 1), quantity=3) for i in range(5)]
+        self.category.televisions.add(*self.televisions[:3])
+
+    def test_cached_page_query_count(self):
+        # kategorie a seznam id, televize, zásoby
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('category_detail', args=[self.category.pk]))
+        self.assertEqual(list(response.context['object_list']), self.televisions[:3])
+        self.assertEqual((response.context['category']['min_price'], response.context['category']['max_price']),
+                         (1000, 3000))
+        with self.assertNumQueries(2):
+            self.client.get(reverse('category_detail', args=[self.category.pk]))
+        self.assertEqual(self.client.get(reverse('category_detail', args=[self.category.pk + 100])).status_code, 404)
+
+        response = self.client.get(reverse('category_list'))
+        self.assertEqual([(row['name'], row['count']) for row in response.context['categories']], [('Herní', 3)])
+
+    def test_membership_and_price_changes_invalidate_cache(self):
+        self.assertEqual(category_summary(self.category.pk)['count'], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.televisions[4].categories.add(self.category)
+        self.assertEqual(category_summary(self.category.pk)['max_price'], 5000)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.televisions.remove(self.televisions[4])
+        self.assertEqual(category_summary(self.category.pk)['count'], 3)
+
+        self.televisions[0].price = 500
+        with self.captureOnCommitCallbacks(execute=True):
+            self.televisions[0].save()
+        self.assertEqual(category_summary(self.category.pk)['min_price'], 500)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.televisions[1].categories.clear()
+        self.assertEqual(category_summary(self.category.pk)['ids'], [self.televisions[0].pk, self.televisions[2].pk])
+
+    def test_shared_cache_is_invalidated_for_other_processes(self):
+        server = CacheServer(('127.0.0.1', 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        location = f'127.0.0.1:{server.server_address[1]}'
+        shared = {'BACKEND': 'viewer.cache.SocketCache', 'LOCATION': location}
+        with override_settings(CACHES={'default': settings.CACHES['default'], 'categories': shared},
+                               CATEGORY_CACHE_ALIAS='categories'):
+            other_worker = SocketCache(location, {})  # Klient jiného procesu
+            self.assertEqual(category_summary(self.category.pk)['count'], 3)
+            self.assertEqual(other_worker.get(category_key(self.category.pk))['count'], 3)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.televisions[4].categories.add(self.category)
+            self.assertIsNone(other_worker.get(category_key(self.category.pk)))
+
+
+# Hromadná změna stavu objednávek: stavový automat, jeden UPDATE, audit a souhrny prodejů
+class OrderWorkflowTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='heslo1234')
+        self.staff = User.objects.create_user(username='staff', password='heslo1234', is_staff=True)
+        self.television = create_television('Alpha', 'A1', quantity=100, price=1000)
+        self.orders = [place_order(Order(user=self.user), {str(self.television.pk): {'quantity': 1}})
+                       for _ in range(5)]
+        Order.objects.filter(pk__in=[order.pk for order in self.orders[:4]]).update(status='processing')
+        DailySalesRollup.objects.all().delete()
+        call_command('rebuild_sales_rollups', workers=1, stdout=io.StringIO())
+
+    def test_bulk_transition(self):
+        with self.assertRaises(InvalidTransition):
+            bulk_transition([self.orders[0].pk], 'processing', 'completed', self.staff)
+        ids = [order.pk for order in self.orders]
+        self.assertEqual(bulk_transition(ids, 'processing', 'dispatched', self.staff), 4)
+        self.assertEqual(Order.objects.filter(status='dispatched').count(), 4)
+        self.assertEqual(Order.objects.get(pk=self.orders[4].pk).status, 'submitted')
+        self.assertEqual(sorted(OrderStatusChange.objects.values_list('order_uuid', 'to_status', 'changed_by')),
+                         sorted((order.order_id, 'dispatched', self.staff.pk) for order in self.orders[:4]))
+        self.assertEqual(sorted(DailySalesRollup.objects.filter(units__gt=0).values_list('status', 'units')),
+                         [('dispatched', 4), ('submitted', 1)])
+
+    def test_queue_keyset_pagination_and_bulk_action(self):
+        self.client.force_login(self.staff)
+        with override_settings(ORDER_QUEUE_PAGE_SIZE=3):
+            first = self.client.get(reverse('order_queue'), {'status': 'processing'})
+            second = self.client.get(reverse('order_queue'), {'status': 'processing',
+                                                              'after': first.context['next_cursor']})
+        self.assertEqual(len(first.context['orders']), 3)
+        self.assertIsNone(second.context['next_cursor'])
+        self.assertEqual({order.pk for order in first.context['orders'] + second.context['orders']},
+                         {order.pk for order in self.orders[:4]})
+        self.assertEqual([value for value, _ in first.context['targets']], ['dispatched', 'on_hold', 'cancelled'])
+
+        response = self.client.post(reverse('order_queue'), {'status': 'processing', 'to_status': 'on_hold',
+                                                             'orders': [self.orders[0].pk, self.orders[1].pk]})
+        self.assertRedirects(response, reverse('order_queue') + '?status=processing')
+        self.assertEqual(Order.objects.filter(status='on_hold').count(), 2)
+
+
+# Archivace objednávek: dávkový přesun do archivu, souhrny beze změny, detail a PDF z archivu
+class OrderArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='heslo1234')
+        self.television = create_television('Alpha', 'A1', quantity=100, price=1000)
+        self.orders = [place_order(Order(user=self.user), {str(self.television.pk): {'quantity': quantity}})
+                       for quantity in (1, 2, 3, 4)]
+        old = timezone.now() - datetime.timedelta(days=400)
+        for order, status, order_date in zip(self.orders, ['completed', 'cancelled', 'processing', 'completed'],
+                                             [old, old, old, timezone.now()]):
+            order.status = status
+            order.save()
+            Order.objects.filter(pk=order.pk).update(order_date=order_date)
+        call_command('rebuild_sales_rollups', workers=1, stdout=io.StringIO())
+
+    def rollups(self):
+        return sorted(DailySalesRollup.objects.filter(units__gt=0).values_list('day', 'status', 'revenue', 'units'))
+
+    def test_archive_keeps_rollups_and_lookups(self):
+        before = self.rollups()
+        self.assertEqual(archive_orders(batch_size=1), 2)
+        self.assertEqual(sorted(Order.objects.values_list('pk', flat=True)), [self.orders[2].pk, self.orders[3].pk])
+        archived = ArchivedOrder.objects.get(order_id=self.orders[1].order_id)
+        self.assertEqual((archived.pk, archived.status, archived.user, archived.price),
+                         (self.orders[1].pk, 'cancelled', self.user, self.orders[1].price))
+        self.assertEqual(list(archived.items.values_list('television', 'quantity')), [(self.television.pk, 2)])
+        self.assertEqual(self.rollups(), before)
+
+        call_command('rebuild_sales_rollups', workers=1, stdout=io.StringIO())
+        self.assertEqual(self.rollups(), before)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('order_detail', args=[archived.order_id]))
+        self.assertEqual(response.context['order'], archived)
+        self.assertContains(response, '(archivováno)')
+        self.assertEqual(self.client.get(reverse('order_pdf', args=[archived.order_id])).status_code, 200)
+        self.assertEqual(list(self.client.get(reverse('order_list')).context['archived_orders']),
+                         list(ArchivedOrder.objects.order_by('-order_date')))
+
+        self.client.force_login(User.objects.create_user(username='other', password='heslo1234'))
+        self.assertEqual(self.client.get(reverse('order_detail', args=[archived.order_id])).status_code, 404)
+
+
+# Admin: stálý počet dotazů seznamu bez ohledu na počet řádků, odhad počtu, hromadné akce
+class AdminTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='boss', password='heslo1234', email='boss@shop.cz')
+        self.user = User.objects.create_user(username='buyer', password='heslo1234')
+        self.television = create_television('Alpha', 'A1', quantity=100, price=1000)
+        self.client.force_login(self.admin)
+
+    def place(self, count):
+        return [place_order(Order(user=self.user), {str(self.television.pk): {'quantity': 1}}) for _ in range(count)]
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse('admin:viewer_order_changelist')
+        self.place(2)
+        few = self.changelist_queries(url)
+        self.place(8)
+        self.assertEqual(self.changelist_queries(url), few)
+        stock_url = reverse('admin:viewer_itemsonstock_changelist')
+        few = self.changelist_queries(stock_url)
+        create_television('Beta', 'B1', quantity=5)
+        self.assertEqual(self.changelist_queries(stock_url), few)
+
+    def test_estimated_count(self):
+        orders = self.place(3)
+        Order.objects.filter(pk=orders[1].pk).delete()
+        self.assertEqual(EstimatedCountPaginator(Order.objects.all(), 10).count, orders[2].pk)
+        with override_settings(ADMIN_COUNT_LIMIT=1):
+            self.assertEqual(EstimatedCountPaginator(Order.objects.filter(status='submitted'), 10).count, 1)
+
+    def test_bulk_status_action(self):
+        orders = self.place(3)
+        Order.objects.filter(pk=orders[0].pk).update(status='processing')
+        response = self.client.post(reverse('admin:viewer_order_changelist'), {
+            'action': 'mark_dispatched', '_selected_action': [order.pk for order in orders]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(dict(Order.objects.values_list('pk', 'status')),
+                         {orders[0].pk: 'dispatched', orders[1].pk: 'submitted', orders[2].pk: 'submitted'})
+        self.assertEqual(OrderStatusChange.objects.get().changed_by, self.admin)
+
+    def test_status_is_read_only_and_archive_has_no_add(self):
+        order = self.place(1)[0]
+        response = self.client.get(reverse('admin:viewer_order_change', args=[order.pk]))
+        self.assertNotIn('status', response.context['adminform'].form.fields)
+        self.assertEqual(self.client.get(reverse('admin:viewer_archivedorder_add')).status_code, 403)
+
+
+# Kniha skladových pohybů: příjem, prodej, úprava, zhuštění do snímků a kontrola kopie v ItemsOnStock
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='heslo1234')
+        self.television = create_television('Alpha', 'A1', quantity=10)
+
+    def buy(self, quantity):
+        return place_order(Order(user=self.user), {str(self.television.pk): {'quantity': quantity}})
+
+    def test_movements_snapshots_and_reconciliation(self):
+        order = self.buy(3)
+        with self.assertRaises(OutOfStockError):
+            self.buy(8)
+        stock = ItemsOnStock.objects.get(television_id=self.television)
+        stock.quantity = 20
+        stock.save()
+        self.assertEqual(list(StockMovement.objects.order_by('id').values_list('kind', 'delta', 'order_uuid')),
+                         [('receipt', 10, None), ('sale', -3, order.order_id), ('adjustment', 13, None)])
+
+        self.assertEqual(compact_ledger(lag=0), (1, 0))
+        self.buy(5)
+        self.assertEqual(StockSnapshot.objects.get(television=self.television).quantity, 20)
+        self.assertEqual(ledger_quantities(), {self.television.pk: 15})
+        self.assertEqual(reconcile_stock(), [])
+
+        self.assertEqual(compact_ledger(lag=0, prune_before=timezone.now() + datetime.timedelta(days=1)), (1, 4))
+        self.assertEqual(ledger_quantities(), {self.television.pk: 15})
+
+        ItemsOnStock.objects.filter(television_id=self.television).update(quantity=99)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_stock', stdout=io.StringIO())
+        self.assertEqual(reconcile_stock(fix=True), [(self.television.pk, 99, 15)])
+        self.assertEqual(ItemsOnStock.objects.get(television_id=self.television).quantity, 15)
+
+    def test_edit_after_sale_keeps_the_sale(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='heslo1234'))
+        stock = ItemsOnStock.objects.get(television_id=self.television)
+        url = reverse('item_on_stock_update', args=[stock.pk])
+        form = self.client.get(url).context['form']
+        self.assertEqual(form['expected_quantity'].value(), 10)
+        other = create_television('Beta', 'B1')
+
+        self.buy(3)  # Prodej mezi načtením a odesláním formuláře
+        response = self.client.post(url, {'television_id': other.pk, 'quantity': 15, 'expected_quantity': 10})
+        self.assertRedirects(response, reverse('stock_list'), fetch_redirect_response=False)
+        stock.refresh_from_db()
+        self.assertEqual((stock.television_id_id, stock.quantity), (self.television.pk, 12))
+        self.assertEqual(StockMovement.objects.latest('id').delta, 5)
+        self.assertEqual(reconcile_stock(), [])
+
+        self.buy(10)
+        response = self.client.post(url, {'quantity': 1, 'expected_quantity': 12})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['quantity'])
+        self.assertEqual(ItemsOnStock.objects.get(pk=stock.pk).quantity, 2)
+
+    def test_moving_stock_to_other_television(self):
+        other = create_television('Beta', 'B1')
+        stock = ItemsOnStock.objects.get(television_id=self.television)
+        stock.television_id = other
+        stock.quantity = 4
+        stock.save()
+        self.assertEqual(ledger_quantities(), {self.television.pk: 0, other.pk: 4})
+        self.assertEqual(reconcile_stock(), [])
+
+    def test_deleting_stock_and_television(self):
+        ItemsOnStock.objects.get(television_id=self.television).delete()
+        self.assertEqual(ledger_quantities(), {self.television.pk: 0})
+        other = create_television('Beta', 'B1', quantity=4)
+        other.delete()
+        self.assertEqual(reconcile_stock(), [])
+
+
+class FailingChannel:
+    """Kanál pro testy opakování - každé odeslání selže."""
+
+    def send_batch(self, notifications):
+        raise ConnectionError('gateway down')
+
+
+# Fronta oznámení: checkout jen zařadí úlohu, worker ji odešle kanálem podle profilu, chyby se opakují
+@override_settings(NOTIFICATION_RETRY_DELAY=60, NOTIFICATION_MAX_ATTEMPTS=2)
+class NotificationQueueTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        channels = {'Email': 'viewer.notifications.EmailChannel', 'Telefon': 'viewer.notifications.FileChannel',
+                    'Pošta': 'viewer.tests.FailingChannel'}
+        settings_override = override_settings(NOTIFICATION_CHANNELS=channels, NOTIFICATION_FILE_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        notifications._channels.clear()
+        self.addCleanup(notifications._channels.clear)
+
+        self.television = create_television('Alpha', 'A1', quantity=100, price=1000)
+        self.mailer = User.objects.create_user(username='mailer', password='heslo1234', email='jan@example.com')
+        Profile.objects.create(user=self.mailer, first_name='Jan', last_name='Novak')
+        self.caller = User.objects.create_user(username='caller', password='heslo1234')
+        Profile.objects.create(user=self.caller, first_name='Eva', last_name='Mala', phone_number='+420123456789',
+                               communication_channel='Telefon')
+
+    def checkout(self, user):
+        self.client.force_login(user)
+        session = self.client.session
+        session['cart'] = {str(self.television.pk): {'quantity': 1}}
+        session.save()
+        return self.client.post(reverse('checkout'), {
+            'first_name': 'Jan', 'last_name': 'Novak', 'address': 'Ulice 1', 'city': 'Praha',
+            'zipcode': '11000', 'phone_number': '123456789'})
+
+    def test_checkout_enqueues_and_worker_sends_by_channel(self):
+        self.checkout(self.mailer)
+        self.checkout(self.caller)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(sorted(NotificationJob.objects.values_list('channel', 'status')),
+                         [('Email', 'pending'), ('Telefon', 'pending')])
+
+        orders = Order.objects.order_by('id')
+        Order.objects.update(status='processing')
+        bulk_transition([order.pk for order in orders], 'processing', 'dispatched')
+        call_command('run_notification_worker', once=True, stdout=io.StringIO())
+
+        self.assertEqual(set(NotificationJob.objects.values_list('status', flat=True)), {'sent'})
+        self.assertEqual([(message.to, message.subject) for message in mail.outbox], [
+            (['jan@example.com'], f'Potvrzení objednávky {orders[0].order_id}'),
+            (['jan@example.com'], f'Změna stavu objednávky {orders[0].order_id}'),
+        ])
+        with open(os.path.join(self.directory, 'telefon.jsonl'), encoding='utf-8') as spool:
+            lines = [json.loads(line) for line in spool]
+        self.assertEqual([(line['to'], line['kind']) for line in lines],
+                         [('+420123456789', 'order_confirmation'), ('+420123456789', 'status_change')])
+        self.assertIn('Dispatched', lines[1]['body'])
+
+    def test_failures_are_retried_then_failed(self):
+        Profile.objects.filter(user=self.caller).update(communication_channel='Pošta', address='Ulice 1')
+        self.checkout(self.caller)
+        self.assertEqual(notifications.process_batch(), 1)
+        job = NotificationJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 1, 'ConnectionError: gateway down'))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(notifications.process_batch(), 0)  # Další pokus až po prodlevě
+
+        NotificationJob.objects.update(run_after=timezone.now())
+        with self.assertLogs('viewer.notifications', 'WARNING'):
+            notifications.process_batch()
+        self.assertEqual(NotificationJob.objects.get().status, 'failed')
+
+        self.mailer.email = ''
+        self.mailer.save()
+        self.checkout(self.mailer)
+        with self.assertLogs('viewer.notifications', 'WARNING'):
+            notifications.process_batch()
+        self.assertEqual(NotificationJob.objects.latest('id').status, 'failed')  # Bez adresy se neopakuje
+
+
+@override_settings(RATELIMIT_ENABLED=True, RATELIMIT_CACHE_ALIAS=None, RATELIMITS={
+    'cart': {'rate': '60/m', 'burst': 2, 'keys': ['user']},
+    'search': {'rate': '1/m', 'burst': 2, 'keys': ['user']},
+    'login': {'rate': '1/m', 'burst': 2, 'keys': ['ip', 'username'], 'methods': ['POST']},
+})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        ratelimit._local_store = None
+        self.addCleanup(setattr, ratelimit, '_local_store', None)
+
+    def test_search_limited_per_client(self):
+        url = reverse('search_results') + '?q=tv'
+        self.assertEqual([self.client.get(url).status_code for _ in range(2)], [200, 200])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_login_limited_per_username_and_ip(self):
+        url = reverse('login')
+        attempt = {'username': 'jan', 'password': 'wrong'}
+        self.assertEqual([self.client.post(url, attempt).status_code for _ in range(2)], [200, 200])
+        self.assertEqual(self.client.post(url, attempt, REMOTE_ADDR='10.0.0.2').status_code, 429)
+        self.assertEqual(self.client.post(url, {'username': 'eva', 'password': 'x'}).status_code, 429)
+        self.assertEqual(self.client.get(url).status_code, 200)  # Zobrazení formuláře se neomezuje
+
+    def test_cart_limited_per_user(self):
+        first = User.objects.create_user('first', password='x')
+        second = User.objects.create_user('second', password='x')
+        url = reverse('add_to_cart', args=[1])
+        self.client.force_login(first)
+        self.assertEqual([self.client.post(url).status_code == 429 for _ in range(3)], [False, False, True])
+        self.client.force_login(second)
+        self.assertNotEqual(self.client.post(url).status_code, 429)
+
+    def test_disabled(self):
+        with override_settings(RATELIMIT_ENABLED=False):
+            url = reverse('search_results')
+            self.assertEqual({self.client.get(url).status_code for _ in range(3)}, {200})
+
+    def test_socket_cache_take(self):
+        server = CacheServer(('127.0.0.1', 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        cache = SocketCache(f'127.0.0.1:{server.server_address[1]}', {})
+
+        self.assertEqual([cache.take('bucket', 0.5, 2)[0] for _ in range(3)], [True, True, False])
+        allowed, retry_after = cache.take('bucket', 0.5, 2)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 2, delta=0.1)
+        self.assertTrue(cache.take('other', 0.5, 2)[0])
+        bucket = server.store._data[cache.make_key('bucket')][1]['bucket']
+        bucket[1] -= 2  # Uplynuly dvě sekundy - doplní se jeden token
+        self.assertEqual([cache.take('bucket', 0.5, 2)[0] for _ in range(2)], [True, False])
@@ -1,22 +1,44 @@
+import datetime
 import logging
 import io
-
-from django.http import Http404, FileResponse
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import Http404, FileResponse, HttpResponseRedirect, JsonResponse
+from django.db import IntegrityError
+from django.db.models import Count, Q
 from django.views.generic import (TemplateView, DetailView, ListView, CreateView, UpdateView,
                                   DeleteView, FormView, View)
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.views import LoginView, LogoutView, PasswordChangeView
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.urls import reverse_lazy, reverse
+from django.utils.http import urlencode
 from django.shortcuts import get_object_or_404, redirect, render
-from django.db.models import Q
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
 
-from viewer.models import Television, ItemsOnStock, Order, Profile, OrderItem
+from viewer import memory
+from viewer.archive import find_order
+from viewer.auth import is_in_group
+from viewer.fileserving import resolve_path, sendfile_response, serve_file
+from viewer.catalog import attach_stock, catalog_queryset, filter_catalog, search_catalog
+from viewer.categories import category_overview, category_summary
+from viewer.models import ArchivedOrder, Brand, Television, ItemsOnStock, Order, Profile
+from viewer.order_workflow import STATUS_LABELS, InvalidTransition, allowed_targets, bulk_transition
+from viewer.orders import OutOfStockError, place_order
+from viewer.profiling import list_profiles, profile_file_path
+from viewer.ratelimit import RateLimitMixin
+from viewer.recommendations import similarities
+from viewer.rollups import sales_summary
+from viewer.stock import adjust
+from viewer.write_pipeline import run_write
 from viewer.forms import (TVForm, CustomAuthenticationForm, CustomPasswordChangeForm, ProfileForm, SignUpForm,
                           OrderForm, BrandForm, ItemOnStockForm, TVDisplayTechnologyForm, TVDisplayResolutionForm,
                           TVOperationSystemForm, BrandDeleteForm, TVDisplayTechnologyDeleteForm,
@@ -47,7 +69,8 @@ def signup(request):
         form = SignUpForm(request.POST)  # instanci s daty z formuláře
         if form.is_valid():
             user = form.save()  # Pokud je formulář platný, uloží se uživatel do databáze
-            login(request, user)  # Automaticky přihlásí uživatele po registraci
+            # Automaticky přihlásí uživatele po registraci
+            login(request, user, backend='viewer.auth.ProfileModelBackend')
 
             return redirect('home')  # Vrácení na homepage
     else:
@@ -87,7 +110,7 @@ class ProfileView(LoginRequiredMixin, TemplateView):
         return {**super().get_context_data(), 'object': self.request.user}
 
 
-class SubmittableLoginView(LoginView):
+class SubmittableLoginView(RateLimitMixin, LoginView):
     """
     Zobrazuje a zpracovává přihlašovací formulář uživatele.
 
@@ -98,10 +121,12 @@ class SubmittableLoginView(LoginView):
         template_name (str): Cesta k šabloně, která zobrazuje přihlašovací formulář.
         form_class (Form): Vlastní autentizační formulář používaný pro přihlášení (CustomAuthenticationForm).
         next_page (str): Cílová stránka, na kterou bude uživatel přesměrován po úspěšném přihlášení.
+        ratelimit_group (str): Skupina omezení počtu pokusů o přihlášení (viewer.ratelimit).
     """
     template_name = 'user/login_form.html'
     form_class = CustomAuthenticationForm
     next_page = reverse_lazy('home')
+    ratelimit_group = 'login'  # POST počítá PBKDF2 hash hesla
 
 
 class CustomLogoutView(LogoutView):
@@ -152,7 +177,7 @@ def edit_profile(request):
                          přesměruje uživatele na stránku s detaily profilu.
                          Při GET požadavku vrátí stránku s formulářem pro úpravu profilu.
        """
-    profile = Profile.objects.get(user=request.user)
+    profile = request.user.profile  # Načtený spolu s uživatelem (viewer.auth.ProfileModelBackend)
 
     if request.method == 'POST':
         form = ProfileForm(request.POST, request.FILES, instance=profile)
@@ -170,7 +195,7 @@ class BaseView(TemplateView):
     extra_context = {}
 
 
-class SearchResultsView(ListView):
+class SearchResultsView(RateLimitMixin, ListView):
     """
        Zobrazuje výsledky vyhledávání pro model Television.
 
@@ -191,6 +216,7 @@ class SearchResultsView(ListView):
     template_name = 'search_results.html'
     model = Television
     context_object_name = 'search_results'
+    ratelimit_group = 'search'
 
     def get_queryset(self):
         """
@@ -203,14 +229,7 @@ class SearchResultsView(ListView):
                 Návratová hodnota:
                     QuerySet: Výsledky vyhledávání nebo prázdný queryset, pokud není k dispozici žádný dotaz.
                 """
-        query = self.request.GET.get('q')
-        if query:
-            return Television.objects.filter(
-                Q(brand__brand_name__icontains=query) |  # Vyhledávání podle Brand name
-                Q(display_technology__name__icontains=query) |  # Vyhledávání podle Display technology
-                Q(brand_model__icontains=query)  # Vyhledávání podle Brand model
-            )
-        return Television.objects.none()  # Vrací prázdný queryset pokud není žádný k dispozici
+        return search_catalog(self.request.GET.get('q'))
 
 
 class BrandCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
@@ -239,7 +258,7 @@ class BrandCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
 
     def test_func(self):
         # Umožní přístup pouze členům skupiny 'tv_admin' nebo superuživatelům
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='tv_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'tv_admin')
 
     def form_invalid(self, form):
         logger.warning('User provided invalid data.')
@@ -253,7 +272,7 @@ class TVDisplayTechnologyCreateView(LoginRequiredMixin, UserPassesTestMixin, Cre
 
     def test_func(self):
         # Umožní přístup pouze členům skupiny 'tv_admin' nebo superuživatelům
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='tv_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'tv_admin')
 
     def form_invalid(self, form):
         logger.warning('User provided invalid data.')
@@ -267,7 +286,7 @@ class DisplayResolutionCreateView(LoginRequiredMixin, UserPassesTestMixin, Creat
 
     def test_func(self):
         # Umožní přístup pouze členům skupiny 'tv_admin' nebo superuživatelům
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='tv_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'tv_admin')
 
     def form_invalid(self, form):
         logger.warning('User provided invalid data.')
@@ -281,7 +300,7 @@ class OperationSystemCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateV
 
     def test_func(self):
         # Umožní přístup pouze členům skupiny 'tv_admin' nebo superuživatelům
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='tv_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'tv_admin')
 
     def form_invalid(self, form):
         logger.warning('User provided invalid data.')
@@ -373,41 +392,22 @@ class TVListView(ListView):
     context_object_name = 'object_list'
 
     def get_queryset(self):
-        # Získání všech televizí
-        queryset = Television.objects.all()
-
-        # Filtrování podle značek
-        selected_brand = self.request.GET.getlist('brand')
-        if selected_brand:
-            queryset = queryset.filter(brand__brand_name__in=selected_brand)
-
-        # Filtrování podle technologie
-        selected_technology = self.request.GET.getlist('technology')
-        if selected_technology:
-            queryset = queryset.filter(display_technology__name__in=selected_technology)
-
-        # Filtrování podle rozliseni displeje
-        selected_resolution = self.request.GET.getlist('resolution')
-        if selected_resolution:
-            queryset = queryset.filter(display_resolution__name__in=selected_resolution)
-        return queryset
+        # Získání všech televizí vyfiltrovaných podle značek, technologie a rozlišení
+        return filter_catalog(catalog_queryset(), self.request.GET)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         # Kontrola, zda uživatel patří do skupiny 'tv_admin'
-        context['is_tv_admin'] = user.groups.filter(name='tv_admin').exists()
+        context['is_tv_admin'] = is_in_group(user, 'tv_admin')
 
         # Předání vybraných filtrů do kontextu
         context['selected_brand'] = self.request.GET.getlist('brand')
         context['selected_technology'] = self.request.GET.getlist('technology')
         context['selected_resolution'] = self.request.GET.getlist('resolution')
 
-        # Pro každou televizi přidáme odpovídající položku zásob
-        televisions = context['object_list']
-        for television in televisions:
-            item_on_stock = ItemsOnStock.objects.filter(television_id=television.id).first()
-            television.item_on_stock = item_on_stock
+        # Ke všem televizím přidáme odpovídající položku zásob jedním dotazem
+        attach_stock(context['object_list'])
         return context
 
 
@@ -415,17 +415,55 @@ class TVDetailView(DetailView):
     template_name = 'television/tv_detail.html'
     model = Television
 
+    def get_queryset(self):
+        return catalog_queryset()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         # Kontrola, zda uživatel patří do skupiny 'tv_admin', pokud je přihlášen (pro podminkovani v html)
-        context['is_tv_admin'] = user.groups.filter(name='tv_admin').exists()
+        context['is_tv_admin'] = is_in_group(user, 'tv_admin')
 
         # Načtení zásob spojených s konkrétní televizí
-        television = self.get_object()  # Získáme aktuální instanci Television
         # "First zde mám, abych nemusel pracovat s QuerySetem
-        item_on_stock = ItemsOnStock.objects.filter(television_id=television).first()
+        item_on_stock = ItemsOnStock.objects.filter(television_id=self.object).first()
         context['item_on_stock'] = item_on_stock
+        # Předpočítané podobné televize (viewer.recommendations)
+        context['similar_televisions'] = similarities(self.object.pk)
+        return context
+
+
+class CategoryListView(TemplateView):
+    """Přehled kategorií s počty televizí a cenovým rozpětím (z cache, viz viewer.categories)."""
+    template_name = 'television/category_list.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['categories'] = category_overview()
+        return context
+
+
+class CategoryDetailView(TemplateView):
+    """
+    Televize v kategorii.
+
+    Seznam id televizí je předpočítaný v cache (viewer.categories), stránka se z něj jen vyřízne
+    a televize se zásobami se načtou stejně jako v hlavním katalogu - bez JOINu přes M2M tabulku.
+    """
+    template_name = 'television/category_detail.html'
+    paginate_by = 24
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        summary = category_summary(self.kwargs['pk'])
+        if summary is None:
+            raise Http404('Kategorie neexistuje.')
+        page = Paginator(summary['ids'], self.paginate_by).get_page(self.request.GET.get('page'))
+        televisions = catalog_queryset().in_bulk(page.object_list)
+        context['category'] = summary
+        context['page_obj'] = page
+        context['is_paginated'] = page.has_other_pages()
+        context['object_list'] = attach_stock(televisions[pk] for pk in page.object_list if pk in televisions)
         return context
 
 
@@ -435,7 +473,7 @@ class TVCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
     success_url = reverse_lazy('tv_list')
 
     def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='tv_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'tv_admin')
 
     def form_invalid(self, form):
         logger.warning('User provided invalid data.')
@@ -449,7 +487,7 @@ class TVUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     success_url = reverse_lazy('tv_list')
 
     def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='tv_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'tv_admin')
 
     def form_invalid(self, form):
         logger.warning('User provided invalid data while updating a movie.')
@@ -462,7 +500,7 @@ class TVDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     success_url = reverse_lazy('tv_list')
 
     def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='tv_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'tv_admin')
 
 
 class FilteredTelevisionListView(ListView):
@@ -471,7 +509,7 @@ class FilteredTelevisionListView(ListView):
     context_object_name = 'televisions'
 
     def get_queryset(self):
-        queryset = Television.objects.all()  # Zakladni queryset se vsemi televizemi
+        queryset = catalog_queryset()  # Zakladni queryset se vsemi televizemi
 
         smart_tv = self.kwargs.get('smart_tv')
         if smart_tv == 'smart':
@@ -508,21 +546,74 @@ class FilteredTelevisionListView(ListView):
         context['selected_technology'] = self.kwargs.get('technology', 'All')
         context['selected_op_system'] = self.kwargs.get('op_system', 'All')
 
-        # Pro každou televizi přidáme odpovídající položku zásob
-        televisions = context['object_list']
-        for television in televisions:
-            item_on_stock = ItemsOnStock.objects.filter(television_id=television.id).first()
-            television.item_on_stock = item_on_stock
+        # Ke všem televizím přidáme odpovídající položku zásob jedním dotazem
+        attach_stock(context['object_list'])
         return context
 
 
 class ItemOnStockListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    """
+    Stránkovaný seznam skladových zásob.
+
+    Televize a značka se načítají spolu se zásobami (select_related), takže počet dotazů
+    nezávisí na velikosti skladu. GET parametry: sort (klíč SORT_OPTIONS, výchozí nejnižší
+    zásoba první), brand (id značky), low_stock (zobrazit jen zásoby do daného počtu kusů).
+    """
     model = ItemsOnStock
     template_name = 'stock/stock_list.html'
     context_object_name = 'items'
+    paginate_by = 50
+    SORT_OPTIONS = {
+        'quantity': ('quantity', 'pk'),
+        '-quantity': ('-quantity', 'pk'),
+        'brand': ('television_id__brand__brand_name', 'television_id__brand_model', 'pk'),
+        'model': ('television_id__brand_model', 'pk'),
+    }
 
     def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='stock_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'stock_admin')
+
+    def get_queryset(self):
+        queryset = ItemsOnStock.objects.select_related('television_id__brand')
+        brand = self.request.GET.get('brand')
+        if brand and brand.isdigit():
+            queryset = queryset.filter(television_id__brand_id=brand)
+        low_stock = self.request.GET.get('low_stock')
+        if low_stock and low_stock.isdigit():
+            queryset = queryset.filter(quantity__lte=int(low_stock))
+        return queryset.order_by(*self.SORT_OPTIONS.get(self.request.GET.get('sort'), self.SORT_OPTIONS['quantity']))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        context.update({
+            'brands': Brand.objects.order_by('brand_name'),
+            'selected_brand': self.request.GET.get('brand', ''),
+            'selected_sort': self.request.GET.get('sort', 'quantity'),
+            'low_stock': self.request.GET.get('low_stock', ''),
+            'query_params': params.urlencode(),  # filtry a řazení pro odkazy stránkování
+        })
+        return context
+
+
+TELEVISION_LOOKUP_LIMIT = 20
+
+
+@login_required
+@user_passes_test(lambda user: user.is_superuser or is_in_group(user, 'stock_admin'))
+def television_lookup(request):
+    """JSON pro výběr televize ve formuláři skladu - prefix značky nebo modelu, nejvýše TELEVISION_LOOKUP_LIMIT."""
+    query = request.GET.get('q', '').strip()
+    televisions = Television.objects.order_by('brand__brand_name', 'brand_model')
+    if query:
+        televisions = televisions.filter(Q(brand__brand_name__istartswith=query) | Q(brand_model__istartswith=query))
+    rows = televisions.values('pk', 'brand__brand_name', 'brand_model', 'tv_screen_size')[:TELEVISION_LOOKUP_LIMIT]
+    return JsonResponse({'results': [
+        # Stejný popis jako Television.__str__, ale bez dotazu na značku pro každý řádek
+        {'id': row['pk'], 'text': f'{row["brand__brand_name"]} -  {row["brand_model"]} - {row["tv_screen_size"]}"'}
+        for row in rows
+    ]})
 
 
 class ItemOnStockCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView):
@@ -532,10 +623,20 @@ class ItemOnStockCreateView(LoginRequiredMixin, UserPassesTestMixin, CreateView)
     success_url = reverse_lazy('stock_list')
 
     def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='stock_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'stock_admin')
 
     """Zamezeni duplicit je poreseno na urovni databaze, zde"""
 
+    def form_valid(self, form):
+        # Zápis skladu jde přes run_write (případně přes zapisovací vlákno)
+        try:
+            self.object = run_write(form.save)
+        except IntegrityError:
+            # Souběžný požadavek stihl stejnou televizi naskladnit mezi validací a zápisem
+            form.add_error('television_id', 'Tato položka již je na skladě.')
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
     def form_invalid(self, form):
         # Přidání logu při neplatném formuláři
         logger.warning('User provided invalid data.')
@@ -550,7 +651,14 @@ class ItemOnStockUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView)
     success_url = reverse_lazy('stock_list')
 
     def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='stock_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'stock_admin')
+
+    def form_valid(self, form):
+        # Uloží se rozdíl proti stavu ve formuláři (podmíněný UPDATE + pohyb v knize), ne přepsaná hodnota
+        if not run_write(adjust, self.object, form.quantity_delta()):
+            form.add_error('quantity', 'Na skladě je mezitím méně kusů, než kolik chcete odebrat.')
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class ItemOnStockDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
@@ -559,10 +667,17 @@ class ItemOnStockDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView)
     success_url = reverse_lazy('stock_list')
 
     def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='stock_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'stock_admin')
 
+    def form_valid(self, form):
+        success_url = self.get_success_url()
+        run_write(self.object.delete)
+        return HttpResponseRedirect(success_url)
+
+
+class AddToCartView(RateLimitMixin, LoginRequiredMixin, View):
+    ratelimit_group = 'cart'  # GET zapisuje do session
 
-class AddToCartView(LoginRequiredMixin, View):
     @staticmethod
     def get(request, television_id):
         # Ziskame televizi podle ID
@@ -690,39 +805,16 @@ class CheckoutView(LoginRequiredMixin, FormView):
     """Logika po úspěšném odeslání formuláře (zpracování objednávky)"""
 
     def form_valid(self, form):
-        self.order = form.save(commit=False)  # Vytvoření objednávky, ale zatím neuložíme
-        self.order.user = self.request.user  # Priradime uzivatele k objednávce
-        self.order.price = 0  # Inicializace celkové ceny na 0
-        self.order.save()  # Nejprve ulozime objednavku
+        order = form.save(commit=False)  # Vytvoření objednávky, ale zatím neuložíme
+        order.user = self.request.user  # Priradime uzivatele k objednávce
 
-        """ Zpracování položek z košíku """
+        """ Zpracování položek z košíku - v jedné transakci, případně přes write pipeline """
         cart = self.request.session.get('cart', {})
-        total_price = 0  # Proměnná pro výpočet celkové ceny
-
-        for television_id, item in cart.items():
-            count = item['quantity']  # Získání počtu z košíku
-            television = Television.objects.get(id=television_id)
-
-            # Najdeme odpovídající záznam v ItemsOnStock
-            stock_item = ItemsOnStock.objects.get(television_id=television)
-
-            # Zkontrolujeme, zda je na skladě dostatečné množství
-            if stock_item.quantity < count:
-                form.add_error(None, f'Not enough stock for {television.brand_model}.')
-                return self.form_invalid(form)
-
-            # Odečteme počet kusů ze skladu
-            stock_item.quantity -= count
-            stock_item.save()
-
-            # Vytvoření položky objednávky
-            order_item = OrderItem.objects.create(order=self.order, television=television, quantity=count)
-
-            total_price += television.price * count  # Přičtení ceny
-
-        self.order.price = total_price
-        self.order.status = 'submitted'
-        self.order.save()
+        try:
+            self.order = run_write(place_order, order, cart)
+        except OutOfStockError as error:
+            form.add_error(None, str(error))
+            return self.form_invalid(form)
 
         self.request.session['cart'] = {}  # Vyčištění košíku
         return super().form_valid(form)
@@ -756,6 +848,13 @@ class OrderListView(LoginRequiredMixin, ListView):
         else:
             return Order.objects.filter(user=self.request.user)
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Vlastní archivované objednávky (index podle uživatele); superuser archiv neprochází
+        if not self.request.user.is_superuser:
+            context['archived_orders'] = ArchivedOrder.objects.filter(user=self.request.user).order_by('-order_date')
+        return context
+
 
 class OrderDetailView(LoginRequiredMixin, DetailView):
     model = Order
@@ -763,8 +862,10 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'order'
 
     def get_object(self, **kwargs):
-        # Ziskame objednavku podle order_id predaneho v URL
-        order = get_object_or_404(Order, order_id=self.kwargs['order_id'])
+        # Ziskame objednavku podle order_id predaneho v URL (i archivovanou)
+        order = find_order(self.kwargs['order_id'])
+        if order is None:
+            raise Http404("Objednávka neexistuje.")
 
         # Overeni, zda je uzivatel vlastnikem objednavky nebo superuser
         if order.user != self.request.user and not self.request.user.is_superuser:
@@ -779,7 +880,7 @@ class OrderDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     context_object_name = 'order'
 
     def test_func(self):
-        return self.request.user.is_superuser or self.request.user.groups.filter(name='tv_admin').exists()
+        return self.request.user.is_superuser or is_in_group(self.request.user, 'tv_admin')
 
     def get_object(self, **kwargs):
         # Ziskame objednavku podle order_id predaneho v URL
@@ -787,7 +888,10 @@ class OrderDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 
 
 def generate_order_pdf(request, order_id):
-    order = get_object_or_404(Order, order_id=order_id)
+    # Objednávka z provozní tabulky nebo z archivu
+    order = find_order(order_id)
+    if order is None:
+        raise Http404("Objednávka neexistuje.")
 
     # Vytvoření bufferu
     buffer = io.BytesIO()
@@ -820,7 +924,7 @@ def generate_order_pdf(request, order_id):
     p.setFont("Helvetica", 12)
     for item in order.items.all():
         row -= 20
-        p.drawString(100, row, f"{item.quantity}x {item.television}\" (Cena za 1ks: {int(item.television.price)} CZK)")
+        p.drawString(100, row, f"{item.quantity}x {item.television}\" (Cena za 1ks: {int(item.unit_price)} CZK)")
 
     # Ukončení a uložení PDF
     p.showPage()
@@ -831,6 +935,212 @@ def generate_order_pdf(request, order_id):
     return FileResponse(buffer, as_attachment=True, filename=f"objednavka_{order.order_id}.pdf")
 
 
+class SalesDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Přehled prodejů pro personál - čte jen denní souhrny (DailySalesRollup), ne objednávky."""
+    template_name = 'sales/dashboard.html'
+    max_days = 366
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            days = min(max(int(self.request.GET.get('days', 30)), 1), self.max_days)
+        except ValueError:
+            days = 30
+        context['days'] = days
+        context.update(sales_summary(days))
+        return context
+
+
+def parse_order_cursor(value):
+    """Klíč stránkování fronty objednávek '<order_date ISO>_<id>' -> (datetime, id), neplatný -> None."""
+    order_date, _, pk = (value or '').rpartition('_')
+    try:
+        return datetime.datetime.fromisoformat(order_date), int(pk)
+    except ValueError:
+        return None
+
+
+class OrderQueueView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """
+    Fronta objednávek podle stavu pro personál s hromadnou změnou stavu (viz viewer.order_workflow).
+
+    Stránkuje se klíčem (order_date, id) poslední zobrazené objednávky místo OFFSET - každá
+    stránka je jeden rozsahový dotaz přes index order_status_date_idx, ať je jakkoli hluboko.
+    """
+    template_name = 'order/order_queue.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        status = self.request.GET.get('status')
+        if status not in STATUS_LABELS:
+            status = 'submitted'
+        page_size = settings.ORDER_QUEUE_PAGE_SIZE
+        orders = Order.objects.filter(status=status).select_related('user').order_by('-order_date', '-id')
+        cursor = parse_order_cursor(self.request.GET.get('after'))
+        if cursor is not None:
+            order_date, pk = cursor
+            orders = orders.filter(Q(order_date__lt=order_date) | Q(order_date=order_date, id__lt=pk))
+        orders = list(orders[:page_size + 1])
+        counts = dict(Order.objects.order_by().values_list('status').annotate(Count('id')))
+        context.update({
+            'status': status,
+            'status_label': STATUS_LABELS[status],
+            'orders': orders[:page_size],
+            'next_cursor': (f'{orders[page_size - 1].order_date.isoformat()}_{orders[page_size - 1].pk}'
+                            if len(orders) > page_size else None),
+            'statuses': [(value, label, counts.get(value, 0)) for value, label in Order.ORDER_STATUS_CHOICES],
+            'targets': allowed_targets(status),
+        })
+        return context
+
+    def post(self, request, *args, **kwargs):
+        status = request.POST.get('status', '')
+        order_ids = [int(pk) for pk in request.POST.getlist('orders') if pk.isdigit()]
+        try:
+            count = bulk_transition(order_ids, status, request.POST.get('to_status', ''), request.user)
+        except InvalidTransition:
+            messages.error(request, 'Tato změna stavu není povolená.')
+        else:
+            messages.success(request, f'Změněno objednávek: {count}.')
+        return redirect(f"{reverse('order_queue')}?{urlencode({'status': status})}")
+
+
+class ProfilingListView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """Seznam uložených profilů požadavků (viz viewer.profiling) pro personál."""
+    template_name = 'diagnostics/profile_list.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['profiles'] = list_profiles()
+        return context
+
+
+class MemoryDiagnosticsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """
+    Diagnostika paměti procesu pro personál (viz viewer.memory).
+
+    Zobrazuje RSS, stav tracemalloc, špičky alokací podle pohledů, nejvíc alokující místa
+    posledního (nebo vybraného) snímku a rozdíl dvou snímků (GET parametry old a new).
+    POST s action=start/snapshot/stop zapne tracemalloc, uloží snímek nebo tracemalloc vypne.
+    """
+    template_name = 'diagnostics/memory.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def post(self, request):
+        action = request.POST.get('action')
+        if action == 'start':
+            memory.start_tracing()
+        elif action == 'snapshot':
+            memory.take_snapshot(request.POST.get('label') or 'manual')
+        elif action == 'stop':
+            memory.stop_tracing()
+        return redirect('memory_diagnostics')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        snapshots = memory.snapshots()
+        context.update({
+            'rss': memory.current_rss(),
+            'tracing': memory.tracing_status(),
+            'snapshots': snapshots,
+            'view_peaks': memory.view_peaks(),
+        })
+        # Výchozí porovnání: poslední snímek proti předchozímu
+        old, new = self._snapshot('old'), self._snapshot('new')
+        if new is None and snapshots:
+            new = snapshots[-1]
+        if old is None and new is not None:
+            older = [entry for entry in snapshots if entry['id'] < new['id']]
+            old = older[-1] if older else None
+        if new is not None:
+            context['new'] = new
+            context['top_allocations'] = memory.top_allocations(new['snapshot'])
+        if old is not None and new is not None:
+            context['old'] = old
+            context['diff'] = memory.diff_snapshots(old['snapshot'], new['snapshot'])
+        return context
+
+    def _snapshot(self, param):
+        try:
+            return memory.get_snapshot(int(self.request.GET[param]))
+        except (KeyError, ValueError):
+            return None
+
+
+@login_required
+@user_passes_test(lambda user: user.is_staff)
+def profile_download(request, filename):
+    path = profile_file_path(filename)
+    if path is None:
+        raise Http404("Profil neexistuje.")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+
+
+# Názvy otisknuté ManifestStaticFilesStorage: název.<12 znaků md5>.přípona
+HASHED_STATIC_NAME = re.compile(r'\.[0-9a-f]{12}(\.[^./]+)?$')
+
+
+def serve_static(request, path):
+    """
+    Servíruje statický soubor ze STATIC_ROOT (settings.STATIC_SERVE, provoz bez front-end serveru).
+
+    Podle Accept-Encoding pošle předkomprimovanou variantu z collectstatic (viz viewer.staticfiles).
+    Soubory s hashem obsahu v názvu se nikdy nemění, cachují se proto natrvalo (immutable);
+    ostatní settings.STATIC_MAX_AGE sekund a pak se ověří podmíněným požadavkem.
+    """
+    file_path = resolve_path(settings.STATIC_ROOT, path)
+    if HASHED_STATIC_NAME.search(path):
+        cache_control = f'public, max-age={settings.STATIC_IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        cache_control = f'public, max-age={settings.STATIC_MAX_AGE}'
+    return serve_file(request, file_path, cache_control, precompressed=True)
+
+
+def media_is_public(name):
+    """Obrázky televizí a výchozí avatar jsou veřejné, nahrané avatary ne."""
+    return not name.startswith('avatars/') or name == Profile._meta.get_field('avatar').default
+
+
+def media_access_allowed(user, name):
+    """Nahraný avatar vidí jen jeho vlastník a personál."""
+    if not user.is_authenticated:
+        return False
+    profile = getattr(user, 'profile', None)  # Načtený spolu s uživatelem (viewer.auth)
+    return user.is_staff or (profile is not None and profile.avatar.name == name)
+
+
+def serve_media(request, path):
+    """
+    Servíruje nahraný soubor z MEDIA_ROOT s kontrolou přístupu (settings.MEDIA_SERVE).
+
+    Soubor, ke kterému uživatel nemá přístup, se tváří jako neexistující (404). Podmíněné
+    požadavky a Range obsluhuje serve_file; se settings.MEDIA_SENDFILE se po kontrole přístupu
+    samotný přenos předá front-end serveru (X-Sendfile, X-Accel-Redirect).
+    """
+    file_path = resolve_path(settings.MEDIA_ROOT, path)
+    # Přístup se posuzuje podle normalizovaného názvu - 'x/../avatars/a.png' je týž soubor jako 'avatars/a.png'
+    name = os.path.relpath(file_path, os.path.abspath(settings.MEDIA_ROOT)).replace(os.sep, '/')
+    public = media_is_public(name)
+    if not public and not media_access_allowed(request.user, name):
+        raise Http404('File not found.')
+    cache_control = f'{"public" if public else "private"}, max-age={settings.MEDIA_MAX_AGE}'
+    if settings.MEDIA_SENDFILE:
+        return sendfile_response(file_path, name, mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                                 cache_control)
+    return serve_file(request, file_path, cache_control)
+
+
 def home(request):
     return render(request, 'home.html')
 
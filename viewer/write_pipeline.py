@@ -0,0 +1,154 @@
+"""
+Write pipeline - zápisy přes jedno zapisovací vlákno se skupinovým commitem.
+
+SQLite dovoluje v jednu chvíli jen jednoho zapisovatele. Místo toho, aby se o zámek přetahovalo
+mnoho vláken serveru, se zápisové úlohy (checkout, úpravy skladu) řadí do fronty. Zapisovací
+vlákno z ní bere dávky souběžných požadavků a provede je v jedné transakci (group commit).
+Každá úloha běží ve vlastním savepointu, takže chyba jedné úlohy nezruší ostatní v dávce.
+Výsledek dostane volající přes concurrent.futures.Future.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+class WritePipeline:
+    """
+    Fronta zápisových úloh obsluhovaná jedním zapisovacím vláknem.
+
+    Atributy:
+        batch_size (int): Maximální počet úloh v jedné transakci.
+        batch_wait (float): Jak dlouho (s) čekat na další úlohy do dávky.
+        using (str): Alias databáze, do které se zapisuje.
+        committed_batches (int): Počet provedených commitů (pro měření a testy).
+        committed_jobs (int): Počet úloh, které prošly commitem.
+    """
+
+    def __init__(self, batch_size=32, batch_wait=0.002, using=DEFAULT_DB_ALIAS):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.using = using
+        self.committed_batches = 0
+        self.committed_jobs = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='write-pipeline', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Dokončí úlohy ve frontě a ukončí zapisovací vlákno."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def is_writer_thread(self):
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, func, *args, **kwargs):
+        """Zařadí úlohu do fronty a vrátí Future s jejím výsledkem (nebo výjimkou)."""
+        future = Future()
+        self.start()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def _next_batch(self):
+        """Počká na první úlohu a přibere k ní úlohy, které dorazí do batch_wait. None = konec."""
+        job = self._queue.get()
+        if job is None:
+            return None, True
+        batch = [job]
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _run(self):
+        try:
+            stop = False
+            while not stop:
+                batch, stop = self._next_batch()
+                if batch:
+                    self._commit(batch)
+        finally:
+            connections[self.using].close()
+
+    def _commit(self, batch):
+        connections[self.using].close_if_unusable_or_obsolete()
+        outcomes = []
+        try:
+            with transaction.atomic(using=self.using):
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        # Savepoint - chyba jedné úlohy vrátí jen její změny
+                        with transaction.atomic(using=self.using):
+                            outcomes.append((future, None, func(*args, **kwargs)))
+                    except Exception as exc:
+                        outcomes.append((future, exc, None))
+        except Exception as exc:
+            logger.exception('Write pipeline batch of %s jobs failed to commit.', len(batch))
+            for future, *_ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.committed_batches += 1
+        self.committed_jobs += len(outcomes)
+        # Výsledky se předávají až po commitu - volající tak vidí jen trvale zapsaná data
+        for future, exc, result in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Vrátí sdílenou instanci WritePipeline nakonfigurovanou ze settings."""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = WritePipeline(batch_size=settings.WRITE_PIPELINE_BATCH_SIZE,
+                                      batch_wait=settings.WRITE_PIPELINE_BATCH_WAIT)
+        return _pipeline
+
+
+def run_write(func, *args, **kwargs):
+    """
+    Provede zápisovou úlohu a vrátí její výsledek.
+
+    Se zapnutým settings.WRITE_PIPELINE_ENABLED jde úloha přes zapisovací vlákno, jinak se
+    provede přímo v transakci. Přímo se provede i tehdy, když volající už běží v transakci
+    (jeho zápisy musí zůstat v ní) nebo když je volajícím samo zapisovací vlákno.
+    """
+    if settings.WRITE_PIPELINE_ENABLED and not transaction.get_connection().in_atomic_block:
+        pipeline = get_pipeline()
+        if not pipeline.is_writer_thread():
+            return pipeline.submit(func, *args, **kwargs).result(timeout=settings.WRITE_PIPELINE_TIMEOUT)
+    with transaction.atomic():
+        return func(*args, **kwargs)